@@ -0,0 +1,192 @@
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+
+import redis
+from flask import current_app
+from sqlalchemy import bindparam
+
+from cache import RedisBackend, get_cache
+from models import User, db
+
+logger = logging.getLogger(__name__)
+
+# User columns the tracker may buffer; values are naive UTC ISO strings.
+ACTIVITY_FIELDS = ("last_login",)
+
+_tracker_lock = threading.Lock()
+
+# Deletes each user's entry only if it still holds the flushed value, so a
+# login recorded during the flush stays pending.
+_DELETE_IF_UNCHANGED = """
+for i = 1, #ARGV, 2 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+"""
+
+
+class MemoryActivityStore:
+    def __init__(self):
+        self._pending = {field: {} for field in ACTIVITY_FIELDS}
+        self._lock = threading.Lock()
+
+    def record(self, field, user_id, value):
+        with self._lock:
+            self._pending[field][user_id] = value
+
+    def get_many(self, field, user_ids):
+        with self._lock:
+            pending = self._pending[field]
+            return {uid: pending[uid] for uid in user_ids if uid in pending}
+
+    def snapshot(self, field):
+        with self._lock:
+            return dict(self._pending[field])
+
+    def discard(self, field, flushed):
+        with self._lock:
+            pending = self._pending[field]
+            for user_id, value in flushed.items():
+                if pending.get(user_id) == value:
+                    del pending[user_id]
+
+
+class RedisActivityStore:
+    """One hash per field, shared by every web worker."""
+
+    def __init__(self, client):
+        self.client = client
+        self._delete_if_unchanged = client.register_script(_DELETE_IF_UNCHANGED)
+
+    def _key(self, field):
+        return f"activity:{field}"
+
+    def record(self, field, user_id, value):
+        try:
+            self.client.hset(self._key(field), user_id, value)
+        except redis.RedisError as e:
+            logger.warning("Recording %s for user %s failed: %s", field, user_id, e)
+
+    def get_many(self, field, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        try:
+            values = self.client.hmget(self._key(field), user_ids)
+        except redis.RedisError as e:
+            logger.warning("Reading pending %s failed: %s", field, e)
+            return {}
+        return {uid: value.decode() for uid, value in zip(user_ids, values) if value}
+
+    def snapshot(self, field):
+        return {
+            int(uid): value.decode()
+            for uid, value in self.client.hgetall(self._key(field)).items()
+        }
+
+    def discard(self, field, flushed):
+        args = [part for item in flushed.items() for part in item]
+        self._delete_if_unchanged(keys=[self._key(field)], args=args)
+
+
+class ActivityTracker:
+    """Buffers user activity timestamps and writes them back in bulk.
+
+    Logins only touch the store; every ``flush_interval`` seconds (and at
+    shutdown) pending values go to the ``user`` table in one executemany
+    UPDATE per field, so they no longer compete with score writes for the
+    SQLite write lock.
+    """
+
+    def __init__(self, app, store, flush_interval=30):
+        self.app = app
+        self.store = store
+        self.flush_interval = flush_interval
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="activity-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, field, user_id, when=None):
+        when = when or datetime.now(timezone.utc)
+        value = when.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+        self.store.record(field, user_id, value)
+
+    def pending(self, field, user_ids):
+        return self.store.get_many(field, user_ids)
+
+    def flush(self):
+        flushed = 0
+        for field in ACTIVITY_FIELDS:
+            values = self.store.snapshot(field)
+            if not values:
+                continue
+            column = getattr(User.__table__.c, field)
+            db.session.execute(
+                User.__table__.update()
+                .where(User.__table__.c.id == bindparam("b_id"))
+                .values({column: bindparam("b_value")}),
+                [
+                    {"b_id": user_id, "b_value": datetime.fromisoformat(value)}
+                    for user_id, value in values.items()
+                ],
+            )
+            db.session.commit()
+            self.store.discard(field, values)
+            flushed += len(values)
+        return flushed
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            stopping = self._stopping.wait(self.flush_interval)
+            with self.app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception("Flushing user activity failed: %s", e)
+            if stopping:
+                return
+
+
+def get_tracker():
+    app = current_app._get_current_object()
+    with _tracker_lock:
+        tracker = app.extensions.get("activity_tracker")
+        if tracker is None:
+            cache = get_cache()
+            store = (
+                RedisActivityStore(cache.client)
+                if isinstance(cache, RedisBackend)
+                else MemoryActivityStore()
+            )
+            tracker = ActivityTracker(
+                app, store, flush_interval=app.config["ACTIVITY_FLUSH_INTERVAL"]
+            )
+            app.extensions["activity_tracker"] = tracker
+            atexit.register(tracker.stop)
+    return tracker
+
+
+def record_login(user_id):
+    get_tracker().record("last_login", user_id)
+
+
+def merge_pending_activity(items):
+    """Overlay buffered activity on serialized user dicts that have an ``id``."""
+    tracker = get_tracker()
+    user_ids = [item["id"] for item in items]
+    for field in ACTIVITY_FIELDS:
+        pending = tracker.pending(field, user_ids)
+        for item in items:
+            if field in item and item["id"] in pending:
+                item[field] = pending[item["id"]]
+    return items
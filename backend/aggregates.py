@@ -0,0 +1,207 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    case,
+    cast,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update,
+)
+
+from histograms import record_histogram_attempt
+from leaderboards import (
+    get_leaderboards,
+    queue_leaderboard_score,
+    quiz_board,
+    subject_board,
+)
+from models import Chapter, Quiz, Score, Subject, SubjectRollup, UserPerformance, db
+
+
+def score_percentage(total_scored, total_possible):
+    if not total_possible:
+        return 0.0
+    return total_scored / total_possible * 100
+
+
+def percentage_expr():
+    return case(
+        (
+            Score.total_possible > 0,
+            cast(Score.total_scored, Float) * 100.0 / cast(Score.total_possible, Float),
+        ),
+        else_=0.0,
+    )
+
+
+def apply_score(score, subject_id=None):
+    """Update every aggregate derived from ``score`` in the current transaction."""
+    record_user_attempt(score)
+    subject_id = record_subject_attempt(score, subject_id)
+    record_histogram_attempt(
+        score.quiz_id, subject_id, score.total_scored, score.total_possible
+    )
+    queue_leaderboard_score(
+        score.user_id,
+        score.quiz_id,
+        subject_id,
+        score_percentage(score.total_scored, score.total_possible),
+    )
+
+
+def record_user_attempt(score):
+    """Fold a new score into the user's aggregate row.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    percentage = score_percentage(score.total_scored, score.total_possible)
+    attempted_at = score.time_stamp_of_attempt
+
+    result = db.session.execute(
+        update(UserPerformance)
+        .where(UserPerformance.user_id == score.user_id)
+        .values(
+            attempt_count=UserPerformance.attempt_count + 1,
+            percentage_sum=UserPerformance.percentage_sum + percentage,
+            last_attempt_at=case(
+                (
+                    or_(
+                        UserPerformance.last_attempt_at.is_(None),
+                        UserPerformance.last_attempt_at < attempted_at,
+                    ),
+                    attempted_at,
+                ),
+                else_=UserPerformance.last_attempt_at,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.add(
+            UserPerformance(
+                user_id=score.user_id,
+                attempt_count=1,
+                percentage_sum=percentage,
+                last_attempt_at=attempted_at,
+            )
+        )
+
+
+def rebuild_user_performance():
+    db.session.execute(UserPerformance.__table__.delete())
+    db.session.execute(
+        insert(UserPerformance).from_select(
+            ["user_id", "attempt_count", "percentage_sum", "last_attempt_at"],
+            select(
+                Score.user_id,
+                func.count(Score.id),
+                func.sum(percentage_expr()),
+                func.max(Score.time_stamp_of_attempt),
+            ).group_by(Score.user_id),
+        )
+    )
+    db.session.commit()
+    return UserPerformance.query.count()
+
+
+def record_subject_attempt(score, subject_id=None):
+    """Fold a new score into its subject's rollup row, in the caller's transaction.
+
+    Returns the subject id, looked up from the quiz when not given.
+    """
+    if subject_id is None:
+        subject_id = (
+            db.session.query(Chapter.subject_id)
+            .join(Quiz, Quiz.chapter_id == Chapter.id)
+            .filter(Quiz.id == score.quiz_id)
+            .scalar()
+        )
+    now = datetime.now(timezone.utc)
+    percentage = (
+        score_percentage(score.total_scored, score.total_possible)
+        if score.total_possible > 0
+        else None
+    )
+
+    values = {
+        "attempt_count": SubjectRollup.attempt_count + 1,
+        "updated_at": now,
+    }
+    if percentage is not None:
+        values["max_percentage"] = case(
+            (
+                or_(
+                    SubjectRollup.max_percentage.is_(None),
+                    SubjectRollup.max_percentage < percentage,
+                ),
+                percentage,
+            ),
+            else_=SubjectRollup.max_percentage,
+        )
+
+    result = db.session.execute(
+        update(SubjectRollup)
+        .where(SubjectRollup.subject_id == subject_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.add(
+            SubjectRollup(
+                subject_id=subject_id,
+                attempt_count=1,
+                max_percentage=percentage,
+                updated_at=now,
+            )
+        )
+    return subject_id
+
+
+def rebuild_subject_rollups():
+    now = datetime.now(timezone.utc)
+    db.session.execute(SubjectRollup.__table__.delete())
+    db.session.execute(
+        insert(SubjectRollup).from_select(
+            ["subject_id", "attempt_count", "max_percentage", "updated_at"],
+            select(
+                Subject.id,
+                func.count(Score.id),
+                func.max(case((Score.total_possible > 0, percentage_expr()))),
+                literal(now, DateTime),
+            )
+            .select_from(Subject)
+            .outerjoin(Chapter, Subject.id == Chapter.subject_id)
+            .outerjoin(Quiz, Chapter.id == Quiz.chapter_id)
+            .outerjoin(Score, Quiz.id == Score.quiz_id)
+            .group_by(Subject.id),
+        )
+    )
+    db.session.commit()
+    return SubjectRollup.query.count()
+
+
+def rebuild_leaderboards():
+    """Repopulate every quiz and subject leaderboard from the score table."""
+    boards = {}
+    rows = (
+        db.session.query(
+            Score.quiz_id,
+            Chapter.subject_id,
+            Score.user_id,
+            func.max(percentage_expr()),
+        )
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .group_by(Score.quiz_id, Chapter.subject_id, Score.user_id)
+    )
+    for quiz_id, subject_id, user_id, best in rows:
+        boards.setdefault(quiz_board(quiz_id), {})[user_id] = best
+        totals = boards.setdefault(subject_board(subject_id), {})
+        totals[user_id] = totals.get(user_id, 0) + best
+    get_leaderboards().replace(boards)
+    return len(boards)
@@ -0,0 +1,398 @@
+import json
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import redis
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from cache import RedisBackend, get_cache
+from grading import get_answer_key, grade
+from ingest import AttemptClosed, Submission, persist_submission
+from models import (
+    ATTEMPT_EXPIRED,
+    ATTEMPT_IN_PROGRESS,
+    ATTEMPT_SUBMITTED,
+    Quiz,
+    QuizAttempt,
+    db,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPIRE_BATCH = 500
+
+_store_lock = threading.Lock()
+
+
+class AttemptsExhausted(Exception):
+    """Every attempt the quiz allows has been used."""
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_duration(time_duration):
+    """A quiz's ``"HH:MM"`` duration as a timedelta; raises ValueError otherwise."""
+    hours, minutes = time_duration.split(":")
+    return timedelta(hours=int(hours), minutes=int(minutes))
+
+
+class MemoryAttemptStore:
+    """Attempt sessions and autosaved answers in process memory, for tests and
+    single-process setups."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, user_id, quiz_id):
+        with self._lock:
+            item = self._sessions.get((user_id, quiz_id))
+            if item is None:
+                return None
+            session, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._sessions[(user_id, quiz_id)]
+                return None
+            return session
+
+    def set_session(self, session, ttl):
+        with self._lock:
+            self._sessions[(session["user_id"], session["quiz_id"])] = (
+                session,
+                time.monotonic() + ttl,
+            )
+
+    def save_answers(self, attempt_id, answers, ttl):
+        with self._lock:
+            saved = self._answers.setdefault(attempt_id, {})
+            for question_id, option in answers.items():
+                if option is None:
+                    saved.pop(question_id, None)
+                else:
+                    saved[question_id] = option
+        return True
+
+    def get_answers(self, attempt_id):
+        with self._lock:
+            return dict(self._answers.get(attempt_id, {}))
+
+    def discard_answers(self, attempt_id):
+        with self._lock:
+            self._answers.pop(attempt_id, None)
+
+
+class RedisAttemptStore:
+    """A JSON session per user and quiz, and one answer hash per attempt,
+    shared by every web worker."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _session_key(self, user_id, quiz_id):
+        return f"attempt:session:{user_id}:{quiz_id}"
+
+    def _answers_key(self, attempt_id):
+        return f"attempt:answers:{attempt_id}"
+
+    def get_session(self, user_id, quiz_id):
+        try:
+            raw = self.client.get(self._session_key(user_id, quiz_id))
+        except redis.RedisError as e:
+            logger.warning("Reading attempt session for user %s failed: %s", user_id, e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set_session(self, session, ttl):
+        key = self._session_key(session["user_id"], session["quiz_id"])
+        try:
+            self.client.set(key, json.dumps(session), ex=ttl)
+        except redis.RedisError as e:
+            logger.warning("Storing attempt session %s failed: %s", session["id"], e)
+
+    def save_answers(self, attempt_id, answers, ttl):
+        key = self._answers_key(attempt_id)
+        chosen = {qid: option for qid, option in answers.items() if option is not None}
+        cleared = [qid for qid, option in answers.items() if option is None]
+        pipe = self.client.pipeline()
+        if chosen:
+            pipe.hset(key, mapping=chosen)
+        if cleared:
+            pipe.hdel(key, *cleared)
+        pipe.expire(key, ttl)
+        try:
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Autosave of attempt %s failed: %s", attempt_id, e)
+            return False
+        return True
+
+    def get_answers(self, attempt_id):
+        try:
+            saved = self.client.hgetall(self._answers_key(attempt_id))
+        except redis.RedisError as e:
+            logger.warning(
+                "Reading autosaved answers of attempt %s failed: %s", attempt_id, e
+            )
+            return {}
+        return {qid.decode(): int(option) for qid, option in saved.items()}
+
+    def discard_answers(self, attempt_id):
+        try:
+            self.client.delete(self._answers_key(attempt_id))
+        except redis.RedisError as e:
+            logger.warning(
+                "Discarding autosaved answers of attempt %s failed: %s", attempt_id, e
+            )
+
+
+def get_attempt_store():
+    app = current_app._get_current_object()
+    with _store_lock:
+        store = app.extensions.get("attempt_store")
+        if store is None:
+            cache = get_cache()
+            store = (
+                RedisAttemptStore(cache.client)
+                if isinstance(cache, RedisBackend)
+                else MemoryAttemptStore()
+            )
+            app.extensions["attempt_store"] = store
+    return store
+
+
+def _session_of(attempt):
+    return {
+        "id": attempt.id,
+        "user_id": attempt.user_id,
+        "quiz_id": attempt.quiz_id,
+        "attempt_number": attempt.attempt_number,
+        "status": attempt.status,
+        "started_at": attempt.started_at.isoformat(),
+        "deadline": attempt.deadline.isoformat(),
+    }
+
+
+def deadline_of(session):
+    return datetime.fromisoformat(session["deadline"])
+
+
+def remaining_seconds(session):
+    return max(0, math.ceil((deadline_of(session) - _utcnow()).total_seconds()))
+
+
+def _grace():
+    return timedelta(seconds=current_app.config["ATTEMPT_GRACE_SECONDS"])
+
+
+def accepts_answers(session):
+    """Whether answers may still be saved or submitted (deadline plus grace)."""
+    return _utcnow() <= deadline_of(session) + _grace()
+
+
+def _store_ttl(session):
+    """Seconds to keep a session's store entries: past the deadline by the retention."""
+    retention = current_app.config["ATTEMPT_AUTOSAVE_RETENTION"]
+    return max(1, remaining_seconds(session) + retention)
+
+
+def current_attempt(user_id, quiz_id):
+    """The user's in-progress attempt on a quiz as a session dict, or None.
+
+    Served from the attempt store; the database is only asked when the
+    store has no entry for the pair, and the answer is stored again.
+    """
+    store = get_attempt_store()
+    session = store.get_session(user_id, quiz_id)
+    if session is None:
+        attempt = (
+            QuizAttempt.query.filter_by(user_id=user_id, quiz_id=quiz_id)
+            .order_by(QuizAttempt.attempt_number.desc())
+            .first()
+        )
+        if attempt is None:
+            return None
+        session = _session_of(attempt)
+        store.set_session(session, _store_ttl(session))
+    return session if session["status"] == ATTEMPT_IN_PROGRESS else None
+
+
+def start_attempt(user_id, quiz_id):
+    """Resume the user's running attempt on a quiz or open the next one.
+
+    An attempt that no longer accepts answers (deadline plus grace passed) is
+    closed with its autosaved answers first; one still in its grace window
+    is resumed so it can be submitted. Returns None for an unknown quiz and raises AttemptsExhausted
+    once ``max_attempts`` attempts exist (never when it is None).
+    """
+    session = current_attempt(user_id, quiz_id)
+    if session is not None:
+        if accepts_answers(session):
+            return session
+        expire_attempt(session)
+
+    quiz = (
+        db.session.query(Quiz.time_duration, Quiz.max_attempts)
+        .filter(Quiz.id == quiz_id)
+        .first()
+    )
+    if quiz is None:
+        return None
+    used = (
+        db.session.query(func.max(QuizAttempt.attempt_number))
+        .filter(QuizAttempt.user_id == user_id, QuizAttempt.quiz_id == quiz_id)
+        .scalar()
+        or 0
+    )
+    if quiz.max_attempts is not None and used >= quiz.max_attempts:
+        raise AttemptsExhausted()
+
+    now = _utcnow()
+    attempt = QuizAttempt(
+        user_id=user_id,
+        quiz_id=quiz_id,
+        attempt_number=used + 1,
+        status=ATTEMPT_IN_PROGRESS,
+        started_at=now,
+        deadline=now + parse_duration(quiz.time_duration),
+    )
+    db.session.add(attempt)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent start of the same user and quiz took this number.
+        db.session.rollback()
+        attempt = QuizAttempt.query.filter_by(
+            user_id=user_id, quiz_id=quiz_id, attempt_number=used + 1
+        ).one()
+
+    session = _session_of(attempt)
+    get_attempt_store().set_session(session, _store_ttl(session))
+    return session
+
+
+def valid_answers(answers, answer_key=None, allow_clear=False):
+    """Keep answers keyed by a question id with an option from 1 to 4.
+
+    With an ``answer_key`` only the quiz's own questions are kept; without
+    one only the shape is checked, so autosaves stay off the database. With
+    ``allow_clear``, a None option is kept to clear a saved answer.
+    """
+    questions = answer_key["answers"] if answer_key is not None else None
+    return {
+        str(question_id): option
+        for question_id, option in answers.items()
+        if (
+            str(question_id) in questions
+            if questions is not None
+            else str(question_id).isdigit()
+        )
+        and (
+            (option is None and allow_clear)
+            or (type(option) is int and 1 <= option <= 4)
+        )
+    }
+
+
+def autosave(session, answers):
+    """Merge answers into the attempt's autosave; never touches the database.
+
+    Returns False when the store could not take them.
+    """
+    return get_attempt_store().save_answers(
+        session["id"], answers, _store_ttl(session)
+    )
+
+
+def saved_answers(session):
+    return get_attempt_store().get_answers(session["id"])
+
+
+def attempt_submission(session, answers=None):
+    """A Submission that closes the attempt when persisted, or None if the quiz is gone.
+
+    Posted ``answers`` are laid over the autosaved ones. Past the deadline
+    and grace period only the autosaved answers count and the attempt
+    closes as expired.
+    """
+    answer_key = get_answer_key(session["quiz_id"])
+    if answer_key is None:
+        return None
+
+    now = _utcnow()
+    deadline = deadline_of(session)
+    # Autosaves are only checked for shape; drop ids from other quizzes.
+    merged = valid_answers(saved_answers(session), answer_key)
+    if answers is not None and accepts_answers(session):
+        merged.update(valid_answers(answers, answer_key))
+        status, closed_at = ATTEMPT_SUBMITTED, min(now, deadline)
+    else:
+        status, closed_at = ATTEMPT_EXPIRED, deadline
+
+    total_scored, total_possible = grade(answer_key, merged)
+    return Submission(
+        user_id=session["user_id"],
+        quiz_id=session["quiz_id"],
+        subject_id=answer_key["subject_id"],
+        total_scored=total_scored,
+        total_possible=total_possible,
+        attempted_at=closed_at,
+        attempt_id=session["id"],
+        attempt_status=status,
+        answers=merged,
+    )
+
+
+def release_attempt(session, status):
+    """Mark a closed attempt in the store and drop its autosaved answers."""
+    store = get_attempt_store()
+    closed = {**session, "status": status}
+    store.set_session(closed, _store_ttl(closed))
+    store.discard_answers(session["id"])
+
+
+def expire_attempt(session):
+    """Grade an unsubmitted attempt from its autosaved answers and close it."""
+    submission = attempt_submission(session)
+    try:
+        if submission is None:
+            QuizAttempt.query.filter_by(
+                id=session["id"], status=ATTEMPT_IN_PROGRESS
+            ).update(
+                {"status": ATTEMPT_EXPIRED, "closed_at": deadline_of(session)},
+                synchronize_session=False,
+            )
+            db.session.commit()
+        else:
+            persist_submission(submission)
+    except AttemptClosed:
+        # Submitted while we were grading it.
+        db.session.rollback()
+    release_attempt(session, ATTEMPT_EXPIRED)
+
+
+def expire_overdue_attempts():
+    """Close every in-progress attempt whose deadline and grace period passed."""
+    expired = 0
+    while True:
+        overdue = (
+            QuizAttempt.query.filter(
+                QuizAttempt.status == ATTEMPT_IN_PROGRESS,
+                QuizAttempt.deadline < _utcnow() - _grace(),
+            )
+            .order_by(QuizAttempt.deadline)
+            .limit(EXPIRE_BATCH)
+            .all()
+        )
+        for attempt in overdue:
+            expire_attempt(_session_of(attempt))
+        expired += len(overdue)
+        if len(overdue) < EXPIRE_BATCH:
+            return expired
@@ -0,0 +1,118 @@
+"""Time the admin bulk score export at different levels of parallelism.
+
+    python -m benchmarks.bulk_export --scores 2000000 --chunk-size 100000 --parallelism 1 4
+
+Each lane runs in its own process, standing in for one Celery worker slot
+running ``tasks.export_score_partitions``; the merge is timed separately.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_bench_app, seed_catalog
+from exports import (
+    export_job_dir,
+    merge_score_parts,
+    plan_score_partitions,
+    split_lanes,
+    write_score_partition,
+)
+from models import Quiz, Score, User, db
+
+SEED_BATCH = 50_000
+
+
+def seed_scores(total, users, quizzes):
+    user_ids = [row[0] for row in db.session.query(User.id)]
+    quiz_ids = [row[0] for row in db.session.query(Quiz.id)]
+    started_at = datetime.now() - timedelta(days=365)
+    insert = Score.__table__.insert()
+    for offset in range(0, total, SEED_BATCH):
+        db.session.execute(
+            insert,
+            [
+                {
+                    "user_id": user_ids[n % users],
+                    "quiz_id": quiz_ids[n % quizzes],
+                    "total_scored": n % 11,
+                    "total_possible": 10,
+                    "time_stamp_of_attempt": started_at + timedelta(seconds=n),
+                }
+                for n in range(offset, min(offset + SEED_BATCH, total))
+            ],
+        )
+        db.session.commit()
+
+
+def export_lane(db_path, export_root, job_id, lane):
+    app, _ = make_bench_app(path=db_path, EXPORT_DIR=export_root)
+    with app.app_context():
+        job_dir = export_job_dir(job_id)
+        return [write_score_partition(job_dir, *partition) for partition in lane]
+
+
+def run(app, db_path, export_root, chunk_size, parallelism):
+    job_id = f"bench{parallelism}"
+    with app.app_context():
+        partitions = plan_score_partitions(chunk_size)
+        job_dir = export_job_dir(job_id)
+    lanes = split_lanes(partitions, parallelism)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(lanes)) as pool:
+        lane_results = list(
+            pool.map(
+                export_lane,
+                *zip(*((db_path, export_root, job_id, lane) for lane in lanes)),
+            )
+        )
+    exported = time.perf_counter() - started
+
+    parts = [part for lane in lane_results for part in lane]
+    with app.app_context():
+        manifest = merge_score_parts(job_dir, parts)
+    merged = time.perf_counter() - started - exported
+
+    size = os.path.getsize(os.path.join(job_dir, manifest["merged_file"]))
+    print(
+        f"parallelism {parallelism:>2}: {manifest['rows']:,} rows in "
+        f"{len(parts)} parts, export {exported:.2f}s "
+        f"({manifest['rows'] / exported:,.0f} rows/s), merge {merged:.2f}s, "
+        f"{size / 1024 / 1024:.1f} MiB"
+    )
+    shutil.rmtree(job_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scores", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--quizzes", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    export_root = tempfile.mkdtemp(prefix="bench_exports_")
+    app, path = make_bench_app(EXPORT_DIR=export_root)
+    try:
+        started = time.perf_counter()
+        with app.app_context():
+            seed_catalog(users=args.users, quizzes=args.quizzes)
+            seed_scores(args.scores, args.users, args.quizzes)
+            db.engine.dispose()
+        print(f"Seeded {args.scores:,} scores in {time.perf_counter() - started:.1f}s")
+
+        for parallelism in args.parallelism:
+            run(app, path, export_root, args.chunk_size, parallelism)
+    finally:
+        shutil.rmtree(export_root, ignore_errors=True)
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from models import Chapter, Quiz, Subject, User, db
+
+
+def make_bench_app(path=None, **config):
+    """A bare app on a throwaway SQLite file, so benchmarks never touch main.db.
+
+    Pass ``path`` to open an already seeded file, e.g. from a worker process.
+    """
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".db", prefix="bench_")
+        os.close(fd)
+
+    app = Flask("bench")
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        CACHE_BACKEND="memory",
+        CACHE_MAX_ENTRIES=100_000,
+    )
+    app.config.update(config)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app, path
+
+
+def seed_catalog(users=1, quizzes=1):
+    subject = Subject(name="Bench Subject")
+    chapter = Chapter(name="Bench Chapter", subject=subject)
+    db.session.add_all([subject, chapter])
+    db.session.add_all(
+        Quiz(
+            chapter=chapter,
+            date_of_quiz=datetime.now() + timedelta(days=1),
+            time_duration="00:30",
+        )
+        for _ in range(quizzes)
+    )
+    db.session.add_all(
+        User(
+            email=f"bench{i}@example.com",
+            password="x",
+            full_name=f"Bench {i}",
+            dob=datetime(2000, 1, 1),
+        )
+        for i in range(users)
+    )
+    db.session.commit()
+    return subject.id
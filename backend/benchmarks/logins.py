@@ -0,0 +1,127 @@
+"""Measure logins per second for password hashing configurations.
+
+    python -m benchmarks.logins --logins 200 --threads 32 --workers 0 4 \\
+        --configs argon2 argon2:time_cost=2,memory_cost=19456 bcrypt:rounds=12
+
+Each config is ``scheme[:option=value,...]`` with passlib options for that
+scheme. Logins go through POST /api/auth/login from ``--threads`` request
+threads; ``--workers 0`` verifies on the request thread, anything else
+through a pool of that many processes. Users are stored with a hash made
+under the same config, so no login triggers a rehash.
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from flask_security import Security
+
+from benchmarks.common import make_bench_app, seed_catalog
+from identity import CachedUserDatastore
+from models import Role, User, db
+from passwords import init_passwords, rehash_password
+from routes.auth import auth_bp
+
+PASSWORD = "bench-password"
+
+
+def parse_config(spec):
+    scheme, _, options = spec.partition(":")
+    passlib_options = {}
+    for option in filter(None, options.split(",")):
+        name, value = option.split("=")
+        passlib_options[f"{scheme}__{name}"] = int(value)
+    return scheme, passlib_options
+
+
+def make_login_app(scheme, passlib_options, workers, users):
+    app, path = make_bench_app(
+        SECRET_KEY="bench",
+        SECURITY_PASSWORD_SALT="bench",
+        SECURITY_PASSWORD_HASH=scheme,
+        SECURITY_PASSWORD_HASH_PASSLIB_OPTIONS=passlib_options,
+        IDENTITY_CACHE_TTL=60,
+        IDENTITY_CACHE_SHARED=False,
+        ACTIVITY_FLUSH_INTERVAL=1,
+        PASSWORD_VERIFY_WORKERS=workers,
+        PASSWORD_VERIFY_MAX_PENDING=256,
+        PASSWORD_VERIFY_QUEUE_TIMEOUT=60,
+    )
+    Security(app, CachedUserDatastore(db, User, Role))
+    init_passwords(app)
+    app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    with app.app_context():
+        seed_catalog(users=users)
+        db.session.query(User).update({User.password: rehash_password(PASSWORD)})
+        db.session.commit()
+    return app, path
+
+
+def run(app, logins, threads, users):
+    failures = []
+    counter = iter(range(logins))
+    counter_lock = threading.Lock()
+    start_barrier = threading.Barrier(threads + 1)
+
+    def client():
+        test_client = app.test_client()
+        start_barrier.wait()
+        while True:
+            with counter_lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            response = test_client.post(
+                "/api/auth/login",
+                json={"email": f"bench{n % users}@example.com", "password": PASSWORD},
+            )
+            if response.status_code != 200:
+                failures.append(response.status_code)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, os.cpu_count()])
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        default=["argon2", "argon2:time_cost=2,memory_cost=19456", "bcrypt:rounds=12"],
+    )
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"{cores} core(s), {args.threads} request threads, {args.logins} logins each")
+    for spec in args.configs:
+        scheme, passlib_options = parse_config(spec)
+        for workers in args.workers:
+            app, path = make_login_app(scheme, passlib_options, workers, args.users)
+            try:
+                elapsed, failures = run(app, args.logins, args.threads, args.users)
+                rate = args.logins / elapsed
+                print(
+                    f"{spec:<40} workers {workers:>2}: {rate:7.1f} logins/s, "
+                    f"{rate / cores:7.1f} per core"
+                    + (f", {len(failures)} failed" if failures else "")
+                )
+            finally:
+                app.extensions["password_pool"].shutdown()
+                if "activity_tracker" in app.extensions:
+                    app.extensions["activity_tracker"].stop()
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
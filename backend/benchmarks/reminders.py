@@ -0,0 +1,115 @@
+"""Measure new-quiz reminder fan-out against a local SMTP sink.
+
+    pip install aiosmtpd
+    python -m benchmarks.reminders --students 5000 --chunk-size 500 --workers 1 8
+
+Chunks are planned and rendered exactly as ``tasks.send_new_quiz_reminders``
+does; each worker thread stands in for one Celery worker running
+``tasks.send_reminder_chunk`` with its own SMTP connection.
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_mail import Mail
+
+from benchmarks.common import make_bench_app, seed_catalog
+from models import NotificationBatch, Quiz, Role, User, db
+from tasks import iter_active_student_pages, render_new_quiz_reminder, send_reminder_chunk
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.received += len(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_students(count):
+    seed_catalog(users=count)
+    student = Role(name="student")
+    db.session.add(student)
+    for user in User.query:
+        user.roles.append(student)
+    db.session.commit()
+
+
+def run(app, handler, workers):
+    with app.app_context():
+        subject, body_text, body_html = render_new_quiz_reminder(Quiz.query.all())
+        pages = list(iter_active_student_pages(app.config["REMINDER_CHUNK_SIZE"]))
+        # A fresh batch per run, so the delivery ledger does not skip anyone.
+        batch = NotificationBatch(kind="bench")
+        db.session.add(batch)
+        db.session.commit()
+        batch_id = batch.id
+
+    def send(recipients):
+        with app.app_context():
+            return send_reminder_chunk.run(
+                batch_id, recipients, subject, body_text, body_html
+            )
+
+    before = handler.received
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(send, pages))
+    elapsed = time.perf_counter() - started
+
+    sent = sum(result["sent"] for result in results)
+    print(
+        f"workers {workers:>2}: {sent} sent in {len(pages)} chunks, "
+        f"{elapsed:.2f}s = {sent / elapsed:,.0f} sends/s "
+        f"(sink received {handler.received - before})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--rate-limit", type=float, default=0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    from aiosmtpd.controller import Controller
+
+    handler = CountingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    app, path = make_bench_app(
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=port,
+        MAIL_DEFAULT_SENDER="bench@example.com",
+        REMINDER_CHUNK_SIZE=args.chunk_size,
+        REMINDER_RATE_LIMIT=args.rate_limit,
+    )
+    Mail(app)
+    try:
+        with app.app_context():
+            seed_students(args.students)
+        for workers in args.workers:
+            run(app, handler, workers)
+    finally:
+        controller.stop()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare per-request commits with group-commit ingestion.
+
+    python -m benchmarks.submissions --submitters 64 --per-submitter 25
+"""
+
+import argparse
+import os
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.common import make_bench_app, seed_catalog
+from ingest import Submission, SubmissionWriter, persist_submission
+from models import Quiz, db
+
+
+def run(app, mode, submitters, per_submitter, subject_id, quiz_id, writer=None):
+    errors = []
+    start_barrier = threading.Barrier(submitters + 1)
+
+    def submitter(user_id):
+        start_barrier.wait()
+        for _ in range(per_submitter):
+            submission = Submission(
+                user_id=user_id,
+                quiz_id=quiz_id,
+                subject_id=subject_id,
+                total_scored=7,
+                total_possible=10,
+                attempted_at=datetime.now(),
+            )
+            try:
+                if mode == "direct":
+                    with app.app_context():
+                        persist_submission(submission)
+                else:
+                    writer.submit(submission).result(timeout=60)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [
+        threading.Thread(target=submitter, args=(user_id,))
+        for user_id in range(1, submitters + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = submitters * per_submitter
+    print(
+        f"{mode:>6}: {total} submissions in {elapsed:.2f}s "
+        f"= {total / elapsed:,.0f}/s ({len(errors)} errors)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submitters", type=int, default=64)
+    parser.add_argument("--per-submitter", type=int, default=25)
+    parser.add_argument("--max-batch", type=int, default=200)
+    parser.add_argument("--max-delay-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    for mode in ("direct", "group"):
+        app, path = make_bench_app()
+        try:
+            with app.app_context():
+                subject_id = seed_catalog(users=args.submitters)
+                quiz_id = db.session.query(Quiz.id).scalar()
+            writer = None
+            if mode == "group":
+                writer = SubmissionWriter(
+                    app, max_batch=args.max_batch, max_delay_ms=args.max_delay_ms
+                )
+            run(
+                app,
+                mode,
+                args.submitters,
+                args.per_submitter,
+                subject_id,
+                quiz_id,
+                writer,
+            )
+            if writer:
+                writer.stop()
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
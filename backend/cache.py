@@ -0,0 +1,230 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+import redis
+from flask import Response, current_app, request
+
+logger = logging.getLogger(__name__)
+
+# Namespace versions are "<epoch>.<counter>". The epoch changes whenever
+# the counters may have restarted from zero, so an old version (and any
+# ETag built from it) is never handed out again.
+EPOCH_KEY = "ns:epoch"
+
+
+class MemoryBackend:
+    """In-process LRU with per-key TTL, used when Redis is unreachable.
+
+    Entries and namespace versions are private to the process: an
+    invalidation in one worker is not seen by the others, which keep
+    serving cached views and answering ETags from their own counters.
+    Only suitable for a single-process deployment.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        # Counters start from zero on every boot.
+        self._epoch = uuid.uuid4().hex
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._counters.pop(key, None)
+
+    def incr(self, key, amount=1):
+        # Counters back namespace versions, so they live outside the LRU and
+        # are never evicted (an evicted version would resurrect stale entries).
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            return self._counters[key]
+
+    def get_counters(self, keys):
+        with self._lock:
+            return [self._counters.get(key, 0) for key in keys]
+
+    def get_versions(self, keys):
+        return self._epoch, self.get_counters(keys)
+
+
+class RedisBackend:
+    """Shared cache. Namespace counters have no TTL; run Redis with a
+    ``noeviction`` or ``volatile-*`` maxmemory policy so they are not evicted."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        try:
+            return self.client.get(key)
+        except redis.RedisError as e:
+            logger.warning("Cache get failed for %s: %s", key, e)
+            return None
+
+    def get_many(self, keys):
+        try:
+            return self.client.mget(keys)
+        except redis.RedisError as e:
+            logger.warning("Cache mget failed: %s", e)
+            return [None] * len(keys)
+
+    def set(self, key, value, timeout=None):
+        try:
+            self.client.set(key, value, ex=timeout)
+        except redis.RedisError as e:
+            logger.warning("Cache set failed for %s: %s", key, e)
+
+    def delete(self, *keys):
+        try:
+            self.client.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning("Cache delete failed: %s", e)
+
+    def incr(self, key, amount=1):
+        try:
+            return self.client.incr(key, amount)
+        except redis.RedisError as e:
+            logger.warning("Cache incr failed for %s: %s", key, e)
+            return None
+
+    def get_counters(self, keys):
+        return [int(value) if value is not None else 0 for value in self.get_many(keys)]
+
+    def get_versions(self, keys):
+        try:
+            epoch, *counters = self.client.mget([EPOCH_KEY, *keys])
+            if epoch is None:
+                # Redis lost its data (a flush, or a restart without
+                # persistence) and the counters restarted with it.
+                self.client.set(EPOCH_KEY, uuid.uuid4().hex, nx=True)
+                epoch, *counters = self.client.mget([EPOCH_KEY, *keys])
+        except redis.RedisError as e:
+            logger.warning("Cache version read failed: %s", e)
+            # A version that never repeats: nothing cached or tagged matches.
+            return uuid.uuid4().hex, [0] * len(keys)
+        return epoch.decode(), [
+            int(value) if value is not None else 0 for value in counters
+        ]
+
+
+def _create_backend(app):
+    if app.config.get("CACHE_BACKEND") == "redis":
+        try:
+            client = redis.Redis.from_url(
+                app.config["CACHE_REDIS_URL"], socket_connect_timeout=0.5
+            )
+            client.ping()
+            return RedisBackend(client)
+        except redis.RedisError as e:
+            logger.warning("Redis unavailable (%s), falling back to in-process cache", e)
+    return MemoryBackend(app.config.get("CACHE_MAX_ENTRIES", 1024))
+
+
+def get_cache():
+    cache = current_app.extensions.get("cache")
+    if cache is None:
+        cache = _create_backend(current_app)
+        current_app.extensions["cache"] = cache
+    return cache
+
+
+def _namespace_key(namespace):
+    return f"ns:{namespace}"
+
+
+def get_versions(*namespaces):
+    keys = [_namespace_key(ns) for ns in namespaces]
+    epoch, counters = get_cache().get_versions(keys)
+    return [f"{epoch}.{counter}" for counter in counters]
+
+
+def get_version(namespace):
+    return get_versions(namespace)[0]
+
+
+def invalidate(*namespaces):
+    """Bump the version of each namespace so entries built from it are skipped."""
+    cache = get_cache()
+    for namespace in namespaces:
+        cache.incr(_namespace_key(namespace))
+
+
+def _view_key(namespaces):
+    versions = get_versions(*namespaces)
+    version_part = ",".join(f"{ns}={v}" for ns, v in zip(namespaces, versions))
+    view_args = ",".join(f"{k}={v}" for k, v in sorted((request.view_args or {}).items()))
+    query_args = "&".join(
+        f"{k}={v}" for k, v in sorted(request.args.items(multi=True))
+    )
+    return f"view:{request.endpoint}:{view_args}:{query_args}:{version_part}"
+
+
+def cached(*namespaces, timeout=None):
+    """Cache the JSON body of a GET view until any of ``namespaces`` is invalidated.
+
+    Non-GET requests on the same view pass straight through, so this can wrap
+    the combined GET/POST/PUT/DELETE handlers in routes/admin.py.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return fn(*args, **kwargs)
+
+            cache = get_cache()
+            key = _view_key(namespaces)
+            entry = cache.get(key)
+            if entry is not None:
+                header_line, body = entry.split(b"\n", 1)
+                return Response(
+                    body, mimetype="application/json", headers=json.loads(header_line)
+                )
+
+            response = current_app.make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                # Custom X- headers (e.g. pagination cursors) are part of the payload.
+                headers = {
+                    k: v for k, v in response.headers.items() if k.startswith("X-")
+                }
+                cache.set(
+                    key,
+                    json.dumps(headers).encode() + b"\n" + response.get_data(),
+                    timeout or current_app.config.get("CACHE_DEFAULT_TIMEOUT"),
+                )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,284 @@
+"""Fail when a hot route or task query regresses to a full table scan.
+
+Runs every route and task against a freshly seeded throwaway SQLite file,
+records each statement it issues, and replays them under
+``EXPLAIN QUERY PLAN``:
+
+    python check_query_plans.py [--verbose]
+
+Exits non-zero if any statement does a bare ``SCAN`` of a table that is not
+in FULL_SCAN_OK, unless every caller of that statement lists the table in
+INTENDED_SCANS. Keyset page reads (a LIMIT served in index order, without
+a temp b-tree sort) are allowed to walk a table, since they stop early.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+_fd, DB_PATH = tempfile.mkstemp(suffix=".db", prefix="query_plans_")
+os.close(_fd)
+EXPORT_DIR = tempfile.mkdtemp(prefix="query_plans_exports_")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["EXPORT_DIR"] = EXPORT_DIR
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["SQLITE_WAL_CHECKPOINT_INTERVAL"] = "0"
+
+from sqlalchemy import event  # noqa: E402
+
+from main import app  # noqa: E402
+from models import Chapter, Question, Quiz, Score, Subject, User, db  # noqa: E402
+
+# Tables that are small by construction or listed in full by design.
+FULL_SCAN_OK = {"role", "subject", "subject_rollup", "alembic_version"}
+
+# Callers whose job is to read a whole table.
+INTENDED_SCANS = {
+    "GET /api/admin/stats/subject-summary?fresh=1": {"score"},
+    "task generate_monthly_reports": {"user"},
+    "GET /api/admin/users": {"user"},
+    "GET /api/user/subjects": {"chapter"},
+}
+
+SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.enabled = False
+        self.statements = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.enabled or executemany:
+            return
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            labels, _ = self.statements.setdefault(statement, (set(), parameters))
+            labels.add(self.label)
+
+
+def seed():
+    now = datetime.now()
+    subjects = [Subject(name=f"Subject {i}") for i in range(3)]
+    chapters = [
+        Chapter(name=f"Chapter {i}", subject=subjects[i % 3]) for i in range(6)
+    ]
+    quizzes = [
+        Quiz(
+            chapter=chapters[i % 6],
+            date_of_quiz=now + timedelta(days=i - 6),
+            time_duration="00:30",
+        )
+        for i in range(12)
+    ]
+    db.session.add_all(subjects + chapters + quizzes)
+    db.session.flush()
+    db.session.add_all(
+        Question(
+            quiz_id=quiz.id,
+            question_statement=f"Question {j}",
+            option1="a",
+            option2="b",
+            option3="c",
+            option4="d",
+            correct_option=1 + j % 4,
+        )
+        for quiz in quizzes
+        for j in range(5)
+    )
+    db.session.commit()
+    return quizzes[0].id, chapters[0].id, subjects[0].id
+
+
+def login(client, email, password):
+    response = client.post(
+        "/api/auth/login", json={"email": email, "password": password}
+    )
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return {"Authentication-Token": response.json["token"]}
+
+
+def exercise_routes(recorder, quiz_id, chapter_id, subject_id):
+    admin_client = app.test_client()
+    student_client = app.test_client()
+
+    student_client.post(
+        "/api/auth/register",
+        json={
+            "email": "student@example.com",
+            "password": "student",
+            "full_name": "Student",
+            "qualification": "B.Sc",
+            "dob": "2004-01-01",
+        },
+    )
+    admin = login(admin_client, "admin@gmail.com", "admin")
+    student = login(student_client, "student@example.com", "student")
+
+    with app.app_context():
+        student_id = User.query.filter_by(email="student@example.com").one().id
+        for quiz in Quiz.query.all():
+            db.session.add(
+                Score(
+                    user_id=student_id,
+                    quiz_id=quiz.id,
+                    total_scored=3,
+                    total_possible=5,
+                    time_stamp_of_attempt=datetime.now() - timedelta(days=20),
+                )
+            )
+        db.session.commit()
+
+    student_calls = [
+        ("GET", "/api/user/dashboard", None),
+        ("GET", "/api/user/quizzes/upcoming", None),
+        ("GET", "/api/user/subjects", None),
+        ("GET", "/api/user/scores", None),
+        ("GET", "/api/user/reports", None),
+        ("GET", f"/api/user/leaderboards/quizzes/{quiz_id}", None),
+        ("GET", f"/api/user/leaderboards/subjects/{subject_id}", None),
+        ("GET", f"/api/user/distributions/quizzes/{quiz_id}?score=60", None),
+        ("GET", f"/api/user/distributions/subjects/{subject_id}", None),
+        ("GET", f"/api/user/reports/{datetime.now():%Y-%m}", None),
+        ("POST", f"/api/user/quizzes/{quiz_id}/start", None),
+        ("GET", f"/api/user/quizzes/{quiz_id}/attempt", None),
+        ("PUT", f"/api/user/quizzes/{quiz_id}/attempt/answers", {"answers": {}}),
+        (
+            "POST",
+            f"/api/user/quizzes/{quiz_id}/submit",
+            {
+                "answers": {},
+                "time_stamp_of_attempt": datetime.now().isoformat(),
+            },
+        ),
+        ("GET", f"/api/user/quizzes/{quiz_id}", None),
+    ]
+    admin_calls = [
+        ("GET", "/api/admin/subjects", None),
+        ("GET", f"/api/admin/subjects/{subject_id}/chapters", None),
+        ("GET", f"/api/admin/chapters/{chapter_id}/quizzes", None),
+        ("GET", f"/api/admin/quizzes/{quiz_id}/questions", None),
+        ("GET", "/api/admin/users", None),
+        ("GET", "/api/admin/users?limit=50", None),
+        ("GET", "/api/admin/users?active=1&role=student&limit=1", None),
+        ("GET", "/api/admin/users?email=stu&fields=id,email", None),
+        ("GET", "/api/admin/users?name=Stu", None),
+        ("GET", "/api/admin/stats/subject-summary", None),
+        ("GET", "/api/admin/stats/subject-summary?fresh=1", None),
+    ]
+
+    for client, headers, calls in (
+        (student_client, student, student_calls),
+        (admin_client, admin, admin_calls),
+    ):
+        for method, url, body in calls:
+            recorder.label = f"{method} {url}"
+            recorder.enabled = True
+            response = client.open(url, method=method, json=body, headers=headers)
+            recorder.enabled = False
+            if response.status_code >= 500:
+                print(f"warning: {method} {url} returned {response.status_code}")
+
+    return student_id
+
+
+def exercise_tasks(recorder, student_id):
+    import tasks
+
+    app.extensions["mail"].suppress = True
+    # Run fan-out subtasks inline so their statements are recorded too.
+    tasks.celery_app.conf.task_always_eager = True
+    task_calls = [
+        ("task send_new_quiz_reminders", tasks.send_new_quiz_reminders, ()),
+        ("task expire_quiz_attempts", tasks.expire_quiz_attempts, ()),
+        ("task generate_monthly_reports", tasks.generate_monthly_reports, ()),
+        ("task export_user_quiz_data_csv", tasks.export_user_quiz_data_csv, (student_id,)),
+        ("task purge_expired_exports", tasks.purge_expired_exports, ()),
+    ]
+    for label, task, args in task_calls:
+        with app.app_context():
+            recorder.label = label
+            recorder.enabled = True
+            try:
+                task(*args)
+            finally:
+                recorder.enabled = False
+
+
+def explain(statements, verbose=False):
+    failures = []
+    with app.app_context():
+        raw = db.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for statement, (labels, parameters) in statements.items():
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+                details = [row[3] for row in cursor.fetchall()]
+                bounded = " LIMIT " in statement and not any(
+                    "TEMP B-TREE FOR ORDER BY" in detail for detail in details
+                )
+                scans = [
+                    table
+                    for table in (
+                        match.group(1) for match in map(SCAN_RE.match, details) if match
+                    )
+                    if table not in FULL_SCAN_OK
+                    and not all(table in INTENDED_SCANS.get(label, ()) for label in labels)
+                ]
+                label = ", ".join(sorted(labels))
+                if scans and not bounded:
+                    failures.append((label, statement, details, scans))
+                if verbose:
+                    print(f"[{label}] {' '.join(statement.split())}")
+                    for detail in details:
+                        print(f"    {detail}")
+        finally:
+            raw.close()
+    return failures
+
+
+def check(verbose=False):
+    """Run everything once; returns the statement count and the failures."""
+    recorder = StatementRecorder()
+    try:
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute", recorder)
+            quiz_id, chapter_id, subject_id = seed()
+
+        student_id = exercise_routes(recorder, quiz_id, chapter_id, subject_id)
+        exercise_tasks(recorder, student_id)
+        failures = explain(recorder.statements, verbose)
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+        shutil.rmtree(EXPORT_DIR, ignore_errors=True)
+    return len(recorder.statements), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    checked, failures = check(args.verbose)
+    print(f"Checked {checked} distinct statements.")
+    for label, statement, details, scans in failures:
+        print(f"\nFULL SCAN of {', '.join(scans)} in [{label}]")
+        print(f"  {' '.join(statement.split())}")
+        for detail in details:
+            print(f"    {detail}")
+    if failures:
+        print(f"\n{len(failures)} statement(s) regressed to a table scan.")
+        sys.exit(1)
+    print("No hot query does a full table scan.")
+
+
+if __name__ == "__main__":
+    main()
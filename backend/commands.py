@@ -0,0 +1,34 @@
+import click
+
+from aggregates import (
+    rebuild_leaderboards,
+    rebuild_subject_rollups,
+    rebuild_user_performance,
+)
+from histograms import rebuild_histograms
+
+
+def register_commands(app):
+    @app.cli.command("rebuild-user-stats")
+    def rebuild_user_stats():
+        """Backfill per-user performance aggregates from the score table."""
+        count = rebuild_user_performance()
+        click.echo(f"Rebuilt performance aggregates for {count} users.")
+
+    @app.cli.command("rebuild-subject-rollups")
+    def rebuild_subject_rollups_command():
+        """Recompute subject-level attempt counts and top scores."""
+        count = rebuild_subject_rollups()
+        click.echo(f"Rebuilt rollups for {count} subjects.")
+
+    @app.cli.command("rebuild-leaderboards")
+    def rebuild_leaderboards_command():
+        """Repopulate the quiz and subject leaderboards from the score table."""
+        count = rebuild_leaderboards()
+        click.echo(f"Rebuilt {count} leaderboards.")
+
+    @app.cli.command("rebuild-histograms")
+    def rebuild_histograms_command():
+        """Recount the quiz and subject score histograms from the score table."""
+        count = rebuild_histograms()
+        click.echo(f"Rebuilt {count} histogram buckets.")
@@ -9,8 +9,47 @@ class Config:
     SECURITY_PASSWORD_SALT = os.getenv(
         "SECURITY_PASSWORD_SALT", "default-fallback-salt"
     )
+    # Changing the scheme or a cost rehashes each password at its next login.
+    SECURITY_PASSWORD_HASH = os.getenv("SECURITY_PASSWORD_HASH", "argon2")
+    SECURITY_PASSWORD_HASH_PASSLIB_OPTIONS = {
+        option: int(value)
+        for option, value in {
+            "argon2__time_cost": os.getenv("ARGON2_TIME_COST"),
+            "argon2__memory_cost": os.getenv("ARGON2_MEMORY_COST"),
+            "argon2__parallelism": os.getenv("ARGON2_PARALLELISM"),
+            "bcrypt__rounds": os.getenv("BCRYPT_ROUNDS"),
+        }.items()
+        if value
+    }
+    # Login hashing runs in this many worker processes per web worker (0 =
+    # on the request thread); past MAX_PENDING concurrent logins, requests
+    # wait up to QUEUE_TIMEOUT seconds for a slot and then get a 503. Keep
+    # WORKERS times the number of web workers near the CPU count.
+    PASSWORD_VERIFY_WORKERS = int(os.getenv("PASSWORD_VERIFY_WORKERS", "2"))
+    PASSWORD_VERIFY_MAX_PENDING = int(os.getenv("PASSWORD_VERIFY_MAX_PENDING", "64"))
+    PASSWORD_VERIFY_QUEUE_TIMEOUT = float(
+        os.getenv("PASSWORD_VERIFY_QUEUE_TIMEOUT", "5")
+    )
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///main.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Read-only endpoints use this bind; it defaults to the same database
+    # opened with PRAGMA query_only so readers get their own pool.
+    SQLALCHEMY_BINDS = {
+        "readonly": os.getenv("DATABASE_READ_URL", SQLALCHEMY_DATABASE_URI)
+    }
+
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_WAL_AUTOCHECKPOINT = int(os.getenv("SQLITE_WAL_AUTOCHECKPOINT", "1000"))
+    SQLITE_WAL_CHECKPOINT_INTERVAL = int(
+        os.getenv("SQLITE_WAL_CHECKPOINT_INTERVAL", "60")
+    )
+    SQLITE_WAL_TRUNCATE_BYTES = int(
+        os.getenv("SQLITE_WAL_TRUNCATE_BYTES", str(64 * 1024 * 1024))
+    )
 
     SECURITY_HEADERS = {
         "Access-Control-Allow-Origin": "*",
@@ -18,6 +57,19 @@ class Config:
         "Access-Control-Allow-Methods": "GET,PUT,POST,DELETE,OPTIONS",
     }
 
+    # Joining roles into the token lookup makes SQLite materialize and scan
+    # all of roles_users; the separate indexed roles query is far cheaper.
+    SECURITY_JOIN_USER_ROLES = False
+    # Token/session lookups reuse a user's active flag and roles for this many
+    # seconds (0 disables); IDENTITY_CACHE_SHARED also keeps them in the
+    # shared cache so other workers skip the query too.
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "60"))
+    IDENTITY_CACHE_SHARED = os.getenv("IDENTITY_CACHE_SHARED", "True").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+
     SECURITY_RETURN_GENERIC_RESPONSES = False
     SECURITY_JSON_MESSAGES = True
 
@@ -26,6 +78,73 @@ class Config:
         "CELERY_RESULT_BACKEND", "redis://localhost:6379/0"
     )
 
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/1")
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+    QUESTION_IMPORT_BATCH_SIZE = int(os.getenv("QUESTION_IMPORT_BATCH_SIZE", "1000"))
+
+    # "direct" commits each submission; "group" batches them through ingest.py.
+    SUBMISSION_INGEST_MODE = os.getenv("SUBMISSION_INGEST_MODE", "direct")
+    SUBMISSION_GROUP_MAX_BATCH = int(os.getenv("SUBMISSION_GROUP_MAX_BATCH", "200"))
+    SUBMISSION_GROUP_MAX_DELAY_MS = int(os.getenv("SUBMISSION_GROUP_MAX_DELAY_MS", "50"))
+    SUBMISSION_WAIT_TIMEOUT = float(os.getenv("SUBMISSION_WAIT_TIMEOUT", "5"))
+
+    # Seconds between bulk writes of buffered user activity (last_login).
+    ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "30"))
+
+    # Quiz attempts: submissions up to ATTEMPT_GRACE_SECONDS past the deadline
+    # still count; autosaved answers are kept ATTEMPT_AUTOSAVE_RETENTION
+    # seconds past it so the expiry sweep can grade unsubmitted attempts.
+    ATTEMPT_GRACE_SECONDS = int(os.getenv("ATTEMPT_GRACE_SECONDS", "30"))
+    ATTEMPT_AUTOSAVE_RETENTION = int(
+        os.getenv("ATTEMPT_AUTOSAVE_RETENTION", str(24 * 60 * 60))
+    )
+
+    APP_BASE_URL = os.getenv("APP_BASE_URL", "http://localhost:6900")
+    # Defaults to <instance>/exports when unset.
+    EXPORT_DIR = os.getenv("EXPORT_DIR")
+    EXPORT_ATTACHMENT_MAX_BYTES = int(
+        os.getenv("EXPORT_ATTACHMENT_MAX_BYTES", str(5 * 1024 * 1024))
+    )
+    # Export files, and bulk export jobs with their files, older than this are
+    # deleted by the purge-expired-exports beat task.
+    EXPORT_RETENTION_HOURS = int(os.getenv("EXPORT_RETENTION_HOURS", "72"))
+    # Admin bulk export: score ids per part file, and how many subtasks
+    # (worker slots) the parts are spread over.
+    BULK_EXPORT_CHUNK_SIZE = int(os.getenv("BULK_EXPORT_CHUNK_SIZE", "100000"))
+    BULK_EXPORT_PARALLELISM = int(os.getenv("BULK_EXPORT_PARALLELISM", "4"))
+    # A bulk export still unfinished this long after it was requested (a lost
+    # worker, a chord that never completed) is marked failed by the purge task.
+    BULK_EXPORT_TIMEOUT_HOURS = int(os.getenv("BULK_EXPORT_TIMEOUT_HOURS", "6"))
+
+    # New-quiz reminders: user ids per send subtask (each loads the active
+    # students in its range), and messages per second each subtask may send
+    # over its SMTP connection (0 = unlimited).
+    REMINDER_CHUNK_SIZE = int(os.getenv("REMINDER_CHUNK_SIZE", "500"))
+    REMINDER_RATE_LIMIT = float(os.getenv("REMINDER_RATE_LIMIT", "0"))
+    # Quizzes created this recently are announced once each; a batch whose
+    # run has not finished after REMINDER_RESUME_AFTER_SECONDS is resumed.
+    REMINDER_LOOKBACK_HOURS = int(os.getenv("REMINDER_LOOKBACK_HOURS", "24"))
+    REMINDER_RESUME_AFTER_SECONDS = int(
+        os.getenv("REMINDER_RESUME_AFTER_SECONDS", "900")
+    )
+    # Monthly reports: students per send subtask and the same per-subtask pacing.
+    MONTHLY_REPORT_CHUNK_SIZE = int(os.getenv("MONTHLY_REPORT_CHUNK_SIZE", "200"))
+    MONTHLY_REPORT_RATE_LIMIT = float(os.getenv("MONTHLY_REPORT_RATE_LIMIT", "0"))
+    # Undelivered report snapshots are re-sent after this long, at most
+    # MONTHLY_REPORT_MAX_ATTEMPTS times.
+    MONTHLY_REPORT_RESUME_AFTER_SECONDS = int(
+        os.getenv("MONTHLY_REPORT_RESUME_AFTER_SECONDS", "900")
+    )
+    MONTHLY_REPORT_MAX_ATTEMPTS = int(os.getenv("MONTHLY_REPORT_MAX_ATTEMPTS", "3"))
+
+    # Responses at least this large are brotli- or gzip-compressed.
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
     MAIL_SERVER = os.getenv("MAIL_SERVER", "localhost")
     MAIL_PORT = int(os.getenv("MAIL_PORT", "1025"))
     MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "False").lower() in ("true", "1", "t")
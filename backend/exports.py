@@ -0,0 +1,333 @@
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import Chapter, ExportJob, Quiz, Score, Subject, db
+
+SCORE_EXPORT_HEADERS = [
+    "Quiz ID",
+    "Subject",
+    "Chapter",
+    "Quiz Date",
+    "Attempt Timestamp",
+    "Score",
+    "Total Possible",
+    "Percentage",
+]
+YIELD_PER = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def user_score_rows(user_id):
+    """Stream a user's scores as CSV rows without materialising the result."""
+    results = (
+        db.session.query(
+            Score.quiz_id,
+            Quiz.date_of_quiz,
+            Chapter.name.label("chapter_name"),
+            Subject.name.label("subject_name"),
+            Score.total_scored,
+            Score.total_possible,
+            Score.time_stamp_of_attempt,
+        )
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .join(Subject, Chapter.subject_id == Subject.id)
+        .filter(Score.user_id == user_id)
+        .order_by(Score.time_stamp_of_attempt.desc())
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for score_data in results:
+        percentage = (
+            round((score_data.total_scored / score_data.total_possible) * 100, 2)
+            if score_data.total_possible > 0
+            else 0
+        )
+        yield [
+            score_data.quiz_id,
+            score_data.subject_name,
+            score_data.chapter_name,
+            score_data.date_of_quiz.strftime("%Y-%m-%d")
+            if score_data.date_of_quiz
+            else "N/A",
+            score_data.time_stamp_of_attempt.strftime("%Y-%m-%d %H:%M:%S %Z"),
+            score_data.total_scored,
+            score_data.total_possible,
+            percentage,
+        ]
+
+
+def iter_csv_chunks(headers, rows):
+    """Encode rows as CSV text, yielding roughly CHUNK_SIZE pieces."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_dir():
+    path = current_app.config.get("EXPORT_DIR") or os.path.join(
+        current_app.instance_path, "exports"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def user_export_filename(user_id):
+    return f"quiz_scores_{user_id}_{datetime.now(timezone.utc).strftime('%Y%m%d')}.csv.gz"
+
+
+USER_EXPORT_PATTERN = re.compile(r"quiz_scores_\d+_\d{8}\.csv\.gz")
+
+
+def purge_user_exports(max_age_seconds):
+    """Delete per-user export files last written more than ``max_age_seconds`` ago."""
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    with os.scandir(export_dir()) as entries:
+        for entry in entries:
+            if (
+                entry.is_file()
+                and USER_EXPORT_PATTERN.fullmatch(entry.name)
+                and entry.stat().st_mtime < cutoff
+            ):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+    return removed
+
+
+def write_gzip_csv(path, headers, rows):
+    """Write rows to ``path`` as gzip-compressed CSV and return the row count."""
+    count = 0
+    with gzip.open(path, "wt", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_user_score_export(user_id):
+    path = os.path.join(export_dir(), user_export_filename(user_id))
+    count = write_gzip_csv(path, SCORE_EXPORT_HEADERS, user_score_rows(user_id))
+    return path, count
+
+
+BULK_EXPORT_COLUMNS = [
+    "score_id",
+    "user_id",
+    "quiz_id",
+    "subject_id",
+    "subject",
+    "chapter_id",
+    "chapter",
+    "quiz_date",
+    "time_duration",
+    "attempted_at",
+    "total_scored",
+    "total_possible",
+    "percentage",
+]
+EXPORT_JOB_TIMESTAMPS = ("requested_at", "started_at", "finished_at")
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def export_job_to_dict(job):
+    result = {
+        "job_id": job.id,
+        "status": job.status,
+        "requested_by": job.requested_by,
+        "total_partitions": job.total_partitions,
+        "completed_partitions": job.completed_partitions,
+        "parts": job.parts,
+        "rows": job.rows,
+        "error": job.error,
+    }
+    for name in EXPORT_JOB_TIMESTAMPS:
+        value = getattr(job, name)
+        result[name] = value.replace(tzinfo=timezone.utc).isoformat() if value else None
+    return result
+
+
+def create_export_job(job_id, requested_by):
+    job = ExportJob(
+        id=job_id, status="queued", requested_by=requested_by, requested_at=_utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+    return export_job_to_dict(job)
+
+
+def get_export_job(job_id):
+    job = db.session.get(ExportJob, job_id)
+    return export_job_to_dict(job) if job is not None else None
+
+
+def update_export_job(job_id, **changes):
+    """Apply ``changes`` to the job's row and commit; the job must exist."""
+    ExportJob.query.filter_by(id=job_id).update(changes, synchronize_session=False)
+    db.session.commit()
+
+
+def mark_partition_done(job_id):
+    # Lanes run in parallel workers, so count in SQL rather than read-modify-write.
+    ExportJob.query.filter_by(id=job_id).update(
+        {ExportJob.completed_partitions: ExportJob.completed_partitions + 1},
+        synchronize_session=False,
+    )
+    db.session.commit()
+
+
+def fail_stale_export_jobs(max_age_seconds):
+    """Mark jobs still unfinished ``max_age_seconds`` after they were requested
+    as failed, so the status endpoint reports them and the purge removes them."""
+    cutoff = _utcnow() - timedelta(seconds=max_age_seconds)
+    failed = ExportJob.query.filter(
+        ExportJob.requested_at < cutoff,
+        ExportJob.status.notin_(("done", "failed")),
+    ).update(
+        {ExportJob.status: "failed", ExportJob.error: "Export did not finish"},
+        synchronize_session=False,
+    )
+    db.session.commit()
+    return failed
+
+
+def purge_export_jobs(max_age_seconds):
+    """Delete finished export jobs requested more than ``max_age_seconds`` ago,
+    with their files."""
+    cutoff = _utcnow() - timedelta(seconds=max_age_seconds)
+    job_ids = [
+        job_id
+        for (job_id,) in db.session.query(ExportJob.id).filter(
+            ExportJob.requested_at < cutoff,
+            ExportJob.status.in_(("done", "failed")),
+        )
+    ]
+    for job_id in job_ids:
+        shutil.rmtree(os.path.join(export_dir(), f"scores_{job_id}"), ignore_errors=True)
+    if job_ids:
+        ExportJob.query.filter(ExportJob.id.in_(job_ids)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+    return len(job_ids)
+
+
+def export_job_dir(job_id):
+    path = os.path.join(export_dir(), f"scores_{job_id}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def plan_score_partitions(chunk_size):
+    """Split the score id space into ``(index, first_id, last_id)`` ranges."""
+    low, high = db.session.query(func.min(Score.id), func.max(Score.id)).one()
+    if low is None:
+        return []
+    return [
+        (index, start, min(start + chunk_size - 1, high))
+        for index, start in enumerate(range(low, high + 1, chunk_size))
+    ]
+
+
+def split_lanes(partitions, parallelism):
+    """Deal partitions round-robin so each lane gets a similar share of ids."""
+    lanes = [partitions[i::parallelism] for i in range(max(1, parallelism))]
+    return [lane for lane in lanes if lane]
+
+
+def score_partition_rows(first_id, last_id):
+    results = (
+        db.session.query(
+            Score.id,
+            Score.user_id,
+            Score.quiz_id,
+            Subject.id,
+            Subject.name,
+            Chapter.id,
+            Chapter.name,
+            Quiz.date_of_quiz,
+            Quiz.time_duration,
+            Score.time_stamp_of_attempt,
+            Score.total_scored,
+            Score.total_possible,
+        )
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .join(Subject, Chapter.subject_id == Subject.id)
+        .filter(Score.id.between(first_id, last_id))
+        .order_by(Score.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for row in results:
+        total_scored, total_possible = row[10], row[11]
+        percentage = (
+            round(total_scored / total_possible * 100, 2) if total_possible > 0 else 0
+        )
+        yield [
+            *row[:7],
+            row[7].isoformat() if row[7] else "",
+            row[8],
+            row[9].isoformat(),
+            total_scored,
+            total_possible,
+            percentage,
+        ]
+
+
+def write_score_partition(job_dir, index, first_id, last_id):
+    """Write one headerless gzip part so parts can be concatenated as-is."""
+    filename = f"part-{index:05d}.csv.gz"
+    count = 0
+    with gzip.open(os.path.join(job_dir, filename), "wt", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        for row in score_partition_rows(first_id, last_id):
+            writer.writerow(row)
+            count += 1
+    return {"index": index, "first_id": first_id, "last_id": last_id, "rows": count, "file": filename}
+
+
+def merge_score_parts(job_dir, parts):
+    """Concatenate parts behind a header member; gzip members chain into one stream."""
+    merged = os.path.join(job_dir, "scores.csv.gz")
+    with open(merged, "wb") as out:
+        header = io.StringIO()
+        csv.writer(header).writerow(BULK_EXPORT_COLUMNS)
+        out.write(gzip.compress(header.getvalue().encode("utf-8")))
+        for part in sorted(parts, key=lambda part: part["index"]):
+            with open(os.path.join(job_dir, part["file"]), "rb") as fh:
+                shutil.copyfileobj(fh, out)
+
+    manifest = {
+        "columns": BULK_EXPORT_COLUMNS,
+        "rows": sum(part["rows"] for part in parts),
+        "parts": sorted(parts, key=lambda part: part["index"]),
+        "merged_file": os.path.basename(merged),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(job_dir, "manifest.json"), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
@@ -0,0 +1,86 @@
+import json
+import uuid
+
+from cache import get_cache
+from models import Chapter, Question, Quiz, db
+
+ANSWER_KEY_TIMEOUT = 24 * 60 * 60
+
+# quiz_id -> (content version, answer key); the version comes from the quiz
+# row, so edits made through other workers are always picked up.
+_local_answer_keys = {}
+
+
+def quiz_content_version(quiz_id):
+    """The quiz's current content version, or None if it does not exist."""
+    return (
+        db.session.query(Quiz.content_version).filter(Quiz.id == quiz_id).scalar()
+    )
+
+
+def touch_quiz_content(*quiz_ids):
+    """Give quizzes a new content version in the caller's transaction.
+
+    Answer keys and start payloads cached under the old version stop
+    matching once the transaction commits, and never match again.
+    """
+    db.session.query(Quiz).filter(Quiz.id.in_(quiz_ids)).update(
+        {Quiz.content_version: uuid.uuid4().hex}, synchronize_session=False
+    )
+
+
+def _compile_answer_key(quiz_id):
+    subject_id = (
+        db.session.query(Chapter.subject_id)
+        .join(Quiz, Quiz.chapter_id == Chapter.id)
+        .filter(Quiz.id == quiz_id)
+        .scalar()
+    )
+    if subject_id is None:
+        return None
+
+    rows = (
+        db.session.query(Question.id, Question.correct_option)
+        .filter(Question.quiz_id == quiz_id)
+        .all()
+    )
+    return {
+        "subject_id": subject_id,
+        "answers": {str(question_id): correct for question_id, correct in rows},
+    }
+
+
+def get_answer_key(quiz_id):
+    """Return ``{"subject_id", "answers": {question_id: correct_option}}`` or None.
+
+    Looked up in process memory first, then the shared cache, and compiled
+    from the question table only when the quiz's content version changed.
+    """
+    version = quiz_content_version(quiz_id)
+    if version is None:
+        return None
+    local = _local_answer_keys.get(quiz_id)
+    if local and local[0] == version:
+        return local[1]
+
+    cache = get_cache()
+    cache_key = f"answer_key:{quiz_id}:{version}"
+    raw = cache.get(cache_key)
+    if raw is not None:
+        answer_key = json.loads(raw)
+    else:
+        answer_key = _compile_answer_key(quiz_id)
+        if answer_key is None:
+            return None
+        cache.set(cache_key, json.dumps(answer_key), ANSWER_KEY_TIMEOUT)
+
+    _local_answer_keys[quiz_id] = (version, answer_key)
+    return answer_key
+
+
+def grade(answer_key, answers):
+    correct = answer_key["answers"]
+    total_scored = sum(
+        1 for question_id, option in answers.items() if correct.get(question_id) == option
+    )
+    return total_scored, len(correct)
@@ -0,0 +1,110 @@
+import numpy as np
+from sqlalchemy import update
+
+from models import Chapter, Quiz, Score, ScoreHistogram, db
+
+QUIZ = "quiz"
+SUBJECT = "subject"
+BUCKET_COUNT = 20
+BUCKET_WIDTH = 100 / BUCKET_COUNT
+REBUILD_CHUNK = 100_000
+
+
+def score_bucket(total_scored, total_possible):
+    """Bucket of an attempt, in integer arithmetic so 100% and exact edges agree."""
+    if total_possible <= 0:
+        return 0
+    return min(total_scored * BUCKET_COUNT // total_possible, BUCKET_COUNT - 1)
+
+
+def record_histogram_attempt(quiz_id, subject_id, total_scored, total_possible):
+    """Count an attempt in its quiz and subject histograms, in the caller's transaction."""
+    bucket = score_bucket(total_scored, total_possible)
+    for scope, scope_id in ((QUIZ, quiz_id), (SUBJECT, subject_id)):
+        result = db.session.execute(
+            update(ScoreHistogram)
+            .where(
+                ScoreHistogram.scope == scope,
+                ScoreHistogram.scope_id == scope_id,
+                ScoreHistogram.bucket == bucket,
+            )
+            .values(count=ScoreHistogram.count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.session.add(
+                ScoreHistogram(scope=scope, scope_id=scope_id, bucket=bucket, count=1)
+            )
+
+
+def histogram_counts(scope, scope_id):
+    counts = [0] * BUCKET_COUNT
+    for bucket, count in db.session.query(
+        ScoreHistogram.bucket, ScoreHistogram.count
+    ).filter(ScoreHistogram.scope == scope, ScoreHistogram.scope_id == scope_id):
+        counts[bucket] = count
+    return counts
+
+
+def percentile_of(counts, percentage):
+    """Share of attempts scoring below ``percentage``, interpolated within its bucket."""
+    total = sum(counts)
+    if not total:
+        return None
+    percentage = min(max(percentage, 0.0), 100.0)
+    bucket = min(int(percentage // BUCKET_WIDTH), BUCKET_COUNT - 1)
+    within = (percentage - bucket * BUCKET_WIDTH) / BUCKET_WIDTH
+    below = sum(counts[:bucket]) + counts[bucket] * within
+    return below / total * 100
+
+
+def _chunk_counts(chunk, totals):
+    data = np.asarray(chunk, dtype=np.int64)
+    total_scored, total_possible = data[:, 2], data[:, 3]
+    buckets = np.where(
+        total_possible > 0,
+        np.minimum(
+            total_scored * BUCKET_COUNT // np.maximum(total_possible, 1),
+            BUCKET_COUNT - 1,
+        ),
+        0,
+    )
+    for scope, ids in ((QUIZ, data[:, 0]), (SUBJECT, data[:, 1])):
+        keys, counts = np.unique(ids * BUCKET_COUNT + buckets, return_counts=True)
+        scope_totals = totals[scope]
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            scope_totals[key] = scope_totals.get(key, 0) + count
+
+
+def rebuild_histograms():
+    """Recount every histogram from the score table, a chunk of rows at a time."""
+    totals = {QUIZ: {}, SUBJECT: {}}
+    result = db.session.execute(
+        db.select(
+            Score.quiz_id,
+            Chapter.subject_id,
+            Score.total_scored,
+            Score.total_possible,
+        )
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .execution_options(yield_per=REBUILD_CHUNK)
+    )
+    for chunk in result.partitions():
+        _chunk_counts(chunk, totals)
+
+    rows = [
+        {
+            "scope": scope,
+            "scope_id": key // BUCKET_COUNT,
+            "bucket": key % BUCKET_COUNT,
+            "count": count,
+        }
+        for scope, scope_totals in totals.items()
+        for key, count in scope_totals.items()
+    ]
+    db.session.execute(ScoreHistogram.__table__.delete())
+    if rows:
+        db.session.execute(ScoreHistogram.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+from functools import wraps
+
+from flask import Response, current_app, request
+
+from cache import get_versions
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/csv", "text/plain", "text/html"}
+
+
+def _weak_etag(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def namespace_version(*namespaces):
+    """A version function for ``conditional`` built from cache namespace versions.
+
+    The versions carry the cache's epoch, so tags handed out before Redis
+    lost its counters (or before a restart of the in-process backend) never
+    match again. With the in-process backend each worker has its own
+    versions and only sees its own invalidations.
+    """
+
+    def version(**view_args):
+        return get_versions(*namespaces)
+
+    return version
+
+
+def conditional(version):
+    """Answer ``If-None-Match`` before running a GET view.
+
+    ``version`` receives the view arguments and returns anything that changes
+    whenever the response would; it must be much cheaper than the view
+    itself. A matching tag returns 304 without calling the view, otherwise
+    the tag is attached to the view's response.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return fn(*args, **kwargs)
+
+            etag = "v-" + _weak_etag(request.full_path, version(**kwargs))
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _is_plain_body(response):
+    return (
+        response.status_code == 200
+        and not response.is_streamed
+        and not response.direct_passthrough
+        and "Content-Encoding" not in response.headers
+    )
+
+
+def _add_etag(response):
+    if (
+        request.method in ("GET", "HEAD")
+        and response.mimetype == "application/json"
+        and "ETag" not in response.headers
+        and _is_plain_body(response)
+    ):
+        response.set_etag(_weak_etag(response.get_data()), weak=True)
+        response.make_conditional(request)
+    if "ETag" in response.headers and "Cache-Control" not in response.headers:
+        # Per-user data: keep it out of shared caches and always revalidate.
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _compress(response, min_bytes, gzip_level, brotli_quality):
+    if (
+        response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or not _is_plain_body(response)
+        or response.content_length is None
+        or response.content_length < min_bytes
+    ):
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        body = brotli.compress(response.get_data(), quality=brotli_quality)
+        encoding = "br"
+    elif accepted["gzip"]:
+        body = gzip.compress(response.get_data(), compresslevel=gzip_level)
+        encoding = "gzip"
+    else:
+        response.vary.add("Accept-Encoding")
+        return response
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_http_cache(app):
+    """Weak ETags with 304s for GET JSON responses, then response compression."""
+    min_bytes = app.config["COMPRESS_MIN_BYTES"]
+    gzip_level = app.config["COMPRESS_GZIP_LEVEL"]
+    brotli_quality = app.config["COMPRESS_BROTLI_QUALITY"]
+
+    @app.after_request
+    def conditional_and_compressed(response):
+        response = _add_etag(response)
+        return _compress(response, min_bytes, gzip_level, brotli_quality)
@@ -0,0 +1,144 @@
+import json
+import time
+
+from flask import current_app, has_app_context
+from flask_security import SQLAlchemyUserDatastore
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from cache import get_cache, get_version, invalidate
+from models import Role, User, db
+
+# fs_uniquifier -> (version, expires_at, identity), checked against the
+# shared version so a revocation made through any worker applies at once.
+_local_identities = {}
+
+_PENDING_KEY = "identity_invalidations"
+
+
+def identity_namespace(fs_uniquifier):
+    return f"identity:{fs_uniquifier}"
+
+
+def invalidate_identity(*fs_uniquifiers):
+    """Drop cached identities; call after committing the change."""
+    for fs_uniquifier in fs_uniquifiers:
+        _local_identities.pop(fs_uniquifier, None)
+    invalidate(*(identity_namespace(value) for value in fs_uniquifiers))
+
+
+def _identity_of(user):
+    return {
+        "id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "active": user.active,
+        "fs_uniquifier": user.fs_uniquifier,
+        "roles": [[role.id, role.name] for role in user.roles],
+    }
+
+
+def _attach(model, **values):
+    """A persistent instance built from cached values, without a query.
+
+    Attributes that were not cached load on first access like any expired
+    attribute.
+    """
+    roles = values.pop("roles", None)
+    instance = model(**values)
+    if roles is not None:
+        set_committed_value(instance, "roles", roles)
+    make_transient_to_detached(instance)
+    return db.session.merge(instance, load=False)
+
+
+def _user_from_identity(identity):
+    roles = [_attach(Role, id=role_id, name=name) for role_id, name in identity["roles"]]
+    return _attach(User, **{**identity, "roles": roles})
+
+
+def _cached_identity(fs_uniquifier):
+    version = get_version(identity_namespace(fs_uniquifier))
+    local = _local_identities.get(fs_uniquifier)
+    if local and local[0] == version and local[1] > time.monotonic():
+        return version, local[2]
+
+    if current_app.config["IDENTITY_CACHE_SHARED"]:
+        raw = get_cache().get(f"identity:{fs_uniquifier}:v{version}")
+        if raw is not None:
+            identity = json.loads(raw)
+            _remember(fs_uniquifier, version, identity)
+            return version, identity
+    return version, None
+
+
+def _remember(fs_uniquifier, version, identity):
+    ttl = current_app.config["IDENTITY_CACHE_TTL"]
+    _local_identities[fs_uniquifier] = (version, time.monotonic() + ttl, identity)
+
+
+def _store_identity(fs_uniquifier, version, identity):
+    _remember(fs_uniquifier, version, identity)
+    if current_app.config["IDENTITY_CACHE_SHARED"]:
+        get_cache().set(
+            f"identity:{fs_uniquifier}:v{version}",
+            json.dumps(identity),
+            current_app.config["IDENTITY_CACHE_TTL"],
+        )
+
+
+def _invalidate_on_commit(*fs_uniquifiers):
+    db.session.info.setdefault(_PENDING_KEY, set()).update(fs_uniquifiers)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending_invalidations(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and has_app_context():
+        invalidate_identity(*pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending_invalidations(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class CachedUserDatastore(SQLAlchemyUserDatastore):
+    """Serves Flask-Security's per-request ``fs_uniquifier`` lookups from cache.
+
+    Token and session authentication otherwise load the user and then its
+    roles on every request. Changes made through the datastore invalidate
+    the cached identity once committed.
+    """
+
+    def find_user(self, case_insensitive=False, **kwargs):
+        if case_insensitive or list(kwargs) != ["fs_uniquifier"]:
+            return super().find_user(case_insensitive, **kwargs)
+        if current_app.config["IDENTITY_CACHE_TTL"] <= 0:
+            return super().find_user(**kwargs)
+
+        fs_uniquifier = kwargs["fs_uniquifier"]
+        version, identity = _cached_identity(fs_uniquifier)
+        if identity is not None:
+            return _user_from_identity(identity)
+
+        user = super().find_user(fs_uniquifier=fs_uniquifier)
+        if user is not None:
+            _store_identity(fs_uniquifier, version, _identity_of(user))
+        return user
+
+    def put(self, model):
+        if isinstance(model, self.user_model):
+            # Includes the previous value when the uniquifier itself changes.
+            history = inspect(model).attrs.fs_uniquifier.history
+            _invalidate_on_commit(
+                *[value for value in (*history.deleted, model.fs_uniquifier) if value]
+            )
+        return super().put(model)
+
+    def delete(self, model):
+        if isinstance(model, self.user_model):
+            _invalidate_on_commit(model.fs_uniquifier)
+        return super().delete(model)
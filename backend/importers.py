@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+
+from sqlalchemy import insert
+
+from models import Question, Quiz, db
+
+QUESTION_FIELDS = [
+    "question_statement",
+    "option1",
+    "option2",
+    "option3",
+    "option4",
+    "correct_option",
+]
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(content_type, filename=None, requested=None):
+    if requested in ("csv", "jsonl"):
+        return requested
+    name = (filename or "").lower()
+    content_type = content_type or ""
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or "json" in content_type:
+        return "jsonl"
+    return None
+
+
+def iter_rows(binary_stream, fmt):
+    """Yield ``(row_number, dict_or_None, error)`` without reading the whole upload."""
+    text = io.TextIOWrapper(binary_stream, encoding="utf-8", newline="")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, row, None
+        return
+
+    for number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None, "Invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Each line must be a JSON object"
+            continue
+        yield number, row, None
+
+
+class QuestionImporter:
+    """Validates question rows and inserts them in executemany batches.
+
+    Nothing is committed here; the caller owns the transaction so the whole
+    upload lands (or rolls back) as one unit.
+    """
+
+    def __init__(self, quiz_id=None, batch_size=1000):
+        self.quiz_id = quiz_id
+        self.batch_size = batch_size
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.touched_quiz_ids = set()
+        self._batch = []
+        self._known_quizzes = {}
+
+    def _quiz_exists(self, quiz_id):
+        if quiz_id not in self._known_quizzes:
+            self._known_quizzes[quiz_id] = (
+                db.session.query(Quiz.id).filter_by(id=quiz_id).first() is not None
+            )
+        return self._known_quizzes[quiz_id]
+
+    def _validate(self, row):
+        errors = []
+        values = {}
+
+        for field in QUESTION_FIELDS:
+            value = row.get(field)
+            if value is None or str(value).strip() == "":
+                errors.append(f"{field} is required")
+            else:
+                values[field] = value
+
+        if "correct_option" in values:
+            try:
+                values["correct_option"] = int(values["correct_option"])
+                if not 1 <= values["correct_option"] <= 4:
+                    errors.append("correct_option must be between 1 and 4")
+            except (TypeError, ValueError):
+                errors.append("correct_option must be an integer")
+
+        quiz_id = self.quiz_id
+        if quiz_id is None:
+            try:
+                quiz_id = int(row.get("quiz_id"))
+            except (TypeError, ValueError):
+                errors.append("quiz_id is required")
+        if quiz_id is not None and not errors and not self._quiz_exists(quiz_id):
+            errors.append(f"Quiz {quiz_id} does not exist")
+
+        values["quiz_id"] = quiz_id
+        return values, errors
+
+    def _report(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": number, "errors": errors})
+
+    def add(self, number, row, parse_error=None):
+        if parse_error:
+            self._report(number, [parse_error])
+            return
+        values, errors = self._validate(row)
+        if errors:
+            self._report(number, errors)
+            return
+        self._batch.append(values)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        db.session.execute(insert(Question), self._batch)
+        self.inserted += len(self._batch)
+        self.touched_quiz_ids.update(row["quiz_id"] for row in self._batch)
+        self._batch = []
+
+    def report(self):
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
@@ -0,0 +1,206 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from flask import current_app
+from sqlalchemy import update
+
+from aggregates import apply_score
+from cache import get_cache
+from models import ATTEMPT_IN_PROGRESS, QuizAttempt, Score, db
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_TIMEOUT = 60 * 60
+
+_writer_lock = threading.Lock()
+
+
+class AttemptClosed(Exception):
+    """The attempt a submission would close was already submitted or expired."""
+
+
+@dataclass
+class Submission:
+    user_id: int
+    quiz_id: int
+    subject_id: int
+    total_scored: int
+    total_possible: int
+    attempted_at: object
+    # Set when the submission closes a QuizAttempt.
+    attempt_id: int = None
+    attempt_status: str = None
+    answers: dict = None
+    receipt: str = field(default_factory=lambda: uuid.uuid4().hex)
+    future: Future = field(default_factory=Future)
+
+
+def _add_submission(submission):
+    score = Score(
+        user_id=submission.user_id,
+        quiz_id=submission.quiz_id,
+        total_scored=submission.total_scored,
+        total_possible=submission.total_possible,
+        time_stamp_of_attempt=submission.attempted_at,
+    )
+    db.session.add(score)
+    apply_score(score, submission.subject_id)
+    if submission.attempt_id is not None:
+        _close_attempt(submission, score)
+    return score
+
+
+def _close_attempt(submission, score):
+    db.session.flush()
+    result = db.session.execute(
+        update(QuizAttempt)
+        .where(
+            QuizAttempt.id == submission.attempt_id,
+            QuizAttempt.status == ATTEMPT_IN_PROGRESS,
+        )
+        .values(
+            status=submission.attempt_status,
+            closed_at=submission.attempted_at,
+            answers=json.dumps(submission.answers),
+            score_id=score.id,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise AttemptClosed(submission.attempt_id)
+
+
+def persist_submission(submission):
+    """The direct path: one transaction and one commit per submission."""
+    score = _add_submission(submission)
+    db.session.commit()
+    return score.id
+
+
+def _receipt_key(receipt):
+    return f"submission:{receipt}"
+
+
+def store_receipt(submission, status, score_id=None, error=None):
+    get_cache().set(
+        _receipt_key(submission.receipt),
+        json.dumps(
+            {
+                "status": status,
+                "user_id": submission.user_id,
+                "quiz_id": submission.quiz_id,
+                "score_id": score_id,
+                "error": error,
+            }
+        ),
+        RECEIPT_TIMEOUT,
+    )
+
+
+def get_receipt(receipt):
+    raw = get_cache().get(_receipt_key(receipt))
+    return json.loads(raw) if raw is not None else None
+
+
+class SubmissionWriter:
+    """Collects submissions from request threads and commits them in groups.
+
+    A group is flushed when ``max_batch`` submissions are waiting or
+    ``max_delay_ms`` has passed since the first one arrived, so SQLite takes
+    one write lock and one fsync per group instead of per student.
+    """
+
+    def __init__(self, app, max_batch=200, max_delay_ms=50):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="submission-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, submission):
+        self._queue.put(submission)
+        return submission.future
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                with self.app.app_context():
+                    self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            scores = [_add_submission(submission) for submission in batch]
+            db.session.commit()
+        except Exception as e:
+            logger.warning(
+                "Group commit of %d submissions failed, retrying singly: %s",
+                len(batch),
+                e,
+            )
+            db.session.rollback()
+            self._flush_individually(batch)
+            return
+
+        for submission, score in zip(batch, scores):
+            self._resolve(submission, score.id)
+
+    def _flush_individually(self, batch):
+        for submission in batch:
+            try:
+                self._resolve(submission, persist_submission(submission))
+            except Exception as e:
+                db.session.rollback()
+                store_receipt(submission, "failed", error=str(e))
+                submission.future.set_exception(e)
+
+    def _resolve(self, submission, score_id):
+        store_receipt(submission, "committed", score_id=score_id)
+        submission.future.set_result(score_id)
+
+
+def get_writer():
+    app = current_app._get_current_object()
+    with _writer_lock:
+        writer = app.extensions.get("submission_writer")
+        if writer is None:
+            writer = SubmissionWriter(
+                app,
+                max_batch=app.config["SUBMISSION_GROUP_MAX_BATCH"],
+                max_delay_ms=app.config["SUBMISSION_GROUP_MAX_DELAY_MS"],
+            )
+            app.extensions["submission_writer"] = writer
+            atexit.register(writer.stop)
+    return writer
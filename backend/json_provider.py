@@ -0,0 +1,50 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # the stdlib provider stays in place
+    orjson = None
+
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with encoding and decoding done by orjson.
+
+    Keys stay sorted and datetimes keep the default provider's HTTP-date
+    format, so responses match what the stdlib provider would emit apart
+    from whitespace. Non-string keys are converted to strings like the
+    stdlib does, but sorted after conversion: ``{2: .., 10: ..}`` comes out
+    with "10" first.
+    """
+
+    options = (
+        orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson
+        else 0
+    )
+
+    def _dumps_bytes(self, obj, indent=None):
+        option = self.options
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj, kwargs.get("indent")).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype
+        )
+
+
+def init_json(app):
+    # Set the class as well: Flask-Security subclasses ``json_provider_class``
+    # at init time to add its own ``default``.
+    if orjson is not None:
+        app.json_provider_class = OrJSONProvider
+        app.json = OrJSONProvider(app)
@@ -0,0 +1,195 @@
+import logging
+import threading
+from bisect import bisect_left, insort
+
+import redis
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from cache import RedisBackend, get_cache
+from models import db
+
+logger = logging.getLogger(__name__)
+
+REPLACE_BATCH = 1000
+
+_boards_lock = threading.Lock()
+_PENDING_KEY = "leaderboard_updates"
+
+# A user's quiz score is their best percentage on it; their subject score
+# is the sum of those bests, so it only moves when a quiz best improves.
+_RECORD_BEST = """
+local old = tonumber(redis.call('ZSCORE', KEYS[1], ARGV[1]))
+local new = tonumber(ARGV[2])
+if old == nil or new > old then
+    redis.call('ZADD', KEYS[1], new, ARGV[1])
+    redis.call('ZINCRBY', KEYS[2], new - (old or 0), ARGV[1])
+end
+"""
+
+
+def quiz_board(quiz_id):
+    return f"leaderboard:quiz:{quiz_id}"
+
+
+def subject_board(subject_id):
+    return f"leaderboard:subject:{subject_id}"
+
+
+class MemorySortedSets:
+    """Sorted sets in process memory, for tests and single-process setups.
+
+    Each board keeps members ordered by descending score, so ranks are a
+    bisect; ties go to the lower user id.
+    """
+
+    def __init__(self):
+        self._scores = {}
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def _set(self, key, member, score):
+        scores = self._scores.setdefault(key, {})
+        order = self._orders.setdefault(key, [])
+        old = scores.get(member)
+        if old is not None:
+            del order[bisect_left(order, (-old, member))]
+        scores[member] = score
+        insort(order, (-score, member))
+
+    def record_best(self, updates):
+        with self._lock:
+            for quiz_key, subject_key, member, score in updates:
+                old = self._scores.get(quiz_key, {}).get(member)
+                if old is None or score > old:
+                    self._set(quiz_key, member, score)
+                    total = self._scores.get(subject_key, {}).get(member, 0)
+                    self._set(subject_key, member, total + score - (old or 0))
+
+    def top(self, key, count):
+        with self._lock:
+            return [
+                (member, -negated)
+                for negated, member in self._orders.get(key, [])[:count]
+            ]
+
+    def rank(self, key, member):
+        with self._lock:
+            score = self._scores.get(key, {}).get(member)
+            if score is None:
+                return None
+            return bisect_left(self._orders[key], (-score, member)), score
+
+    def size(self, key):
+        with self._lock:
+            return len(self._scores.get(key, {}))
+
+    def replace(self, boards):
+        with self._lock:
+            self._scores, self._orders = {}, {}
+            for key, scores in boards.items():
+                for member, score in scores.items():
+                    self._set(key, member, score)
+
+
+class RedisSortedSets:
+    """Redis sorted sets; ZREVRANK keeps rank lookups O(log n)."""
+
+    def __init__(self, client):
+        self.client = client
+        self._record_best = client.register_script(_RECORD_BEST)
+
+    def record_best(self, updates):
+        pipe = self.client.pipeline(transaction=False)
+        for quiz_key, subject_key, member, score in updates:
+            self._record_best(
+                keys=[quiz_key, subject_key], args=[member, score], client=pipe
+            )
+        try:
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Leaderboard update failed (%d scores): %s", len(updates), e)
+
+    def top(self, key, count):
+        try:
+            entries = self.client.zrevrange(key, 0, count - 1, withscores=True)
+        except redis.RedisError as e:
+            logger.warning("Leaderboard read failed for %s: %s", key, e)
+            return []
+        return [(int(member), score) for member, score in entries]
+
+    def rank(self, key, member):
+        try:
+            rank, score = (
+                self.client.pipeline(transaction=False)
+                .zrevrank(key, member)
+                .zscore(key, member)
+                .execute()
+            )
+        except redis.RedisError as e:
+            logger.warning("Leaderboard rank failed for %s: %s", key, e)
+            return None
+        return None if rank is None else (rank, score)
+
+    def size(self, key):
+        try:
+            return self.client.zcard(key)
+        except redis.RedisError as e:
+            logger.warning("Leaderboard size failed for %s: %s", key, e)
+            return 0
+
+    def replace(self, boards):
+        """Write every board under a temporary key, then swap all at once."""
+        for key, scores in boards.items():
+            items = list(scores.items())
+            self.client.delete(f"{key}:rebuild")
+            for start in range(0, len(items), REPLACE_BATCH):
+                self.client.zadd(
+                    f"{key}:rebuild", dict(items[start : start + REPLACE_BATCH])
+                )
+        stale = [
+            key
+            for key in self.client.scan_iter("leaderboard:*")
+            if not key.endswith(b":rebuild") and key.decode() not in boards
+        ]
+        pipe = self.client.pipeline()
+        if stale:
+            pipe.delete(*stale)
+        for key in boards:
+            pipe.rename(f"{key}:rebuild", key)
+        pipe.execute()
+
+
+def get_leaderboards():
+    app = current_app._get_current_object()
+    with _boards_lock:
+        boards = app.extensions.get("leaderboards")
+        if boards is None:
+            cache = get_cache()
+            boards = (
+                RedisSortedSets(cache.client)
+                if isinstance(cache, RedisBackend)
+                else MemorySortedSets()
+            )
+            app.extensions["leaderboards"] = boards
+    return boards
+
+
+def queue_leaderboard_score(user_id, quiz_id, subject_id, percentage):
+    """Publish a score to its boards once the current transaction commits."""
+    db.session.info.setdefault(_PENDING_KEY, []).append(
+        (quiz_board(quiz_id), subject_board(subject_id), user_id, percentage)
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_scores(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and has_app_context():
+        get_leaderboards().record_best(pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending_scores(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,55 @@
+import time
+
+from flask import current_app
+from flask_mail import Message
+
+
+class RateLimiter:
+    """Spaces calls evenly at ``rate`` per second; a rate of 0 never waits."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+def send_messages(messages, rate=0, on_sent=None):
+    """Send ``(recipient, subject, body, html)`` tuples over one connection.
+
+    ``on_sent`` is called with each recipient once its message is accepted.
+    Returns ``(sent, failed, elapsed_seconds)``.
+    """
+    mail = current_app.extensions["mail"]
+    limiter = RateLimiter(rate)
+    sent = failed = 0
+    started = time.perf_counter()
+    with mail.connect() as conn:
+        for email, subject, body, html in messages:
+            limiter.wait()
+            try:
+                conn.send(
+                    Message(subject=subject, recipients=[email], body=body, html=html)
+                )
+            except Exception as mail_err:
+                failed += 1
+                print(f"Failed to send email to {email}: {mail_err}")
+                continue
+            sent += 1
+            if on_sent is not None:
+                on_sent(email)
+    return sent, failed, time.perf_counter() - started
+
+
+def send_bulk(recipients, subject, body, html, rate=0, on_sent=None):
+    """Send the same pre-rendered message to each recipient over one connection."""
+    return send_messages(
+        ((email, subject, body, html) for email in recipients), rate, on_sent
+    )
@@ -2,7 +2,6 @@ from datetime import datetime
 from flask import Flask, jsonify, request
 from flask_security import (
     Security,
-    SQLAlchemyUserDatastore,
     auth_required,
     roles_required,
     hash_password,
@@ -12,8 +11,15 @@ from flask_mail import Mail
 from models import db, User, Role
 from config import Config
 from routes import init_routes
+from commands import register_commands
+from storage import init_storage
+from http_cache import init_http_cache
+from identity import CachedUserDatastore
+from passwords import init_passwords
+from json_provider import init_json
 
 app = Flask(__name__)
+init_json(app)
 mail = Mail()
 
 from flask_migrate import Migrate
@@ -27,17 +33,28 @@ CORS(
             "origins": ["http://localhost:5173"],  # Vue dev server
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authentication-Token"],
+            "expose_headers": [
+                "X-Next-Cursor",
+                "ETag",
+                "X-Attempt-Number",
+                "X-Attempt-Deadline",
+                "X-Attempt-Remaining",
+            ],
         }
     },
 )
 app.config.from_object(Config)
 
 db.init_app(app)
+init_storage(app, db)
 mail.init_app(app)
-user_datastore = SQLAlchemyUserDatastore(db, User, Role)
+user_datastore = CachedUserDatastore(db, User, Role)
 security = Security(app, user_datastore)
+init_passwords(app)
 
 init_routes(app)
+register_commands(app)
+init_http_cache(app)
 
 with app.app_context():
     db.create_all()
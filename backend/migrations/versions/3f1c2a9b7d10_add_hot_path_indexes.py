@@ -0,0 +1,39 @@
+"""add indexes for route and task access paths
+
+Revision ID: 3f1c2a9b7d10
+Revises: 
+Create Date: 2026-10-18 15:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# main.py still runs db.create_all(), which already creates these indexes on
+# fresh databases, so every operation tolerates the index being present.
+INDEXES = [
+    ('ix_roles_users_user_id', 'roles_users', ['user_id']),
+    ('ix_chapter_subject_id', 'chapter', ['subject_id']),
+    ('ix_quiz_chapter_id', 'quiz', ['chapter_id']),
+    ('ix_quiz_date_of_quiz', 'quiz', ['date_of_quiz']),
+    ('ix_quiz_created_at', 'quiz', ['created_at']),
+    ('ix_question_quiz_id', 'question', ['quiz_id']),
+    ('ix_score_user_id_time_stamp', 'score', ['user_id', 'time_stamp_of_attempt']),
+    ('ix_score_quiz_id', 'score', ['quiz_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
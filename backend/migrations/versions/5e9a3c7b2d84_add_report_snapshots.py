@@ -0,0 +1,71 @@
+"""add monthly report snapshot tables
+
+Revision ID: 5e9a3c7b2d84
+Revises: c4d7e1a2b9f3
+Create Date: 2026-10-18 19:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9a3c7b2d84'
+down_revision = 'c4d7e1a2b9f3'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # db.create_all() in main.py may already have created these tables.
+    existing = _existing_tables()
+    if 'report_period' not in existing:
+        op.create_table(
+            'report_period',
+            sa.Column('period', sa.String(length=7), nullable=False),
+            sa.Column('snapshot_count', sa.Integer(), nullable=False),
+            sa.Column('computed_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('period'),
+        )
+    if 'report_snapshot' not in existing:
+        op.create_table(
+            'report_snapshot',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('period', sa.String(length=7), nullable=False),
+            sa.Column('attempt_count', sa.Integer(), nullable=False),
+            sa.Column('total_scored', sa.Integer(), nullable=False),
+            sa.Column('total_possible', sa.Integer(), nullable=False),
+            sa.Column('average_percentage', sa.Float(), nullable=False),
+            sa.Column('details', sa.Text(), nullable=False),
+            sa.Column('computed_at', sa.DateTime(), nullable=False),
+            sa.Column('delivery_status', sa.String(length=16), nullable=False),
+            sa.Column('delivery_attempts', sa.Integer(), nullable=False),
+            sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+            sa.Column('sent_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('user_id', 'period'),
+        )
+    op.create_index(
+        'ix_report_snapshot_period_status',
+        'report_snapshot',
+        ['period', 'delivery_status'],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    existing = _existing_tables()
+    op.drop_index(
+        'ix_report_snapshot_period_status',
+        table_name='report_snapshot',
+        if_exists=True,
+    )
+    if 'report_snapshot' in existing:
+        op.drop_table('report_snapshot')
+    if 'report_period' in existing:
+        op.drop_table('report_period')
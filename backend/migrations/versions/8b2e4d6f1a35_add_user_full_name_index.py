@@ -0,0 +1,24 @@
+"""add index for admin user name-prefix filter
+
+Revision ID: 8b2e4d6f1a35
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 16:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f1a35'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_full_name', 'user', ['full_name'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_user_full_name', table_name='user', if_exists=True)
@@ -0,0 +1,66 @@
+"""add score histogram table
+
+Revision ID: 9d4b6e2f8a17
+Revises: 5e9a3c7b2d84
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b6e2f8a17'
+down_revision = '5e9a3c7b2d84'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+# Bucket of each score, the same integer arithmetic as histograms.score_bucket.
+SCORE_BUCKETS = """
+    SELECT
+        score.quiz_id AS quiz_id,
+        chapter.subject_id AS subject_id,
+        CASE
+            WHEN score.total_possible <= 0 THEN 0
+            WHEN score.total_scored * 20 / score.total_possible > 19 THEN 19
+            ELSE score.total_scored * 20 / score.total_possible
+        END AS bucket
+    FROM score
+    JOIN quiz ON quiz.id = score.quiz_id
+    JOIN chapter ON chapter.id = quiz.chapter_id
+"""
+
+
+def upgrade():
+    # db.create_all() in main.py may already have created the table, empty
+    # or with counts for new scores only, so it is always rebuilt below.
+    if 'score_histogram' not in _existing_tables():
+        op.create_table(
+            'score_histogram',
+            sa.Column('scope', sa.String(length=16), nullable=False),
+            sa.Column('scope_id', sa.Integer(), nullable=False),
+            sa.Column('bucket', sa.Integer(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('scope', 'scope_id', 'bucket'),
+        )
+    # Same rows as `flask rebuild-histograms` (histograms.rebuild_histograms).
+    op.execute('DELETE FROM score_histogram')
+    for scope, column in (('quiz', 'quiz_id'), ('subject', 'subject_id')):
+        op.execute(
+            f"""
+            INSERT INTO score_histogram (scope, scope_id, bucket, count)
+            SELECT '{scope}', {column}, bucket, count(*)
+            FROM ({SCORE_BUCKETS}) AS buckets
+            GROUP BY {column}, bucket
+            """
+        )
+
+
+def downgrade():
+    if 'score_histogram' in _existing_tables():
+        op.drop_table('score_histogram')
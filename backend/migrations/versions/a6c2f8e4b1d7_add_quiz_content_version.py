@@ -0,0 +1,45 @@
+"""add quiz.content_version
+
+Revision ID: a6c2f8e4b1d7
+Revises: e7a1c5d3f9b2
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c2f8e4b1d7'
+down_revision = 'e7a1c5d3f9b2'
+branch_labels = None
+depends_on = None
+
+
+def _quiz_columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('quiz')}
+
+
+def upgrade():
+    # db.create_all() in main.py may already have created the column with
+    # the table; it never adds one to an existing table.
+    if 'content_version' in _quiz_columns():
+        return
+    with op.batch_alter_table('quiz') as batch_op:
+        batch_op.add_column(
+            sa.Column('content_version', sa.String(length=32), nullable=True)
+        )
+    op.execute(
+        "UPDATE quiz SET content_version = lower(hex(randomblob(16))) "
+        "WHERE content_version IS NULL"
+    )
+    with op.batch_alter_table('quiz') as batch_op:
+        batch_op.alter_column(
+            'content_version', existing_type=sa.String(length=32), nullable=False
+        )
+
+
+def downgrade():
+    if 'content_version' in _quiz_columns():
+        with op.batch_alter_table('quiz') as batch_op:
+            batch_op.drop_column('content_version')
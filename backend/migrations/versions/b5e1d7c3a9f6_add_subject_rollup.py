@@ -0,0 +1,69 @@
+"""add subject_rollup aggregates
+
+Revision ID: b5e1d7c3a9f6
+Revises: f2a9c4e7b3d1
+Create Date: 2026-10-19 12:45:00.000000
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1d7c3a9f6'
+down_revision = 'f2a9c4e7b3d1'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # db.create_all() in main.py may already have created the table, empty
+    # or with rows for new scores only, so it is always rebuilt below.
+    if 'subject_rollup' not in _existing_tables():
+        op.create_table(
+            'subject_rollup',
+            sa.Column('subject_id', sa.Integer(), nullable=False),
+            sa.Column('attempt_count', sa.Integer(), nullable=False),
+            sa.Column('max_percentage', sa.Float(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['subject_id'], ['subject.id']),
+            sa.PrimaryKeyConstraint('subject_id'),
+        )
+    # Same rows as `flask rebuild-subject-rollups` (aggregates.rebuild_subject_rollups).
+    op.execute('DELETE FROM subject_rollup')
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO subject_rollup
+                (subject_id, attempt_count, max_percentage, updated_at)
+            SELECT
+                subject.id,
+                count(score.id),
+                max(
+                    CASE WHEN score.total_possible > 0
+                    THEN CAST(score.total_scored AS FLOAT) * 100.0
+                        / CAST(score.total_possible AS FLOAT)
+                    END
+                ),
+                :now
+            FROM subject
+            LEFT OUTER JOIN chapter ON subject.id = chapter.subject_id
+            LEFT OUTER JOIN quiz ON chapter.id = quiz.chapter_id
+            LEFT OUTER JOIN score ON quiz.id = score.quiz_id
+            GROUP BY subject.id
+            """
+        ).bindparams(
+            sa.bindparam('now', datetime.now(timezone.utc), type_=sa.DateTime())
+        )
+    )
+
+
+def downgrade():
+    if 'subject_rollup' in _existing_tables():
+        op.drop_table('subject_rollup')
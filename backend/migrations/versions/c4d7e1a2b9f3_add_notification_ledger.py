@@ -0,0 +1,90 @@
+"""add notification ledger tables
+
+Revision ID: c4d7e1a2b9f3
+Revises: 8b2e4d6f1a35
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d7e1a2b9f3'
+down_revision = '8b2e4d6f1a35'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # db.create_all() in main.py may already have created these tables.
+    existing = _existing_tables()
+    if 'notification_batch' not in existing:
+        op.create_table(
+            'notification_batch',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=32), nullable=False),
+            sa.Column('status', sa.String(length=16), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+            sa.Column('completed_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    op.create_index(
+        'ix_notification_batch_kind_status',
+        'notification_batch',
+        ['kind', 'status'],
+        unique=False,
+        if_not_exists=True,
+    )
+    if 'quiz_notification' not in existing:
+        op.create_table(
+            'quiz_notification',
+            sa.Column('quiz_id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=32), nullable=False),
+            sa.Column('batch_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['batch_id'], ['notification_batch.id']),
+            sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id']),
+            sa.PrimaryKeyConstraint('quiz_id', 'kind'),
+        )
+    op.create_index(
+        'ix_quiz_notification_batch_id',
+        'quiz_notification',
+        ['batch_id'],
+        unique=False,
+        if_not_exists=True,
+    )
+    if 'notification_delivery' not in existing:
+        op.create_table(
+            'notification_delivery',
+            sa.Column('batch_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('sent_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['batch_id'], ['notification_batch.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('batch_id', 'user_id'),
+        )
+
+
+def downgrade():
+    existing = _existing_tables()
+    if 'notification_delivery' in existing:
+        op.drop_table('notification_delivery')
+    op.drop_index(
+        'ix_quiz_notification_batch_id',
+        table_name='quiz_notification',
+        if_exists=True,
+    )
+    if 'quiz_notification' in existing:
+        op.drop_table('quiz_notification')
+    op.drop_index(
+        'ix_notification_batch_kind_status',
+        table_name='notification_batch',
+        if_exists=True,
+    )
+    if 'notification_batch' in existing:
+        op.drop_table('notification_batch')
@@ -0,0 +1,54 @@
+"""add export job table
+
+Revision ID: d3b8f1a6c0e4
+Revises: a6c2f8e4b1d7
+Create Date: 2026-10-19 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3b8f1a6c0e4'
+down_revision = 'a6c2f8e4b1d7'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # db.create_all() in main.py may already have created the table.
+    if 'export_job' not in _existing_tables():
+        op.create_table(
+            'export_job',
+            sa.Column('id', sa.String(length=32), nullable=False),
+            sa.Column('status', sa.String(length=16), nullable=False),
+            sa.Column('requested_by', sa.Integer(), nullable=True),
+            sa.Column('requested_at', sa.DateTime(), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.Column('total_partitions', sa.Integer(), nullable=True),
+            sa.Column('completed_partitions', sa.Integer(), nullable=False),
+            sa.Column('parts', sa.Integer(), nullable=True),
+            sa.Column('rows', sa.Integer(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['requested_by'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    op.create_index(
+        'ix_export_job_requested_at',
+        'export_job',
+        ['requested_at'],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_export_job_requested_at', table_name='export_job', if_exists=True)
+    if 'export_job' in _existing_tables():
+        op.drop_table('export_job')
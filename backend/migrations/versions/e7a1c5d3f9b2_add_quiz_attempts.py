@@ -0,0 +1,76 @@
+"""add quiz attempts and quiz.max_attempts
+
+Revision ID: e7a1c5d3f9b2
+Revises: 9d4b6e2f8a17
+Create Date: 2026-10-18 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a1c5d3f9b2'
+down_revision = '9d4b6e2f8a17'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _quiz_columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('quiz')}
+
+
+def upgrade():
+    # db.create_all() in main.py may already have created the table; it
+    # never adds columns to an existing one.
+    if 'max_attempts' not in _quiz_columns():
+        # Existing quizzes could be taken any number of times before
+        # attempts were tracked, so they get NULL (unlimited); the app gives
+        # new quizzes 1 unless the admin says otherwise.
+        with op.batch_alter_table('quiz') as batch_op:
+            batch_op.add_column(sa.Column('max_attempts', sa.Integer(), nullable=True))
+    if 'quiz_attempt' not in _existing_tables():
+        op.create_table(
+            'quiz_attempt',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('quiz_id', sa.Integer(), nullable=False),
+            sa.Column('attempt_number', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=16), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=False),
+            sa.Column('deadline', sa.DateTime(), nullable=False),
+            sa.Column('closed_at', sa.DateTime(), nullable=True),
+            sa.Column('answers', sa.Text(), nullable=True),
+            sa.Column('score_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id']),
+            sa.ForeignKeyConstraint(['score_id'], ['score.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint(
+                'user_id', 'quiz_id', 'attempt_number', name='uq_quiz_attempt_number'
+            ),
+        )
+    op.create_index(
+        'ix_quiz_attempt_status_deadline',
+        'quiz_attempt',
+        ['status', 'deadline'],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        'ix_quiz_attempt_status_deadline',
+        table_name='quiz_attempt',
+        if_exists=True,
+    )
+    if 'quiz_attempt' in _existing_tables():
+        op.drop_table('quiz_attempt')
+    if 'max_attempts' in _quiz_columns():
+        with op.batch_alter_table('quiz') as batch_op:
+            batch_op.drop_column('max_attempts')
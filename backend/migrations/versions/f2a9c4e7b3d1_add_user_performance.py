@@ -0,0 +1,59 @@
+"""add user_performance aggregates
+
+Revision ID: f2a9c4e7b3d1
+Revises: d3b8f1a6c0e4
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9c4e7b3d1'
+down_revision = 'd3b8f1a6c0e4'
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # db.create_all() in main.py may already have created the table, empty
+    # or with rows for new scores only, so it is always rebuilt below.
+    if 'user_performance' not in _existing_tables():
+        op.create_table(
+            'user_performance',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('attempt_count', sa.Integer(), nullable=False),
+            sa.Column('percentage_sum', sa.Float(), nullable=False),
+            sa.Column('last_attempt_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('user_id'),
+        )
+    # Same rows as `flask rebuild-user-stats` (aggregates.rebuild_user_performance).
+    op.execute('DELETE FROM user_performance')
+    op.execute(
+        """
+        INSERT INTO user_performance
+            (user_id, attempt_count, percentage_sum, last_attempt_at)
+        SELECT
+            user_id,
+            count(id),
+            sum(
+                CASE WHEN total_possible > 0
+                THEN CAST(total_scored AS FLOAT) * 100.0 / CAST(total_possible AS FLOAT)
+                ELSE 0.0 END
+            ),
+            max(time_stamp_of_attempt)
+        FROM score
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade():
+    if 'user_performance' in _existing_tables():
+        op.drop_table('user_performance')
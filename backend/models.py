@@ -2,13 +2,15 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_security import UserMixin, RoleMixin
 from datetime import datetime, timezone
 import uuid
+from storage import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 roles_users = db.Table(
     "roles_users",
     db.Column("user_id", db.Integer(), db.ForeignKey("user.id")),
     db.Column("role_id", db.Integer(), db.ForeignKey("role.id")),
+    db.Index("ix_roles_users_user_id", "user_id"),
 )
 
 
@@ -18,6 +20,8 @@ class Role(db.Model, RoleMixin):
 
 
 class User(db.Model, UserMixin):
+    __table_args__ = (db.Index("ix_user_full_name", "full_name"),)
+
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(64), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
@@ -35,6 +39,15 @@ class User(db.Model, UserMixin):
         "Role", secondary=roles_users, backref=db.backref("users", lazy="dynamic")
     )
     scores = db.relationship("Score", backref="user", lazy=True)
+    performance = db.relationship(
+        "UserPerformance",
+        backref="user",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+    report_snapshots = db.relationship(
+        "ReportSnapshot", backref="user", lazy=True, cascade="all, delete-orphan"
+    )
 
     def has_role(self, role):
         return self.role == role
@@ -54,6 +67,8 @@ class Subject(db.Model):
 
 
 class Chapter(db.Model):
+    __table_args__ = (db.Index("ix_chapter_subject_id", "subject_id"),)
+
     id = db.Column(db.Integer, primary_key=True)
     subject_id = db.Column(db.Integer, db.ForeignKey("subject.id"), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -62,18 +77,63 @@ class Chapter(db.Model):
 
 
 class Quiz(db.Model):
+    __table_args__ = (
+        db.Index("ix_quiz_chapter_id", "chapter_id"),
+        db.Index("ix_quiz_date_of_quiz", "date_of_quiz"),
+        db.Index("ix_quiz_created_at", "created_at"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     chapter_id = db.Column(db.Integer, db.ForeignKey("chapter.id"), nullable=False)
     date_of_quiz = db.Column(db.DateTime, nullable=False)
     time_duration = db.Column(db.String(5), nullable=False)
+    # None allows any number of attempts; quizzes that predate attempt
+    # tracking were migrated as unlimited. No column default: it would also
+    # replace an explicit None. The admin API defaults new quizzes to 1.
+    max_attempts = db.Column(db.Integer, nullable=True)
+    # Replaced in the same transaction as any edit to the quiz's questions or
+    # start payload; cached answer keys and payloads are keyed by it.
+    content_version = db.Column(
+        db.String(32), nullable=False, default=lambda: uuid.uuid4().hex
+    )
 
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     questions = db.relationship("Question", backref="quiz", lazy=True)
     scores = db.relationship("Score", backref="quiz", lazy=True)
 
+    def _attempts_for(self, user_id):
+        return QuizAttempt.query.filter_by(quiz_id=self.id, user_id=user_id)
+
+    def get_user_attempts(self, user_id):
+        return self._attempts_for(user_id).order_by(QuizAttempt.attempt_number).all()
+
+    def get_latest_attempt(self, user_id):
+        return (
+            self._attempts_for(user_id)
+            .order_by(QuizAttempt.attempt_number.desc())
+            .first()
+        )
+
+    def get_status_for_user(self, user_id):
+        """One of ``not_started``, ``in_progress``, ``available`` or ``completed``."""
+        latest = self.get_latest_attempt(user_id)
+        if latest is None:
+            return "not_started"
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if latest.status == ATTEMPT_IN_PROGRESS and latest.deadline > now:
+            return "in_progress"
+        if (
+            self.max_attempts is not None
+            and latest.attempt_number >= self.max_attempts
+        ):
+            return "completed"
+        return "available"
+
 
 class Question(db.Model):
+    __table_args__ = (db.Index("ix_question_quiz_id", "quiz_id"),)
+
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey("quiz.id"), nullable=False)
     question_statement = db.Column(db.Text, nullable=False)
@@ -86,9 +146,158 @@ class Question(db.Model):
 
 
 class Score(db.Model):
+    __table_args__ = (
+        db.Index("ix_score_user_id_time_stamp", "user_id", "time_stamp_of_attempt"),
+        db.Index("ix_score_quiz_id", "quiz_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     quiz_id = db.Column(db.Integer, db.ForeignKey("quiz.id"), nullable=False)
     time_stamp_of_attempt = db.Column(db.DateTime, nullable=False)
     total_scored = db.Column(db.Integer, nullable=False)
     total_possible = db.Column(db.Integer, nullable=False)
+
+
+ATTEMPT_IN_PROGRESS = "in_progress"
+ATTEMPT_SUBMITTED = "submitted"
+ATTEMPT_EXPIRED = "expired"
+
+
+class QuizAttempt(db.Model):
+    """One sitting of a quiz, from start until it is submitted or expires.
+
+    Answers are autosaved to the attempt store while it runs and only
+    written here when it closes.
+    """
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "quiz_id", "attempt_number", name="uq_quiz_attempt_number"
+        ),
+        db.Index("ix_quiz_attempt_status_deadline", "status", "deadline"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey("quiz.id"), nullable=False)
+    attempt_number = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default=ATTEMPT_IN_PROGRESS)
+    started_at = db.Column(db.DateTime, nullable=False)
+    deadline = db.Column(db.DateTime, nullable=False)
+    closed_at = db.Column(db.DateTime, nullable=True)
+    # JSON of {question_id: option}, set when the attempt closes.
+    answers = db.Column(db.Text, nullable=True)
+    score_id = db.Column(db.Integer, db.ForeignKey("score.id"), nullable=True)
+
+
+class UserPerformance(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    percentage_sum = db.Column(db.Float, nullable=False, default=0.0)
+    last_attempt_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def average_percentage(self):
+        if not self.attempt_count:
+            return 0
+        return self.percentage_sum / self.attempt_count
+
+
+class SubjectRollup(db.Model):
+    subject_id = db.Column(db.Integer, db.ForeignKey("subject.id"), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    max_percentage = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+class ScoreHistogram(db.Model):
+    """Attempt count in one fixed-width percentage bucket of a quiz or subject."""
+
+    scope = db.Column(db.String(16), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class NotificationBatch(db.Model):
+    """One announcement run: the quizzes it claimed and how far sending got."""
+
+    __table_args__ = (
+        db.Index("ix_notification_batch_kind_status", "kind", "status"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="pending")
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    dispatched_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    quizzes = db.relationship("QuizNotification", backref="batch", lazy=True)
+
+
+class QuizNotification(db.Model):
+    """Ledger row claiming a quiz for exactly one batch of a notification kind."""
+
+    __table_args__ = (db.Index("ix_quiz_notification_batch_id", "batch_id"),)
+
+    quiz_id = db.Column(db.Integer, db.ForeignKey("quiz.id"), primary_key=True)
+    kind = db.Column(db.String(32), primary_key=True)
+    batch_id = db.Column(
+        db.Integer, db.ForeignKey("notification_batch.id"), nullable=False
+    )
+
+
+class NotificationDelivery(db.Model):
+    batch_id = db.Column(
+        db.Integer, db.ForeignKey("notification_batch.id"), primary_key=True
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    sent_at = db.Column(db.DateTime, nullable=False)
+
+
+class ReportPeriod(db.Model):
+    """Marks a month whose report snapshots have all been computed."""
+
+    period = db.Column(db.String(7), primary_key=True)
+    snapshot_count = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+
+class ReportSnapshot(db.Model):
+    __table_args__ = (
+        db.Index("ix_report_snapshot_period_status", "period", "delivery_status"),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    period = db.Column(db.String(7), primary_key=True)
+    attempt_count = db.Column(db.Integer, nullable=False)
+    total_scored = db.Column(db.Integer, nullable=False)
+    total_possible = db.Column(db.Integer, nullable=False)
+    average_percentage = db.Column(db.Float, nullable=False)
+    # JSON list of the month's attempts, as rendered into the email.
+    details = db.Column(db.Text, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+    delivery_status = db.Column(db.String(16), nullable=False, default="pending")
+    delivery_attempts = db.Column(db.Integer, nullable=False, default=0)
+    dispatched_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+
+class ExportJob(db.Model):
+    """A bulk score export, shared by the web app and the Celery workers."""
+
+    __table_args__ = (db.Index("ix_export_job_requested_at", "requested_at"),)
+
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(16), nullable=False, default="queued")
+    requested_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    requested_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    total_partitions = db.Column(db.Integer, nullable=True)
+    completed_partitions = db.Column(db.Integer, nullable=False, default=0)
+    parts = db.Column(db.Integer, nullable=True)
+    rows = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
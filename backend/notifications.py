@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from models import (
+    NotificationBatch,
+    NotificationDelivery,
+    Quiz,
+    QuizNotification,
+    db,
+)
+
+NEW_QUIZ = "new_quiz"
+
+
+def claim_new_quizzes(kind, lookback):
+    """Open a batch for recent quizzes not yet claimed for ``kind``.
+
+    The (quiz, kind) primary key makes the claim exactly-once: if another
+    run claims the same quiz first, the insert fails and this returns None.
+    """
+    unclaimed = (
+        db.session.query(Quiz.id)
+        .filter(
+            Quiz.created_at >= datetime.now(timezone.utc) - lookback,
+            ~db.session.query(QuizNotification)
+            .filter(QuizNotification.quiz_id == Quiz.id, QuizNotification.kind == kind)
+            .exists(),
+        )
+        .all()
+    )
+    if not unclaimed:
+        return None
+
+    batch = NotificationBatch(kind=kind)
+    db.session.add(batch)
+    try:
+        db.session.flush()
+        db.session.add_all(
+            QuizNotification(quiz_id=quiz_id, kind=kind, batch_id=batch.id)
+            for quiz_id, in unclaimed
+        )
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        print(f"Quizzes for {kind} notification were claimed by another run.")
+        return None
+    return batch
+
+
+def stale_batches(kind, older_than):
+    """Batches a crashed or lost run left unfinished, oldest first."""
+    cutoff = datetime.now(timezone.utc) - older_than
+    return (
+        NotificationBatch.query.filter(
+            NotificationBatch.kind == kind,
+            NotificationBatch.status.in_(("pending", "sending")),
+            func.coalesce(
+                NotificationBatch.dispatched_at, NotificationBatch.created_at
+            )
+            < cutoff,
+        )
+        .order_by(NotificationBatch.id)
+        .all()
+    )
+
+
+def batch_quizzes(batch):
+    quiz_ids = [entry.quiz_id for entry in batch.quizzes]
+    return Quiz.query.filter(Quiz.id.in_(quiz_ids)).order_by(Quiz.id).all()
+
+
+def mark_dispatched(batch):
+    batch.status = "sending"
+    batch.dispatched_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def mark_completed(batch_id, failed=0):
+    """Close a batch; ones with failed recipients are kept as "partial"."""
+    batch = db.session.get(NotificationBatch, batch_id)
+    if batch is not None:
+        batch.status = "partial" if failed else "sent"
+        batch.completed_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+
+def delivered_user_ids(batch_id, user_ids):
+    return {
+        user_id
+        for user_id, in db.session.query(NotificationDelivery.user_id).filter(
+            NotificationDelivery.batch_id == batch_id,
+            NotificationDelivery.user_id.in_(user_ids),
+        )
+    }
+
+
+class DeliveryRecorder:
+    """Records per-recipient deliveries, committing every ``every`` sends.
+
+    A crash can resend at most the uncommitted tail of a chunk.
+    """
+
+    def __init__(self, batch_id, every=50):
+        self.batch_id = batch_id
+        self.every = every
+        self._pending = 0
+
+    def __call__(self, user_id):
+        db.session.add(
+            NotificationDelivery(
+                batch_id=self.batch_id,
+                user_id=user_id,
+                sent_at=datetime.now(timezone.utc),
+            )
+        )
+        self._pending += 1
+        if self._pending >= self.every:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            db.session.commit()
+            self._pending = 0
+
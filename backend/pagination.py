@@ -0,0 +1,91 @@
+import base64
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import and_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    raw = "|".join(
+        value.isoformat() if isinstance(value, datetime) else str(value)
+        for value in values
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, *types):
+    """Decode a cursor produced by ``encode_cursor`` into values of ``types``."""
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if len(parts) != len(types):
+            raise InvalidCursor(cursor)
+        return [
+            datetime.fromisoformat(part) if kind is datetime else kind(part)
+            for kind, part in zip(types, parts)
+        ]
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def page_requested():
+    # Callers that never follow X-Next-Cursor (the SPA) send neither, and
+    # get the whole list.
+    return "limit" in request.args or "cursor" in request.args
+
+
+def get_page_size(default=50, maximum=200):
+    try:
+        limit = int(request.args.get("limit", default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def set_next_cursor(response, cursor):
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return response
+
+
+def parse_fields(allowed):
+    """Return the ``fields=`` subset of ``allowed`` requested, or all of them."""
+    raw = request.args.get("fields")
+    if not raw:
+        return list(allowed)
+    fields = [field.strip() for field in raw.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise InvalidFields(", ".join(unknown))
+    return fields
+
+
+def prefix_match(column, prefix):
+    # A range instead of LIKE so SQLite can use the column's index.
+    return and_(column >= prefix, column < prefix + "\U0010ffff")
+
+
+def keyset_page(query, id_column, limit):
+    """Return one page of ``query`` ordered by ``id_column`` and the next cursor.
+
+    A ``limit`` of None returns every row and no cursor.
+    """
+    cursor = request.args.get("cursor")
+    if cursor:
+        (after_id,) = decode_cursor(cursor, int)
+        query = query.filter(id_column > after_id)
+    query = query.order_by(id_column)
+    if limit is None:
+        return query.all(), None
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(getattr(rows[-1], id_column.key))
@@ -0,0 +1,120 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from flask_security.utils import get_hmac
+from passlib.context import CryptContext
+
+# Set in each worker process from the app's CryptContext.
+_worker_context = None
+
+
+class PasswordPoolBusy(Exception):
+    """Every verification slot stayed taken for the whole queue timeout."""
+
+
+def _init_worker(context):
+    global _worker_context
+    _worker_context = CryptContext.from_string(context)
+
+
+def _verify(secret, password_hash, context=None):
+    context = context or _worker_context
+    return context.verify(secret, password_hash), context.needs_update(password_hash)
+
+
+def _hash(secret, context=None):
+    return (context or _worker_context).hash(secret)
+
+
+class PasswordPool:
+    """Runs password hashing in worker processes, ``max_pending`` at a time.
+
+    With ``workers=0`` the work runs on the calling thread, still bounded
+    by the same slots.
+    """
+
+    def __init__(self, context, workers, max_pending, queue_timeout):
+        self.context = context
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.context.to_string(),),
+                )
+            return self._executor
+
+    def _call(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordPoolBusy()
+        try:
+            if not self.workers:
+                return fn(*args, context=self.context)
+            executor = self._get_executor()
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                raise
+        finally:
+            self._slots.release()
+
+    def verify(self, secret, password_hash):
+        return self._call(_verify, secret, password_hash)
+
+    def hash(self, secret):
+        return self._call(_hash, secret)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+def _secret(password, scheme):
+    """The value Flask-Security feeds the hash: HMAC'd unless single-hashed."""
+    single_hash = current_app.config["SECURITY_PASSWORD_SINGLE_HASH"] or {"plaintext"}
+    if single_hash is True or scheme in single_hash:
+        return password
+    secret = get_hmac(password)
+    return secret[:72] if scheme == "bcrypt" else secret
+
+
+def check_password(password, password_hash):
+    """Return ``(verified, needs_update)`` for a stored hash.
+
+    ``needs_update`` is true when the hash uses a deprecated scheme or
+    different cost parameters than the configured ones. Raises
+    PasswordPoolBusy when no slot frees up in time.
+    """
+    pool = current_app.extensions["password_pool"]
+    scheme = pool.context.identify(password_hash)
+    return pool.verify(_secret(password, scheme), password_hash)
+
+
+def rehash_password(password):
+    """Hash with the configured scheme and cost, off the request thread."""
+    pool = current_app.extensions["password_pool"]
+    return pool.hash(_secret(password, current_app.config["SECURITY_PASSWORD_HASH"]))
+
+
+def init_passwords(app):
+    """Create the app's password pool; call after Flask-Security is set up."""
+    app.extensions["password_pool"] = PasswordPool(
+        app.extensions["security"].pwd_context,
+        app.config["PASSWORD_VERIFY_WORKERS"],
+        app.config["PASSWORD_VERIFY_MAX_PENDING"],
+        app.config["PASSWORD_VERIFY_QUEUE_TIMEOUT"],
+    )
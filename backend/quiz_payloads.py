@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import defaultdict
+
+from cache import get_cache
+from grading import quiz_content_version
+from models import Question, Quiz, db
+
+START_PAYLOAD_TIMEOUT = 24 * 60 * 60
+
+# quiz_id -> (content version, etag, gzipped body), checked against the
+# quiz row so an edit made through any worker is picked up.
+_local_payloads = {}
+_build_locks = defaultdict(threading.Lock)
+
+
+def _build_start_payload(quiz_id):
+    time_duration = (
+        db.session.query(Quiz.time_duration).filter(Quiz.id == quiz_id).scalar()
+    )
+    if time_duration is None:
+        return None
+    questions = (
+        db.session.query(
+            Question.id,
+            Question.question_statement,
+            Question.option1,
+            Question.option2,
+            Question.option3,
+            Question.option4,
+        )
+        .filter(Question.quiz_id == quiz_id)
+        .order_by(Question.id)
+        .all()
+    )
+    body = json.dumps(
+        {
+            "quiz_id": quiz_id,
+            "time_duration": time_duration,
+            "questions": [
+                {"id": qid, "question": statement, "options": list(options)}
+                for qid, statement, *options in questions
+            ],
+        },
+        separators=(",", ":"),
+        sort_keys=True,
+    ).encode()
+    return hashlib.sha256(body).hexdigest()[:32], gzip.compress(body, mtime=0)
+
+
+def get_start_payload(quiz_id):
+    """Return ``(etag, gzipped JSON)`` for a quiz's start payload, or None.
+
+    Built once per content version of the quiz: concurrent misses in this
+    process wait on one build, and other processes read it from the shared
+    cache.
+    """
+    version = quiz_content_version(quiz_id)
+    if version is None:
+        return None
+    local = _local_payloads.get(quiz_id)
+    if local and local[0] == version:
+        return local[1], local[2]
+
+    with _build_locks[quiz_id]:
+        local = _local_payloads.get(quiz_id)
+        if local and local[0] == version:
+            return local[1], local[2]
+
+        cache = get_cache()
+        cache_key = f"start_payload:{quiz_id}:{version}"
+        raw = cache.get(cache_key)
+        if raw is not None:
+            etag, body = raw.split(b"\n", 1)
+            etag = etag.decode()
+        else:
+            built = _build_start_payload(quiz_id)
+            if built is None:
+                return None
+            etag, body = built
+            cache.set(cache_key, etag.encode() + b"\n" + body, START_PAYLOAD_TIMEOUT)
+
+        _local_payloads[quiz_id] = (version, etag, body)
+        return etag, body
@@ -0,0 +1,216 @@
+import json
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+
+from sqlalchemy import or_
+
+from models import (
+    Chapter,
+    Quiz,
+    ReportPeriod,
+    ReportSnapshot,
+    Role,
+    Score,
+    Subject,
+    User,
+    db,
+)
+
+SNAPSHOT_INSERT_BATCH = 500
+
+
+def period_label(period):
+    return datetime.strptime(period, "%Y-%m").strftime("%B %Y")
+
+
+def previous_month(today):
+    """``(period, start, end)`` of the last complete month before ``today``."""
+    last_day = today.replace(day=1) - timedelta(days=1)
+    start_date = datetime(last_day.year, last_day.month, 1, tzinfo=timezone.utc)
+    end_date = datetime(
+        last_day.year, last_day.month, last_day.day, 23, 59, 59, tzinfo=timezone.utc
+    )
+    return start_date.strftime("%Y-%m"), start_date, end_date
+
+
+def iter_monthly_report_payloads(start_date, end_date):
+    """Group one month of scores into ``(user_id, attempts)`` pairs.
+
+    A single query streams every active student's scores for the month in
+    ``(user, attempt time)`` order, so each payload is complete as soon as
+    the next user's rows begin.
+    """
+    student_role = Role.query.filter_by(name="student").first()
+    if not student_role:
+        return
+    rows = (
+        db.session.query(
+            User.id,
+            Score.quiz_id,
+            Score.total_scored,
+            Score.total_possible,
+            Score.time_stamp_of_attempt,
+            Chapter.name,
+            Subject.name,
+        )
+        .join(Score, Score.user_id == User.id)
+        .outerjoin(Quiz, Score.quiz_id == Quiz.id)
+        .outerjoin(Chapter, Quiz.chapter_id == Chapter.id)
+        .outerjoin(Subject, Chapter.subject_id == Subject.id)
+        .filter(
+            User.roles.any(id=student_role.id),
+            User.active == True,
+            User.email.isnot(None),
+            Score.time_stamp_of_attempt >= start_date,
+            Score.time_stamp_of_attempt <= end_date,
+        )
+        .order_by(User.id, Score.time_stamp_of_attempt)
+        .execution_options(yield_per=1000)
+    )
+    for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+        attempts = [
+            {
+                "quiz_name": f"{subject_name} - {chapter_name}"
+                if subject_name is not None
+                else f"Quiz ID {quiz_id}",
+                "attempted_at": attempted_at.strftime("%Y-%m-%d %H:%M:%S %Z"),
+                "total_scored": scored,
+                "total_possible": possible,
+            }
+            for _, quiz_id, scored, possible, attempted_at, chapter_name, subject_name in user_rows
+        ]
+        yield user_id, attempts
+
+
+def _snapshot_row(user_id, period, attempts, computed_at):
+    total_scored = sum(a["total_scored"] for a in attempts)
+    total_possible = sum(a["total_possible"] for a in attempts)
+    return {
+        "user_id": user_id,
+        "period": period,
+        "attempt_count": len(attempts),
+        "total_scored": total_scored,
+        "total_possible": total_possible,
+        "average_percentage": round(total_scored / total_possible * 100, 2)
+        if total_possible > 0
+        else 0,
+        "details": json.dumps(attempts),
+        "computed_at": computed_at,
+        "delivery_status": "pending",
+        "delivery_attempts": 0,
+    }
+
+
+def compute_report_snapshots(period, start_date, end_date):
+    """Store a snapshot for every student active in ``period`` that lacks one.
+
+    Runs as one transaction that also records the ReportPeriod marker, so an
+    interrupted run leaves nothing behind and the next one starts over. A
+    month that has not ended yet is refused, since its marker would freeze
+    a partial snapshot.
+    """
+    if end_date >= datetime.now(timezone.utc):
+        raise ValueError(f"Report period {period} has not ended yet")
+    existing = {
+        user_id
+        for user_id, in db.session.query(ReportSnapshot.user_id).filter(
+            ReportSnapshot.period == period
+        )
+    }
+    computed_at = datetime.now(timezone.utc)
+    insert = ReportSnapshot.__table__.insert()
+    created = 0
+    batch = []
+    for user_id, attempts in iter_monthly_report_payloads(start_date, end_date):
+        if user_id in existing:
+            continue
+        batch.append(_snapshot_row(user_id, period, attempts, computed_at))
+        if len(batch) >= SNAPSHOT_INSERT_BATCH:
+            db.session.execute(insert, batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert, batch)
+        created += len(batch)
+
+    db.session.add(
+        ReportPeriod(
+            period=period,
+            snapshot_count=len(existing) + created,
+            computed_at=computed_at,
+        )
+    )
+    db.session.commit()
+    return created
+
+
+def claim_undelivered_snapshots(period, resume_after, max_attempts):
+    """Claim snapshots still to be emailed and return their user ids.
+
+    Snapshots dispatched less than ``resume_after`` ago are left to the run
+    that claimed them; ones that failed ``max_attempts`` times are given up.
+    """
+    now = datetime.now(timezone.utc)
+    claimable = (
+        ReportSnapshot.period == period,
+        ReportSnapshot.delivery_status.in_(("pending", "failed")),
+        ReportSnapshot.delivery_attempts < max_attempts,
+        or_(
+            ReportSnapshot.dispatched_at.is_(None),
+            ReportSnapshot.dispatched_at <= now - resume_after,
+        ),
+    )
+    user_ids = [
+        user_id
+        for user_id, in db.session.query(ReportSnapshot.user_id)
+        .filter(*claimable)
+        .order_by(ReportSnapshot.user_id)
+    ]
+    if user_ids:
+        ReportSnapshot.query.filter(
+            ReportSnapshot.period == period, ReportSnapshot.user_id.in_(user_ids)
+        ).update(
+            {
+                ReportSnapshot.dispatched_at: now,
+                ReportSnapshot.delivery_attempts: ReportSnapshot.delivery_attempts + 1,
+            },
+            synchronize_session=False,
+        )
+    db.session.commit()
+    return user_ids
+
+
+def record_snapshot_deliveries(period, user_ids, sent_user_ids):
+    """Mark a chunk's emailed snapshots sent and the rest failed, in one commit."""
+    sent_user_ids = set(sent_user_ids)
+    unsent = [user_id for user_id in user_ids if user_id not in sent_user_ids]
+    in_period = ReportSnapshot.query.filter(ReportSnapshot.period == period)
+    if sent_user_ids:
+        in_period.filter(ReportSnapshot.user_id.in_(sent_user_ids)).update(
+            {
+                ReportSnapshot.delivery_status: "sent",
+                ReportSnapshot.sent_at: datetime.now(timezone.utc),
+            },
+            synchronize_session=False,
+        )
+    if unsent:
+        in_period.filter(
+            ReportSnapshot.user_id.in_(unsent),
+            ReportSnapshot.delivery_status != "sent",
+        ).update({ReportSnapshot.delivery_status: "failed"}, synchronize_session=False)
+    db.session.commit()
+
+
+def snapshot_summary(snapshot, include_details=False):
+    summary = {
+        "period": snapshot.period,
+        "label": period_label(snapshot.period),
+        "attempts": snapshot.attempt_count,
+        "total_scored": snapshot.total_scored,
+        "total_possible": snapshot.total_possible,
+        "average_percentage": snapshot.average_percentage,
+        "computed_at": snapshot.computed_at.isoformat(),
+    }
+    if include_details:
+        summary["details"] = json.loads(snapshot.details)
+    return summary
@@ -1,22 +1,92 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, abort, send_from_directory
 from flask_security import auth_required, roles_required
-from models import Subject, Chapter, Quiz, Question, db, User, Score
-from datetime import datetime
-from sqlalchemy import func, desc, cast, Float
+from models import Subject, Chapter, Quiz, Question, db, User, Role, Score, SubjectRollup
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, desc, cast, Float, null
+from storage import read_only
+from cache import cached, invalidate
+from grading import touch_quiz_content
+from http_cache import conditional, namespace_version
+from activity import merge_pending_activity
+from attempts import parse_duration
+from identity import invalidate_identity
+from serializers import (
+    CHAPTER_COLUMNS,
+    QUESTION_COLUMNS,
+    QUIZ_COLUMNS,
+    SUBJECT_COLUMNS,
+    USER_COLUMNS,
+    chapter_to_dict,
+    question_to_dict,
+    quiz_to_dict,
+    subject_to_dict,
+    user_to_dict,
+)
+from importers import QuestionImporter, detect_format, iter_rows
+from exports import create_export_job, export_job_dir, get_export_job
+from tasks import export_all_scores
+import io
+import re
+import uuid
+from pagination import (
+    InvalidCursor,
+    InvalidFields,
+    get_page_size,
+    keyset_page,
+    page_requested,
+    parse_fields,
+    prefix_match,
+    set_next_cursor,
+)
 
 admin_bp = Blueprint("admin", __name__)
 
+def _list_page(columns, id_column, serialize, *criteria, fields=None, merge=None):
+    """One keyset page of ``columns`` rows as a JSON list, honouring ``fields=``.
+
+    Without ``limit=`` or ``cursor=`` the whole list is returned. Columns
+    outside ``fields=`` are selected as NULL, so unrequested subqueries never
+    run and the serializer still sees every key. ``merge`` may adjust the
+    serialized page before fields are picked.
+    """
+    allowed = [column.key for column in columns]
+    try:
+        if fields is None:
+            fields = parse_fields(allowed)
+        selected = [
+            column
+            if column.key in fields or column.key == id_column.key
+            else null().label(column.key)
+            for column in columns
+        ]
+        rows, next_cursor = keyset_page(
+            db.session.query(*selected).filter(*criteria),
+            id_column,
+            get_page_size(default=100, maximum=500) if page_requested() else None,
+        )
+    except InvalidFields as e:
+        return jsonify({"error": f"Unknown fields: {e}"}), 400
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    items = [serialize(row) for row in rows]
+    if merge is not None:
+        items = merge(items)
+    if len(fields) != len(allowed):
+        items = [{field: item[field] for field in fields} for item in items]
+    return set_next_cursor(jsonify(items), next_cursor)
+
 
 @admin_bp.route("/subjects", methods=["GET", "POST"])
 @admin_bp.route("/subjects/<int:id>", methods=["PUT", "DELETE"])
 @auth_required()
 @roles_required("admin")
+@conditional(namespace_version("subjects"))
+@cached("subjects")
+@read_only
 def manage_subjects(id=None):
     if request.method == "GET":
-        subjects = Subject.query.all()
-        return jsonify(
-            [{"id": subject.id, "name": subject.name} for subject in subjects]
-        )
+        return _list_page(SUBJECT_COLUMNS, Subject.id, subject_to_dict)
 
     elif request.method == "POST":
         data = request.get_json()
@@ -27,7 +97,8 @@ def manage_subjects(id=None):
         db.session.add(subject)
         try:
             db.session.commit()
-            return jsonify({"id": subject.id, "name": subject.name}), 201
+            invalidate("subjects")
+            return jsonify(subject_to_dict(subject)), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": "Subject name must be unique"}), 400
@@ -41,7 +112,8 @@ def manage_subjects(id=None):
         subject.name = data["name"]
         try:
             db.session.commit()
-            return jsonify({"id": subject.id, "name": subject.name})
+            invalidate("subjects")
+            return jsonify(subject_to_dict(subject))
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": "Subject name must be unique"}), 400
@@ -51,6 +123,7 @@ def manage_subjects(id=None):
         try:
             db.session.delete(subject)
             db.session.commit()
+            invalidate("subjects")
             return "", 204
         except Exception as e:
             db.session.rollback()
@@ -63,18 +136,16 @@ def manage_subjects(id=None):
 @admin_bp.route("/chapters/<int:id>", methods=["PUT", "DELETE"])
 @auth_required()
 @roles_required("admin")
+@conditional(namespace_version("chapters"))
+@cached("chapters")
+@read_only
 def manage_chapters(subject_id=None, id=None):
     if request.method == "GET":
-        chapters = Chapter.query.filter_by(subject_id=subject_id).all()
-        return jsonify(
-            [
-                {
-                    "id": chapter.id,
-                    "name": chapter.name,
-                    "subject_id": chapter.subject_id,
-                }
-                for chapter in chapters
-            ]
+        return _list_page(
+            CHAPTER_COLUMNS,
+            Chapter.id,
+            chapter_to_dict,
+            Chapter.subject_id == subject_id,
         )
 
     elif request.method == "POST":
@@ -88,13 +159,8 @@ def manage_chapters(subject_id=None, id=None):
         db.session.add(chapter)
         try:
             db.session.commit()
-            return jsonify(
-                {
-                    "id": chapter.id,
-                    "name": chapter.name,
-                    "subject_id": chapter.subject_id,
-                }
-            ), 201
+            invalidate("chapters")
+            return jsonify(chapter_to_dict(chapter)), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": "Error creating chapter"}), 400
@@ -108,13 +174,8 @@ def manage_chapters(subject_id=None, id=None):
         chapter.name = data["name"]
         try:
             db.session.commit()
-            return jsonify(
-                {
-                    "id": chapter.id,
-                    "name": chapter.name,
-                    "subject_id": chapter.subject_id,
-                }
-            )
+            invalidate("chapters")
+            return jsonify(chapter_to_dict(chapter))
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": "Error updating chapter"}), 400
@@ -124,6 +185,7 @@ def manage_chapters(subject_id=None, id=None):
         try:
             db.session.delete(chapter)
             db.session.commit()
+            invalidate("chapters")
             return "", 204
         except Exception as e:
             db.session.rollback()
@@ -132,24 +194,33 @@ def manage_chapters(subject_id=None, id=None):
             ), 400
 
 
+def _invalid_quiz_settings(data):
+    if "time_duration" in data:
+        try:
+            if parse_duration(data["time_duration"]) <= timedelta(0):
+                raise ValueError
+        except (AttributeError, ValueError):
+            return "Time duration must be a positive HH:MM"
+    if "max_attempts" in data:
+        max_attempts = data["max_attempts"]
+        if max_attempts is not None and (
+            type(max_attempts) is not int or max_attempts < 1
+        ):
+            return "Max attempts must be a positive integer or null"
+    return None
+
+
 @admin_bp.route("/chapters/<int:chapter_id>/quizzes", methods=["GET", "POST"])
 @admin_bp.route("/quizzes/<int:id>", methods=["PUT", "DELETE"])
 @auth_required()
 @roles_required("admin")
+@conditional(namespace_version("quizzes"))
+@cached("quizzes")
+@read_only
 def manage_quizzes(chapter_id=None, id=None):
     if request.method == "GET":
-        quizzes = Quiz.query.filter_by(chapter_id=chapter_id).all()
-        return jsonify(
-            [
-                {
-                    "id": quiz.id,
-                    "chapter_id": quiz.chapter_id,
-                    "date_of_quiz": quiz.date_of_quiz.isoformat(),
-                    "time_duration": quiz.time_duration,
-                    "created_at": quiz.created_at.isoformat(),
-                }
-                for quiz in quizzes
-            ]
+        return _list_page(
+            QUIZ_COLUMNS, Quiz.id, quiz_to_dict, Quiz.chapter_id == chapter_id
         )
 
     elif request.method == "POST":
@@ -158,6 +229,9 @@ def manage_quizzes(chapter_id=None, id=None):
             return jsonify(
                 {"error": "Date of quiz and time duration are required"}
             ), 400
+        error = _invalid_quiz_settings(data)
+        if error:
+            return jsonify({"error": error}), 400
 
         chapter = Chapter.query.get_or_404(chapter_id)
 
@@ -166,18 +240,12 @@ def manage_quizzes(chapter_id=None, id=None):
                 chapter_id=chapter_id,
                 date_of_quiz=datetime.fromisoformat(data["date_of_quiz"]),
                 time_duration=data["time_duration"],
+                max_attempts=data.get("max_attempts", 1),
             )
             db.session.add(quiz)
             db.session.commit()
-            return jsonify(
-                {
-                    "id": quiz.id,
-                    "chapter_id": quiz.chapter_id,
-                    "date_of_quiz": quiz.date_of_quiz.isoformat(),
-                    "time_duration": quiz.time_duration,
-                    "created_at": quiz.created_at.isoformat(),
-                }
-            ), 201
+            invalidate("quizzes")
+            return jsonify(quiz_to_dict(quiz)), 201
         except ValueError:
             return jsonify({"error": "Invalid date format"}), 400
         except Exception as e:
@@ -189,6 +257,10 @@ def manage_quizzes(chapter_id=None, id=None):
         if not data:
             return jsonify({"error": "No data provided"}), 400
 
+        error = _invalid_quiz_settings(data)
+        if error:
+            return jsonify({"error": error}), 400
+
         quiz = Quiz.query.get_or_404(id)
 
         try:
@@ -196,17 +268,15 @@ def manage_quizzes(chapter_id=None, id=None):
                 quiz.date_of_quiz = datetime.fromisoformat(data["date_of_quiz"])
             if "time_duration" in data:
                 quiz.time_duration = data["time_duration"]
+            # Running attempts keep the deadline they started with.
+            if "max_attempts" in data:
+                quiz.max_attempts = data["max_attempts"]
+            # time_duration is part of the cached start payload.
+            touch_quiz_content(id)
 
             db.session.commit()
-            return jsonify(
-                {
-                    "id": quiz.id,
-                    "chapter_id": quiz.chapter_id,
-                    "date_of_quiz": quiz.date_of_quiz.isoformat(),
-                    "time_duration": quiz.time_duration,
-                    "created_at": quiz.created_at.isoformat(),
-                }
-            )
+            invalidate("quizzes")
+            return jsonify(quiz_to_dict(quiz))
         except ValueError:
             return jsonify({"error": "Invalid date format"}), 400
         except Exception as e:
@@ -218,6 +288,7 @@ def manage_quizzes(chapter_id=None, id=None):
         try:
             db.session.delete(quiz)
             db.session.commit()
+            invalidate("quizzes")
             return "", 204
         except Exception as e:
             print(e)
@@ -231,23 +302,12 @@ def manage_quizzes(chapter_id=None, id=None):
 @admin_bp.route("/questions/<int:id>", methods=["PUT", "DELETE"])
 @auth_required()
 @roles_required("admin")
+@conditional(namespace_version("questions"))
+@read_only
 def manage_questions(quiz_id=None, id=None):
     if request.method == "GET":
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-        return jsonify(
-            [
-                {
-                    "id": question.id,
-                    "quiz_id": question.quiz_id,
-                    "question_statement": question.question_statement,
-                    "option1": question.option1,
-                    "option2": question.option2,
-                    "option3": question.option3,
-                    "option4": question.option4,
-                    "correct_option": question.correct_option,
-                }
-                for question in questions
-            ]
+        return _list_page(
+            QUESTION_COLUMNS, Question.id, question_to_dict, Question.quiz_id == quiz_id
         )
 
     elif request.method == "POST":
@@ -279,19 +339,10 @@ def manage_questions(quiz_id=None, id=None):
         )
         db.session.add(question)
         try:
+            touch_quiz_content(quiz_id)
             db.session.commit()
-            return jsonify(
-                {
-                    "id": question.id,
-                    "quiz_id": question.quiz_id,
-                    "question_statement": question.question_statement,
-                    "option1": question.option1,
-                    "option2": question.option2,
-                    "option3": question.option3,
-                    "option4": question.option4,
-                    "correct_option": question.correct_option,
-                }
-            ), 201
+            invalidate("questions")
+            return jsonify(question_to_dict(question)), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": "Error creating question"}), 400
@@ -317,53 +368,90 @@ def manage_questions(quiz_id=None, id=None):
             ]:
                 if field in data:
                     setattr(question, field, data[field])
+            touch_quiz_content(question.quiz_id)
 
             db.session.commit()
-            return jsonify(
-                {
-                    "id": question.id,
-                    "quiz_id": question.quiz_id,
-                    "question_statement": question.question_statement,
-                    "option1": question.option1,
-                    "option2": question.option2,
-                    "option3": question.option3,
-                    "option4": question.option4,
-                    "correct_option": question.correct_option,
-                }
-            )
+            invalidate("questions")
+            return jsonify(question_to_dict(question))
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": "Error updating question"}), 400
 
     elif request.method == "DELETE":
         question = Question.query.get_or_404(id)
+        quiz_id = question.quiz_id
         try:
             db.session.delete(question)
+            touch_quiz_content(quiz_id)
             db.session.commit()
+            invalidate("questions")
             return "", 204
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": "Error deleting question"}), 400
 
 
+@admin_bp.route("/quizzes/<int:quiz_id>/questions/import", methods=["POST"])
+@admin_bp.route("/questions/import", methods=["POST"])
+@auth_required()
+@roles_required("admin")
+def import_questions(quiz_id=None):
+    if quiz_id is not None:
+        Quiz.query.get_or_404(quiz_id)
+
+    upload = request.files.get("file")
+    if upload:
+        stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    else:
+        stream = io.BufferedReader(request.stream)
+        filename, content_type = None, request.mimetype
+
+    fmt = detect_format(content_type, filename, request.args.get("format"))
+    if fmt is None:
+        return jsonify({"error": "Upload must be CSV or JSON Lines"}), 400
+
+    importer = QuestionImporter(
+        quiz_id=quiz_id,
+        batch_size=current_app.config["QUESTION_IMPORT_BATCH_SIZE"],
+    )
+    try:
+        for number, row, error in iter_rows(stream, fmt):
+            importer.add(number, row, error)
+        importer.flush()
+        if importer.touched_quiz_ids:
+            touch_quiz_content(*importer.touched_quiz_ids)
+        db.session.commit()
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({"error": "Upload must be UTF-8 encoded"}), 400
+    except Exception as e:
+        print(f"Error importing questions: {e}")
+        db.session.rollback()
+        return jsonify({"error": "Error importing questions"}), 400
+
+    if importer.inserted:
+        invalidate("questions")
+    return jsonify(importer.report()), 201 if importer.inserted else 200
+
+
 @admin_bp.route("/users", methods=["GET"])
 @auth_required()
 @roles_required("admin")
+@read_only
 def list_users():
-    users = User.query.all()
-    return jsonify(
-        [
-            {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.full_name,
-                "qualification": user.qualification,
-                "active": user.active,
-                "roles": [role.name for role in user.roles],
-                "created_at": user.created_at.isoformat(),
-            }
-            for user in users
-        ]
+    criteria = []
+    active = request.args.get("active")
+    if active is not None:
+        criteria.append(User.active == (active.lower() in ("1", "true")))
+    if request.args.get("role"):
+        criteria.append(User.roles.any(Role.name == request.args["role"]))
+    if request.args.get("email"):
+        criteria.append(prefix_match(User.email, request.args["email"]))
+    if request.args.get("name"):
+        criteria.append(prefix_match(User.full_name, request.args["name"]))
+
+    return _list_page(
+        USER_COLUMNS, User.id, user_to_dict, *criteria, merge=merge_pending_activity
     )
 
 
@@ -381,6 +469,7 @@ def toggle_user_active(id):
     user.active = not user.active
     try:
         db.session.commit()
+        invalidate_identity(user.fs_uniquifier)
         return jsonify({"id": user.id, "email": user.email, "active": user.active})
     except Exception as e:
         db.session.rollback()
@@ -398,9 +487,11 @@ def delete_user(id):
     if user.id == current_user.id:
         return jsonify({"error": "Cannot delete your own account"}), 400
 
+    fs_uniquifier = user.fs_uniquifier
     try:
         db.session.delete(user)
         db.session.commit()
+        invalidate_identity(fs_uniquifier)
         return "", 204
     except Exception as e:
         db.session.rollback()
@@ -409,50 +500,139 @@ def delete_user(id):
 @admin_bp.route("/stats/subject-summary", methods=["GET"])
 @auth_required()
 @roles_required("admin")
+@read_only
 def get_subject_summary_stats():
     try:
-        top_scores_query = db.session.query(
-            Subject.name.label('subject_name'),
-            func.max(
-                cast(Score.total_scored, Float) * 100.0 / cast(Score.total_possible, Float)
-            ).label('max_percentage')
-        ).join(Chapter, Subject.id == Chapter.subject_id)\
-        .join(Quiz, Chapter.id == Quiz.chapter_id)\
-        .join(Score, Quiz.id == Score.quiz_id)\
-        .filter(Score.total_possible > 0)\
-        .group_by(Subject.id, Subject.name)\
-        .order_by(desc('max_percentage'))
-
-        top_scores_result = top_scores_query.all()
-        
+        if request.args.get("fresh") == "1" or not SubjectRollup.query.first():
+            return jsonify(_live_subject_summary())
+
+        rows = (
+            db.session.query(
+                Subject.name,
+                func.coalesce(SubjectRollup.attempt_count, 0),
+                SubjectRollup.max_percentage,
+                SubjectRollup.updated_at,
+            )
+            .outerjoin(SubjectRollup, Subject.id == SubjectRollup.subject_id)
+            .all()
+        )
+
         top_scores_data = [
-            {"subject": name, "topScore": round(score, 2) if score is not None else 0}
-            for name, score in top_scores_result
+            {"subject": name, "topScore": round(score, 2)}
+            for name, _, score, _ in sorted(
+                (row for row in rows if row[2] is not None),
+                key=lambda row: row[2],
+                reverse=True,
+            )
         ]
-
-        attempts_query = db.session.query(
-            Subject.name.label('subject_name'),
-            func.count(Score.id).label('attempt_count')
-        ).select_from(Subject)\
-        .outerjoin(Chapter, Subject.id == Chapter.subject_id)\
-        .outerjoin(Quiz, Chapter.id == Quiz.chapter_id)\
-        .outerjoin(Score, Quiz.id == Score.quiz_id)\
-        .group_by(Subject.id, Subject.name)\
-        .order_by(Subject.name)
-
-        attempts_result = attempts_query.all()
-        
         attempts_data = [
             {"subject": name, "attempts": count}
-            for name, count in attempts_result
+            for name, count, _, _ in sorted(rows, key=lambda row: row[0])
         ]
+        timestamps = [row[3] for row in rows if row[3] is not None]
 
-        return jsonify({
-            "topScores": top_scores_data,
-            "attempts": attempts_data
-        })
+        return jsonify(
+            {
+                "topScores": top_scores_data,
+                "attempts": attempts_data,
+                "source": "rollup",
+                "asOf": min(timestamps).isoformat() if timestamps else None,
+            }
+        )
 
     except Exception as e:
         print(f"Error fetching subject summary stats: {e}")
         db.session.rollback()
         return jsonify({"error": "Failed to retrieve subject statistics"}), 500
+
+
+def _live_subject_summary():
+    top_scores_query = db.session.query(
+        Subject.name.label('subject_name'),
+        func.max(
+            cast(Score.total_scored, Float) * 100.0 / cast(Score.total_possible, Float)
+        ).label('max_percentage')
+    ).join(Chapter, Subject.id == Chapter.subject_id)\
+    .join(Quiz, Chapter.id == Quiz.chapter_id)\
+    .join(Score, Quiz.id == Score.quiz_id)\
+    .filter(Score.total_possible > 0)\
+    .group_by(Subject.id, Subject.name)\
+    .order_by(desc('max_percentage'))
+
+    top_scores_result = top_scores_query.all()
+
+    top_scores_data = [
+        {"subject": name, "topScore": round(score, 2) if score is not None else 0}
+        for name, score in top_scores_result
+    ]
+
+    attempts_query = db.session.query(
+        Subject.name.label('subject_name'),
+        func.count(Score.id).label('attempt_count')
+    ).select_from(Subject)\
+    .outerjoin(Chapter, Subject.id == Chapter.subject_id)\
+    .outerjoin(Quiz, Chapter.id == Quiz.chapter_id)\
+    .outerjoin(Score, Quiz.id == Score.quiz_id)\
+    .group_by(Subject.id, Subject.name)\
+    .order_by(Subject.name)
+
+    attempts_result = attempts_query.all()
+
+    attempts_data = [
+        {"subject": name, "attempts": count}
+        for name, count in attempts_result
+    ]
+
+    return {
+        "topScores": top_scores_data,
+        "attempts": attempts_data,
+        "source": "live",
+        "asOf": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+@admin_bp.route("/export/scores", methods=["POST"])
+@auth_required()
+@roles_required("admin")
+def trigger_bulk_score_export():
+    from flask_security import current_user
+
+    job_id = uuid.uuid4().hex
+    try:
+        job = create_export_job(job_id, current_user.id)
+        export_all_scores.delay(job_id)
+        print(f"Queued bulk score export {job_id}")
+        return jsonify(job), 202
+    except Exception as e:
+        print(f"Error triggering bulk score export: {e}")
+        return jsonify({"error": "Failed to start score export"}), 500
+
+
+@admin_bp.route("/export/scores/<job_id>", methods=["GET"])
+@auth_required()
+@roles_required("admin")
+def get_bulk_score_export(job_id):
+    job = get_export_job(job_id)
+    if job is None:
+        return jsonify({"error": "Export job not found"}), 404
+    if job["status"] == "done":
+        job["download_url"] = f"/api/admin/export/scores/{job_id}/scores.csv.gz"
+        job["manifest_url"] = f"/api/admin/export/scores/{job_id}/manifest.json"
+    return jsonify(job)
+
+
+@admin_bp.route("/export/scores/<job_id>/<filename>", methods=["GET"])
+@auth_required()
+@roles_required("admin")
+def download_bulk_score_export(job_id, filename):
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id) or not re.fullmatch(
+        r"scores\.csv\.gz|manifest\.json|part-\d{5}\.csv\.gz", filename
+    ):
+        abort(404)
+    job = get_export_job(job_id)
+    if job is None or job["status"] != "done":
+        abort(404)
+    mimetype = "application/json" if filename.endswith(".json") else "application/gzip"
+    return send_from_directory(
+        export_job_dir(job_id), filename, mimetype=mimetype, as_attachment=True
+    )
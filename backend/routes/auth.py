@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_security import auth_required, hash_password, verify_password
+from flask_security import auth_required, hash_password
 from flask_security.utils import login_user, logout_user
 from models import User, db, Role
-from datetime import datetime, timezone
+from activity import record_login
+from passwords import PasswordPoolBusy, check_password, rehash_password
+from datetime import datetime
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -15,14 +17,26 @@ def login():
         return jsonify({"message": "Missing email or password"}), 400
 
     user = User.query.filter_by(email=data["email"]).first()
+    if not user:
+        return jsonify({"message": "Invalid email or password"}), 401
 
-    if user and verify_password(data["password"], user.password):
+    try:
+        verified, needs_update = check_password(data["password"], user.password)
+        if verified and needs_update and user.active:
+            user.password = rehash_password(data["password"])
+    except PasswordPoolBusy:
+        response = jsonify({"message": "Too many logins in progress, try again"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    if verified:
         if not user.active:
             return jsonify({"message": "Your access is disabled"}), 403
 
         login_user(user)
-        user.last_login = datetime.now(timezone.utc)
-        db.session.commit()
+        record_login(user.id)
+        if needs_update:
+            db.session.commit()
 
         return jsonify(
             {
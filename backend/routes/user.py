@@ -1,43 +1,142 @@
-from flask import Blueprint, request, jsonify
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    request,
+    send_from_directory,
+    stream_with_context,
+)
 from flask_security import auth_required, current_user
-from models import Quiz, Score, Subject, Chapter, Question, db, User
+from models import (
+    Quiz,
+    Score,
+    Subject,
+    Chapter,
+    Question,
+    db,
+    User,
+    UserPerformance,
+    ReportSnapshot,
+)
+from collections import defaultdict
 from datetime import datetime, timezone
+import gzip
 import json
+import logging
+import math
+import re
 from tasks import export_user_quiz_data_csv
+from exports import (
+    SCORE_EXPORT_HEADERS,
+    export_dir,
+    iter_csv_chunks,
+    user_export_filename,
+    user_score_rows,
+)
+from storage import read_only
+from cache import cached
+from http_cache import conditional, namespace_version
+from quiz_payloads import get_start_payload
+from aggregates import score_percentage
+from histograms import (
+    BUCKET_WIDTH,
+    QUIZ,
+    SUBJECT,
+    histogram_counts,
+    percentile_of,
+)
+from leaderboards import get_leaderboards, quiz_board, subject_board
+from serializers import (
+    CHAPTER_COLUMNS,
+    SCORE_COLUMNS,
+    SUBJECT_COLUMNS,
+    score_to_dict,
+    subject_to_dict,
+)
+from reports import snapshot_summary
+from ingest import (
+    AttemptClosed,
+    get_receipt,
+    get_writer,
+    persist_submission,
+    store_receipt,
+)
+from attempts import (
+    AttemptsExhausted,
+    accepts_answers,
+    attempt_submission,
+    autosave,
+    current_attempt,
+    release_attempt,
+    remaining_seconds,
+    saved_answers,
+    start_attempt,
+    valid_answers,
+)
+from pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    get_page_size,
+    page_requested,
+    set_next_cursor,
+)
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import defer
 
 user_bp = Blueprint("user", __name__)
+logger = logging.getLogger(__name__)
 
 
 @user_bp.route("/dashboard", methods=["GET"])
 @auth_required()
+@read_only
 def get_dashboard():
     upcoming_quizzes = (
-        Quiz.query.filter(Quiz.date_of_quiz > datetime.now(timezone.utc)).limit(5).all()
+        db.session.query(
+            Quiz.id,
+            Chapter.name.label("chapter_name"),
+            Subject.name.label("subject_name"),
+            Quiz.date_of_quiz,
+            Quiz.time_duration,
+        )
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .join(Subject, Chapter.subject_id == Subject.id)
+        .filter(Quiz.date_of_quiz > datetime.now(timezone.utc))
+        .order_by(Quiz.date_of_quiz, Quiz.id)
+        .limit(5)
+        .all()
     )
 
     recent_scores = (
-        Score.query.filter_by(user_id=current_user.id)
+        db.session.query(
+            Score.quiz_id,
+            Chapter.name.label("chapter_name"),
+            Score.total_scored,
+            Score.total_possible,
+            Score.time_stamp_of_attempt,
+        )
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .filter(Score.user_id == current_user.id)
         .order_by(Score.time_stamp_of_attempt.desc())
         .limit(5)
         .all()
     )
 
-    all_scores = Score.query.filter_by(user_id=current_user.id).all()
-    total_quizzes = len(all_scores)
-    avg_score = 0
-    if total_quizzes > 0:
-        avg_score = (
-            sum(score.total_scored / score.total_possible * 100 for score in all_scores)
-            / total_quizzes
-        )
+    performance = db.session.get(UserPerformance, current_user.id)
+    total_quizzes = performance.attempt_count if performance else 0
+    avg_score = performance.average_percentage if performance else 0
 
     return jsonify(
         {
             "upcoming_quizzes": [
                 {
                     "id": quiz.id,
-                    "chapter_name": quiz.chapter.name,
-                    "subject_name": quiz.chapter.subject.name,
+                    "chapter_name": quiz.chapter_name,
+                    "subject_name": quiz.subject_name,
                     "date": quiz.date_of_quiz.isoformat(),
                     "duration": quiz.time_duration,
                 }
@@ -46,9 +145,9 @@ def get_dashboard():
             "recent_scores": [
                 {
                     "quiz_id": score.quiz_id,
-                    "chapter_name": score.quiz.chapter.name,
-                    "score_percentage": (
-                        score.total_scored / score.total_possible * 100
+                    "chapter_name": score.chapter_name,
+                    "score_percentage": score_percentage(
+                        score.total_scored, score.total_possible
                     ),
                     "attempted_at": score.time_stamp_of_attempt.isoformat(),
                 }
@@ -64,40 +163,94 @@ def get_dashboard():
 
 @user_bp.route("/quizzes/upcoming", methods=["GET"])
 @auth_required()
+@cached("subjects", "chapters", "quizzes", "questions", timeout=60)
+@read_only
 def get_upcoming_quizzes():
-    upcoming = Quiz.query.all()
+    now = datetime.now(timezone.utc)
+    limit = get_page_size() if page_requested() else None
 
-    return jsonify(
+    question_counts = (
+        db.session.query(
+            Question.quiz_id, func.count(Question.id).label("total_questions")
+        )
+        .join(Quiz, Question.quiz_id == Quiz.id)
+        .filter(Quiz.date_of_quiz > now)
+        .group_by(Question.quiz_id)
+        .subquery()
+    )
+
+    query = (
+        db.session.query(
+            Quiz.id,
+            Quiz.chapter_id,
+            Chapter.name.label("chapter_name"),
+            Subject.name.label("subject_name"),
+            Quiz.date_of_quiz,
+            Quiz.time_duration,
+            func.coalesce(question_counts.c.total_questions, 0).label(
+                "total_questions"
+            ),
+        )
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .join(Subject, Chapter.subject_id == Subject.id)
+        .outerjoin(question_counts, question_counts.c.quiz_id == Quiz.id)
+        .filter(Quiz.date_of_quiz > now)
+    )
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor, datetime, int)
+        except InvalidCursor:
+            return jsonify({"error": "Invalid cursor"}), 400
+        query = query.filter(
+            or_(
+                Quiz.date_of_quiz > cursor_date,
+                and_(Quiz.date_of_quiz == cursor_date, Quiz.id > cursor_id),
+            )
+        )
+
+    query = query.order_by(Quiz.date_of_quiz, Quiz.id)
+    rows = query.all() if limit is None else query.limit(limit + 1).all()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date_of_quiz, rows[-1].id)
+
+    response = jsonify(
         [
             {
-                "id": quiz.id,
-                "chapter_id": quiz.chapter_id,
-                "chapter_name": quiz.chapter.name,
-                "subject_name": quiz.chapter.subject.name,
-                "date_of_quiz": quiz.date_of_quiz.isoformat(),
-                "time_duration": quiz.time_duration,
-                "total_questions": len(quiz.questions),
+                "id": row.id,
+                "chapter_id": row.chapter_id,
+                "chapter_name": row.chapter_name,
+                "subject_name": row.subject_name,
+                "date_of_quiz": row.date_of_quiz.isoformat(),
+                "time_duration": row.time_duration,
+                "total_questions": row.total_questions,
             }
-            for quiz in upcoming
+            for row in rows
         ]
     )
+    return set_next_cursor(response, next_cursor)
 
 
 @user_bp.route("/subjects", methods=["GET"])
 @auth_required()
+@conditional(namespace_version("subjects", "chapters"))
+@cached("subjects", "chapters")
+@read_only
 def get_subjects():
-    subjects = Subject.query.all()
-    result = []
-    for subject in subjects:
-        subject_data = {
-            "id": subject.id,
-            "name": subject.name,
-            "chapters": [
-                {"id": chapter.id, "name": chapter.name} for chapter in subject.chapters
-            ],
-        }
-        result.append(subject_data)
-    return jsonify(result)
+    chapters = defaultdict(list)
+    for chapter in db.session.query(*CHAPTER_COLUMNS):
+        chapters[chapter.subject_id].append(
+            {"id": chapter.id, "name": chapter.name}
+        )
+    return jsonify(
+        [
+            {**subject_to_dict(subject), "chapters": chapters[subject.id]}
+            for subject in db.session.query(*SUBJECT_COLUMNS)
+        ]
+    )
 
 
 @user_bp.route("/quizzes/<int:id>", methods=["GET"])
@@ -123,100 +276,345 @@ def get_quiz_details(id):
 @user_bp.route("/quizzes/<int:id>/start", methods=["POST"])
 @auth_required()
 def start_quiz(id):
-    quiz = Quiz.query.get_or_404(id)
+    """Opens or resumes an attempt and serves the pre-serialized question payload.
+
+    The attempt's number, deadline and remaining seconds go in headers so the
+    cached body stays the same for every student.
+    """
+    payload = get_start_payload(id)
+    if payload is None:
+        abort(404)
+    try:
+        session = start_attempt(current_user.id, id)
+    except AttemptsExhausted:
+        return jsonify({"error": "No attempts left for this quiz"}), 409
+    if session is None:
+        abort(404)
+    etag, body = payload
+
+    gzipped = "gzip" in request.accept_encodings
+    if gzipped:
+        # Each encoding is a distinct representation with its own strong tag.
+        etag = f"{etag}-gzip"
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(
+            body if gzipped else gzip.decompress(body), mimetype="application/json"
+        )
+        if gzipped:
+            response.headers["Content-Encoding"] = "gzip"
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    response.headers["X-Attempt-Number"] = str(session["attempt_number"])
+    response.headers["X-Attempt-Deadline"] = session["deadline"]
+    response.headers["X-Attempt-Remaining"] = str(remaining_seconds(session))
+    return response
+
+
+def _attempt_state(session, answers):
+    return {
+        "attempt_number": session["attempt_number"],
+        "started_at": session["started_at"],
+        "deadline": session["deadline"],
+        "remaining_seconds": remaining_seconds(session),
+        "answers": answers,
+    }
+
+
+@user_bp.route("/quizzes/<int:id>/attempt", methods=["GET"])
+@auth_required()
+def get_current_attempt(id):
+    """The running attempt with its autosaved answers, for resuming after a reload."""
+    session = current_attempt(current_user.id, id)
+    if session is None:
+        return jsonify({"error": "No attempt in progress"}), 404
+    return jsonify(_attempt_state(session, saved_answers(session)))
 
-    questions = Question.query.filter_by(quiz_id=id).all()
 
+@user_bp.route("/quizzes/<int:id>/attempt/answers", methods=["PUT"])
+@auth_required()
+def autosave_answers(id):
+    """Merges answers into the running attempt's autosave; a null option clears one.
+
+    Only the attempt store is touched; answers reach the database when the
+    attempt is submitted or expires.
+    """
+    answers = (request.get_json(silent=True) or {}).get("answers")
+    if not isinstance(answers, dict):
+        return jsonify({"error": "answers must be an object"}), 400
+    session = current_attempt(current_user.id, id)
+    if session is None:
+        return jsonify({"error": "No attempt in progress"}), 409
+    if not accepts_answers(session):
+        return jsonify({"error": "Time is up for this attempt"}), 409
+
+    answers = valid_answers(answers, allow_clear=True)
+    if not autosave(session, answers):
+        return jsonify({"error": "Autosave unavailable, try again"}), 503
     return jsonify(
-        {
-            "quiz_id": quiz.id,
-            "time_duration": quiz.time_duration,
-            "questions": [
-                {
-                    "id": q.id,
-                    "question": q.question_statement,
-                    "options": [q.option1, q.option2, q.option3, q.option4],
-                }
-                for q in questions
-            ],
-        }
+        {"saved": len(answers), "remaining_seconds": remaining_seconds(session)}
     )
 
 
-@user_bp.route("/quizzes/<int:id>/submit", methods=["POST"])
-@auth_required()
-def submit_quiz(id):
-    quiz = Quiz.query.get_or_404(id)
+def _attempt_closed():
+    return jsonify({"error": "This attempt was already submitted"}), 409
 
-    answers = request.json.get("answers", {})
 
-    total_possible = len(quiz.questions)
-    total_scored = 0
+def _release_when_committed(session, submission):
+    def release(future):
+        if future.exception() is None:
+            release_attempt(session, submission.attempt_status)
 
-    for question in quiz.questions:
-        if str(question.id) in answers:
-            if answers[str(question.id)] == question.correct_option:
-                total_scored += 1
-
-    score = Score(
-        user_id=current_user.id,
-        quiz_id=id,
-        total_scored=total_scored,
-        total_possible=total_possible,
-        time_stamp_of_attempt=datetime.fromisoformat(
-            request.json.get("time_stamp_of_attempt")
-        ),
-    )
-    db.session.add(score)
-    db.session.commit()
+    return release
 
-    percentage = 0
-    if total_possible > 0:
-        percentage = (total_scored / total_possible) * 100
 
+@user_bp.route("/quizzes/<int:id>/submit", methods=["POST"])
+@auth_required()
+def submit_quiz(id):
+    session = current_attempt(current_user.id, id)
+    if session is None:
+        return jsonify({"error": "No attempt in progress; start the quiz first"}), 409
+    answers = (request.get_json(silent=True) or {}).get("answers", {})
+    if not isinstance(answers, dict):
+        return jsonify({"error": "answers must be an object"}), 400
+
+    submission = attempt_submission(session, answers)
+    if submission is None:
+        abort(404)
+    result = {
+        "attempt_number": session["attempt_number"],
+        "status": submission.attempt_status,
+        "total_scored": submission.total_scored,
+        "total_possible": submission.total_possible,
+        "percentage": round(
+            score_percentage(submission.total_scored, submission.total_possible), 2
+        ),
+    }
+    if current_app.config["SUBMISSION_INGEST_MODE"] != "group":
+        try:
+            result["score_id"] = persist_submission(submission)
+        except AttemptClosed:
+            db.session.rollback()
+            return _attempt_closed()
+        release_attempt(session, submission.attempt_status)
+        return jsonify(result)
+
+    store_receipt(submission, "pending")
+    future = get_writer().submit(submission)
+    # Runs in the writer's app context once the group commits; a failed
+    # write leaves the attempt open with its autosaved answers.
+    future.add_done_callback(_release_when_committed(session, submission))
+    if request.args.get("async") != "1":
+        try:
+            result["score_id"] = future.result(
+                timeout=current_app.config["SUBMISSION_WAIT_TIMEOUT"]
+            )
+            # The callback may still be running; answer with the store updated.
+            release_attempt(session, submission.attempt_status)
+            return jsonify(result)
+        except TimeoutError:
+            pass
+        except AttemptClosed:
+            return _attempt_closed()
+        except Exception as e:
+            logger.exception("Error saving submission for quiz %s: %s", id, e)
+            return jsonify({"error": "Failed to save submission"}), 500
+
+    result["receipt"] = submission.receipt
+    return jsonify(result), 202
+
+
+@user_bp.route("/submissions/<receipt>", methods=["GET"])
+@auth_required()
+def get_submission_status(receipt):
+    status = get_receipt(receipt)
+    if status is None or status["user_id"] != current_user.id:
+        abort(404)
     return jsonify(
         {
-            "score_id": score.id,
-            "total_scored": total_scored,
-            "total_possible": total_possible,
-            "percentage": round(percentage, 2),
+            "receipt": receipt,
+            "status": status["status"],
+            "quiz_id": status["quiz_id"],
+            "score_id": status["score_id"],
         }
     )
 
 
+def _user_scores_version(**view_args):
+    return current_user.id, (
+        db.session.query(func.count(Score.id), func.max(Score.id))
+        .filter(Score.user_id == current_user.id)
+        .one()
+    )
+
+
 @user_bp.route("/scores", methods=["GET"])
 @auth_required()
+@read_only
+@conditional(_user_scores_version)
 def get_user_scores():
     scores = (
-        Score.query.filter_by(user_id=current_user.id)
+        db.session.query(*SCORE_COLUMNS)
+        .filter(Score.user_id == current_user.id)
         .order_by(Score.time_stamp_of_attempt.desc())
         .all()
     )
 
-    scores_data = []
-    for score in scores:
-        attempted_at_utc = score.time_stamp_of_attempt.replace(tzinfo=timezone.utc)
+    # Older rows were saved without total_possible; fall back to the
+    # quiz's current question count.
+    missing = {score.quiz_id for score in scores if score.total_possible <= 0}
+    question_counts = {}
+    if missing:
+        question_counts = dict(
+            db.session.query(Question.quiz_id, func.count(Question.id))
+            .filter(Question.quiz_id.in_(missing))
+            .group_by(Question.quiz_id)
+        )
 
-        percentage = 0
-        total_possible = score.total_possible
-        if total_possible > 0:
-            percentage = round((score.total_scored / total_possible) * 100, 2)
-        else:
-            total_possible = len(score.quiz.questions)
-            if total_possible > 0:
-                percentage = round((score.total_scored / total_possible) * 100, 2)
+    return jsonify(
+        [
+            score_to_dict(
+                score,
+                question_counts.get(score.quiz_id, 0)
+                if score.total_possible <= 0
+                else None,
+            )
+            for score in scores
+        ]
+    )
 
-        scores_data.append(
+
+def _leaderboard(board):
+    leaderboards = get_leaderboards()
+    top = leaderboards.top(board, get_page_size(default=10, maximum=100))
+    names = {}
+    if top:
+        names = dict(
+            db.session.query(User.id, User.full_name).filter(
+                User.id.in_([user_id for user_id, _ in top])
+            )
+        )
+    mine = leaderboards.rank(board, current_user.id)
+    return jsonify(
+        {
+            "participants": leaderboards.size(board),
+            "entries": [
+                {
+                    "rank": position + 1,
+                    "user_id": user_id,
+                    "full_name": names.get(user_id),
+                    "score": round(score, 2),
+                }
+                for position, (user_id, score) in enumerate(top)
+            ],
+            "me": {"rank": mine[0] + 1, "score": round(mine[1], 2)} if mine else None,
+        }
+    )
+
+
+@user_bp.route("/leaderboards/quizzes/<int:id>", methods=["GET"])
+@auth_required()
+@read_only
+def get_quiz_leaderboard(id):
+    """Best percentage per student on the quiz."""
+    if db.session.query(Quiz.id).filter(Quiz.id == id).scalar() is None:
+        abort(404)
+    return _leaderboard(quiz_board(id))
+
+
+@user_bp.route("/leaderboards/subjects/<int:id>", methods=["GET"])
+@auth_required()
+@read_only
+def get_subject_leaderboard(id):
+    """Sum of each student's best percentages across the subject's quizzes."""
+    if db.session.query(Subject.id).filter(Subject.id == id).scalar() is None:
+        abort(404)
+    return _leaderboard(subject_board(id))
+
+
+def _distribution(scope, scope_id):
+    counts = histogram_counts(scope, scope_id)
+    result = {
+        "total": sum(counts),
+        "bucket_width": BUCKET_WIDTH,
+        "buckets": [
             {
-                "quiz_id": score.quiz_id,
-                "total_scored": score.total_scored,
-                "total_possible": total_possible,
-                "total_questions": total_possible,
-                "percentage": percentage,
-                "attempted_at": attempted_at_utc.isoformat(),
+                "from": bucket * BUCKET_WIDTH,
+                "to": (bucket + 1) * BUCKET_WIDTH,
+                "count": count,
             }
+            for bucket, count in enumerate(counts)
+        ],
+    }
+    if "score" in request.args:
+        try:
+            score = float(request.args["score"])
+        except ValueError:
+            score = math.nan
+        # float() also accepts "nan" and "inf".
+        if not (math.isfinite(score) and 0 <= score <= 100):
+            return jsonify({"error": "score must be a percentage from 0 to 100"}), 400
+        percentile = percentile_of(counts, score)
+        result["score"] = score
+        result["percentile"] = round(percentile, 1) if percentile is not None else None
+    return jsonify(result)
+
+
+@user_bp.route("/distributions/quizzes/<int:id>", methods=["GET"])
+@auth_required()
+@read_only
+def get_quiz_distribution(id):
+    """Attempts per percentage bucket; ``?score=`` adds that score's percentile."""
+    if db.session.query(Quiz.id).filter(Quiz.id == id).scalar() is None:
+        abort(404)
+    return _distribution(QUIZ, id)
+
+
+@user_bp.route("/distributions/subjects/<int:id>", methods=["GET"])
+@auth_required()
+@read_only
+def get_subject_distribution(id):
+    if db.session.query(Subject.id).filter(Subject.id == id).scalar() is None:
+        abort(404)
+    return _distribution(SUBJECT, id)
+
+
+def _user_reports_version(**view_args):
+    return current_user.id, (
+        db.session.query(
+            func.count(ReportSnapshot.period), func.max(ReportSnapshot.computed_at)
         )
-    return jsonify(scores_data)
+        .filter(ReportSnapshot.user_id == current_user.id)
+        .one()
+    )
+
+
+@user_bp.route("/reports", methods=["GET"])
+@auth_required()
+@read_only
+@conditional(_user_reports_version)
+def get_monthly_reports():
+    """Past monthly summaries, served from the stored report snapshots."""
+    snapshots = (
+        ReportSnapshot.query.options(defer(ReportSnapshot.details))
+        .filter_by(user_id=current_user.id)
+        .order_by(ReportSnapshot.period.desc())
+        .all()
+    )
+    return jsonify([snapshot_summary(snapshot) for snapshot in snapshots])
+
+
+@user_bp.route("/reports/<period>", methods=["GET"])
+@auth_required()
+@read_only
+def get_monthly_report(period):
+    if not re.fullmatch(r"\d{4}-\d{2}", period):
+        return jsonify({"error": "Period must look like YYYY-MM"}), 400
+    snapshot = db.session.get(ReportSnapshot, (current_user.id, period))
+    if snapshot is None:
+        return jsonify({"error": "No report for this period"}), 404
+    return jsonify(snapshot_summary(snapshot, include_details=True))
 
 
 @user_bp.route("/export/scores", methods=["POST"])
@@ -242,3 +640,28 @@ def trigger_score_export():
     except Exception as e:
         print(f"Error triggering score export for user {current_user.id}: {e}")
         return jsonify({"error": "Failed to start score export"}), 500
+
+
+@user_bp.route("/export/scores.csv", methods=["GET"])
+@auth_required()
+@read_only
+def download_score_export():
+    """Streams the user's scores as CSV while they are read from the database."""
+    filename = user_export_filename(current_user.id).removesuffix(".gz")
+    return Response(
+        stream_with_context(
+            iter_csv_chunks(SCORE_EXPORT_HEADERS, user_score_rows(current_user.id))
+        ),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@user_bp.route("/export/files/<filename>", methods=["GET"])
+@auth_required()
+def download_export_file(filename):
+    if not re.fullmatch(rf"quiz_scores_{current_user.id}_\d{{8}}\.csv\.gz", filename):
+        abort(404)
+    return send_from_directory(
+        export_dir(), filename, mimetype="application/gzip", as_attachment=True
+    )
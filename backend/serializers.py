@@ -0,0 +1,147 @@
+"""Row to dict conversion shared by the blueprints.
+
+Each function takes either an ORM instance or a ``Row`` selected from the
+matching ``*_COLUMNS``, so list endpoints can query plain columns instead
+of hydrating objects.
+"""
+
+from datetime import timezone
+
+from sqlalchemy import func, select
+
+from aggregates import score_percentage
+from models import Chapter, Question, Quiz, Role, Score, Subject, User, roles_users
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+SUBJECT_COLUMNS = (Subject.id, Subject.name)
+
+
+def subject_to_dict(row):
+    return {"id": row.id, "name": row.name}
+
+
+CHAPTER_COLUMNS = (Chapter.id, Chapter.name, Chapter.subject_id)
+
+
+def chapter_to_dict(row):
+    return {"id": row.id, "name": row.name, "subject_id": row.subject_id}
+
+
+QUIZ_COLUMNS = (
+    Quiz.id,
+    Quiz.chapter_id,
+    Quiz.date_of_quiz,
+    Quiz.time_duration,
+    Quiz.max_attempts,
+    Quiz.created_at,
+)
+
+
+def quiz_to_dict(row):
+    return {
+        "id": row.id,
+        "chapter_id": row.chapter_id,
+        "date_of_quiz": _isoformat(row.date_of_quiz),
+        "time_duration": row.time_duration,
+        "max_attempts": row.max_attempts,
+        "created_at": _isoformat(row.created_at),
+    }
+
+
+QUESTION_COLUMNS = (
+    Question.id,
+    Question.quiz_id,
+    Question.question_statement,
+    Question.option1,
+    Question.option2,
+    Question.option3,
+    Question.option4,
+    Question.correct_option,
+)
+
+
+def question_to_dict(row):
+    return {
+        "id": row.id,
+        "quiz_id": row.quiz_id,
+        "question_statement": row.question_statement,
+        "option1": row.option1,
+        "option2": row.option2,
+        "option3": row.option3,
+        "option4": row.option4,
+        "correct_option": row.correct_option,
+    }
+
+
+SCORE_COLUMNS = (
+    Score.id,
+    Score.user_id,
+    Score.quiz_id,
+    Score.total_scored,
+    Score.total_possible,
+    Score.time_stamp_of_attempt,
+)
+
+
+def score_to_dict(row, total_possible=None):
+    """``total_possible`` overrides the stored value for legacy rows saved as 0."""
+    if total_possible is None:
+        total_possible = row.total_possible
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "quiz_id": row.quiz_id,
+        "total_scored": row.total_scored,
+        "total_possible": total_possible,
+        "total_questions": total_possible,
+        "percentage": round(score_percentage(row.total_scored, total_possible), 2),
+        "attempted_at": row.time_stamp_of_attempt.replace(
+            tzinfo=timezone.utc
+        ).isoformat(),
+    }
+
+
+def user_role_names():
+    """Correlated subquery returning a user's role names comma-joined."""
+    return (
+        select(func.group_concat(Role.name))
+        .join(roles_users, roles_users.c.role_id == Role.id)
+        .where(roles_users.c.user_id == User.id)
+        .scalar_subquery()
+        .label("roles")
+    )
+
+
+USER_COLUMNS = (
+    User.id,
+    User.email,
+    User.full_name,
+    User.qualification,
+    User.active,
+    User.created_at,
+    User.last_login,
+    user_role_names(),
+)
+
+
+def _role_names(roles):
+    if roles is None or isinstance(roles, str):
+        return roles.split(",") if roles else []
+    return [role.name for role in roles]
+
+
+def user_to_dict(row):
+    return {
+        "id": row.id,
+        "email": row.email,
+        "full_name": row.full_name,
+        "qualification": row.qualification,
+        "active": row.active,
+        "roles": _role_names(row.roles),
+        "created_at": _isoformat(row.created_at),
+        "last_login": _isoformat(row.last_login),
+    }
@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+from functools import wraps
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+logger = logging.getLogger(__name__)
+
+READ_BIND = "readonly"
+
+
+class RoutingSession(Session):
+    """Sends reads from ``@read_only`` views to the read-only engine.
+
+    Anything issued while flushing still goes to the primary engine, so a
+    view that unexpectedly writes fails loudly instead of writing through the
+    read pool.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_app_context()
+            and g.get("read_only")
+        ):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(fn):
+    """Route the view's GET queries to the read-only engine."""
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if request.method == "GET":
+            g.read_only = True
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _sqlite_pragmas(config, read_only_engine):
+    pragmas = [
+        f"PRAGMA busy_timeout = {config['SQLITE_BUSY_TIMEOUT_MS']}",
+        f"PRAGMA cache_size = {config['SQLITE_CACHE_SIZE']}",
+        f"PRAGMA mmap_size = {config['SQLITE_MMAP_SIZE']}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+    ]
+    if read_only_engine:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # journal_mode is persistent and needs a write lock, so only the
+        # primary engine sets it.
+        pragmas.insert(1, f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+        pragmas.append(
+            f"PRAGMA wal_autocheckpoint = {config['SQLITE_WAL_AUTOCHECKPOINT']}"
+        )
+    return pragmas
+
+
+def _install_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+class WalCheckpointer:
+    """Background WAL checkpoint policy for the primary SQLite engine.
+
+    A PASSIVE checkpoint runs every ``interval`` seconds and never blocks
+    readers or writers. Once the WAL file grows past ``truncate_bytes`` a
+    TRUNCATE checkpoint resets it so it cannot grow without bound under a
+    steady stream of long readers.
+    """
+
+    def __init__(self, engine, interval, truncate_bytes):
+        self.engine = engine
+        self.interval = interval
+        self.truncate_bytes = truncate_bytes
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="wal-checkpointer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _wal_size(self):
+        database = self.engine.url.database
+        try:
+            return os.path.getsize(f"{database}-wal")
+        except OSError:
+            return 0
+
+    def checkpoint(self):
+        mode = "TRUNCATE" if self._wal_size() > self.truncate_bytes else "PASSIVE"
+        with self.engine.connect() as conn:
+            busy, log_frames, checkpointed = conn.execute(
+                text(f"PRAGMA wal_checkpoint({mode})")
+            ).one()
+        return mode, busy, log_frames, checkpointed
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.checkpoint()
+            except Exception as e:
+                logger.warning("WAL checkpoint failed: %s", e)
+
+
+def init_storage(app, db):
+    """Apply the SQLite storage profile to every configured engine."""
+    with app.app_context():
+        engines = db.engines
+        for bind_key, engine in engines.items():
+            if engine.dialect.name != "sqlite":
+                continue
+            _install_pragmas(
+                engine, _sqlite_pragmas(app.config, read_only_engine=bind_key == READ_BIND)
+            )
+
+        primary = engines[None]
+        interval = app.config["SQLITE_WAL_CHECKPOINT_INTERVAL"]
+        if (
+            primary.dialect.name == "sqlite"
+            and primary.url.database not in (None, "", ":memory:")
+            and app.config["SQLITE_JOURNAL_MODE"].upper() == "WAL"
+            and interval > 0
+        ):
+            app.extensions["wal_checkpointer"] = WalCheckpointer(
+                primary, interval, app.config["SQLITE_WAL_TRUNCATE_BYTES"]
+            )
@@ -1,12 +1,52 @@
-from celery import Celery
+from celery import Celery, chord
 from celery.schedules import crontab
 from flask_mail import Message
 from flask import current_app
 from datetime import datetime, timedelta, timezone
-from calendar import monthrange
-import io
-import csv
-from models import db, User, Role, Quiz, Score, Chapter, Subject
+import json
+import os
+import time
+from sqlalchemy import func
+from models import (
+    db,
+    User,
+    Role,
+    ReportPeriod,
+    ReportSnapshot,
+)
+from aggregates import rebuild_subject_rollups as _rebuild_subject_rollups
+from attempts import expire_overdue_attempts
+from mailer import send_bulk, send_messages
+from reports import (
+    claim_undelivered_snapshots,
+    compute_report_snapshots,
+    period_label,
+    previous_month,
+    record_snapshot_deliveries,
+)
+from notifications import (
+    NEW_QUIZ,
+    DeliveryRecorder,
+    batch_quizzes,
+    claim_new_quizzes,
+    delivered_user_ids,
+    mark_completed,
+    mark_dispatched,
+    stale_batches,
+)
+from exports import (
+    export_job_dir,
+    fail_stale_export_jobs,
+    mark_partition_done,
+    merge_score_parts,
+    plan_score_partitions,
+    purge_export_jobs,
+    purge_user_exports,
+    split_lanes,
+    update_export_job,
+    write_score_partition,
+    write_user_score_export,
+)
 
 
 def make_celery(app):
@@ -27,6 +67,18 @@ def make_celery(app):
             "task": "tasks.generate_monthly_reports",
             "schedule": crontab(minute="*/1"),
         },
+        "rebuild-subject-rollups": {
+            "task": "tasks.rebuild_subject_rollups",
+            "schedule": crontab(minute="*/15"),
+        },
+        "expire-quiz-attempts": {
+            "task": "tasks.expire_quiz_attempts",
+            "schedule": crontab(minute="*/1"),
+        },
+        "purge-expired-exports": {
+            "task": "tasks.purge_expired_exports",
+            "schedule": crontab(minute=0),
+        },
     }
 
     class ContextTask(celery.Task):
@@ -48,49 +100,75 @@ def add(x, y):
     return x + y
 
 
-@celery_app.task(name="tasks.send_new_quiz_reminders")
-def send_new_quiz_reminders():
-    mail = current_app.extensions.get("mail")
-    if not mail:
-        print("Mail extension not found in current app context")
-        return "Task failed: Mail not configured"
+@celery_app.task(name="tasks.rebuild_subject_rollups")
+def rebuild_subject_rollups():
     try:
-        time_threshold = datetime.now(timezone.utc) - timedelta(days=1)
-        new_quizzes = Quiz.query.filter(Quiz.created_at >= time_threshold).all()
+        count = _rebuild_subject_rollups()
+        return f"Rebuilt subject rollups for {count} subjects."
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in rebuild_subject_rollups task: {e}")
+        return f"Subject rollup rebuild failed: {e}"
 
-        if not new_quizzes:
-            print("No new quizzes found in the last 24 hours.")
-            return "No new quizzes to notify about."
 
-        student_role = Role.query.filter_by(name="student").first()
-        if not student_role:
-            print("Student role not found.")
-            return "Student role missing."
-
-        active_students = User.query.filter(
-            User.roles.any(id=student_role.id), User.active == True
-        ).all()
-
-        if not active_students:
-            print("No active students found.")
-            return "No active students to notify."
-
-        subject = "New Quizzes Available on Quiz Master!"
-        quiz_list_html = '<ul style="list-style-type: none; padding: 0;">'
-        quiz_list_text = ""
-        for quiz in new_quizzes:
-            chapter_name = quiz.chapter.name if quiz.chapter else "N/A"
-            subject_name = (
-                quiz.chapter.subject.name
-                if quiz.chapter and quiz.chapter.subject
-                else "N/A"
-            )
-            line = f"{subject_name} - {chapter_name} (Quiz ID: {quiz.id})"
-            quiz_list_html += f'<li style="margin-bottom: 5px; padding: 8px; background-color: #f9f9f9; border-left: 3px solid #007bff;">{line}</li>'
-            quiz_list_text += f"- {line}\n"
-        quiz_list_html += "</ul>"
+@celery_app.task(name="tasks.expire_quiz_attempts")
+def expire_quiz_attempts():
+    """Grade and close attempts left unsubmitted past their deadline."""
+    try:
+        count = expire_overdue_attempts()
+        return f"Expired {count} quiz attempts."
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in expire_quiz_attempts task: {e}")
+        return f"Expiring quiz attempts failed: {e}"
+
+
+def plan_user_id_ranges(chunk_size):
+    """Split the user id space into ``(first_id, last_id)`` ranges, one per send
+    subtask, without reading any user rows."""
+    low, high = db.session.query(func.min(User.id), func.max(User.id)).one()
+    if low is None:
+        return []
+    return [
+        (start, min(start + chunk_size - 1, high))
+        for start in range(low, high + 1, chunk_size)
+    ]
+
+
+def active_student_recipients(first_id, last_id):
+    """``[id, email]`` of active students whose id is in ``[first_id, last_id]``."""
+    student_role = Role.query.filter_by(name="student").first()
+    if not student_role:
+        return []
+    rows = (
+        db.session.query(User.id, User.email)
+        .filter(
+            User.id.between(first_id, last_id),
+            User.roles.any(id=student_role.id),
+            User.active == True,
+        )
+        .order_by(User.id)
+    )
+    return [[user_id, email] for user_id, email in rows if email]
+
+
+def render_new_quiz_reminder(new_quizzes):
+    subject = "New Quizzes Available on Quiz Master!"
+    quiz_list_html = '<ul style="list-style-type: none; padding: 0;">'
+    quiz_list_text = ""
+    for quiz in new_quizzes:
+        chapter_name = quiz.chapter.name if quiz.chapter else "N/A"
+        subject_name = (
+            quiz.chapter.subject.name
+            if quiz.chapter and quiz.chapter.subject
+            else "N/A"
+        )
+        line = f"{subject_name} - {chapter_name} (Quiz ID: {quiz.id})"
+        quiz_list_html += f'<li style="margin-bottom: 5px; padding: 8px; background-color: #f9f9f9; border-left: 3px solid #007bff;">{line}</li>'
+        quiz_list_text += f"- {line}\n"
+    quiz_list_html += "</ul>"
 
-        body_html = f"""
+    body_html = f"""
         <div style="font-family: sans-serif; color: #333; line-height: 1.6;">
             <p style="margin-bottom: 15px;">Hello,</p>
             <p style="margin-bottom: 10px;">New quizzes have been added in the last 24 hours:</p>
@@ -99,121 +177,130 @@ def send_new_quiz_reminders():
             <p style="margin-top: 25px; font-size: 0.9em; color: #555;">Regards,<br>The Quiz Master Team</p>
         </div>
         """
-        body_text = f"Hello,\n\nNew quizzes have been added in the last 24 hours:\n{quiz_list_text}\nLog in to Quiz Master to check them out!\n\nRegards,\nThe Quiz Master Team"
-
-        with mail.connect() as conn:
-            for user in active_students:
-                if user.email:
-                    msg = Message(
-                        subject=subject,
-                        recipients=[user.email],
-                        body=body_text,
-                        html=body_html,
-                    )
-                    try:
-                        conn.send(msg)
-                        print(f"Sent new quiz notification to {user.email}")
-                    except Exception as mail_err:
-                        print(f"Failed to send email to {user.email}: {mail_err}")
-
-        return f"Sent notifications for {len(new_quizzes)} new quizzes to {len(active_students)} students."
+    body_text = f"Hello,\n\nNew quizzes have been added in the last 24 hours:\n{quiz_list_text}\nLog in to Quiz Master to check them out!\n\nRegards,\nThe Quiz Master Team"
+    return subject, body_text, body_html
+
+
+@celery_app.task(name="tasks.send_new_quiz_reminders")
+def send_new_quiz_reminders():
+    if not current_app.extensions.get("mail"):
+        print("Mail extension not found in current app context")
+        return "Task failed: Mail not configured"
+    try:
+        # Batches a crashed run never finished are picked up again; anything
+        # new is claimed in the ledger so no later run announces it again.
+        batches = stale_batches(
+            NEW_QUIZ,
+            timedelta(seconds=current_app.config["REMINDER_RESUME_AFTER_SECONDS"]),
+        )
+        batch = claim_new_quizzes(
+            NEW_QUIZ, timedelta(hours=current_app.config["REMINDER_LOOKBACK_HOURS"])
+        )
+        if batch is not None:
+            batches.append(batch)
+
+        if not batches:
+            print("No unannounced quizzes found.")
+            return "No new quizzes to notify about."
+
+        chunks = sum(dispatch_reminder_batch(batch) for batch in batches)
+        return f"Dispatched {chunks} reminder chunks for {len(batches)} quiz batches."
 
     except Exception as e:
+        db.session.rollback()
         print(f"Error in send_new_quiz_reminders task: {e}")
         return f"Task failed: {e}"
 
 
-@celery_app.task(name="tasks.generate_monthly_reports")
-def generate_monthly_reports():
-    mail = current_app.extensions.get("mail")
-    if not mail:
-        print("Mail extension not found in current app context")
-        return "Task failed: Mail not configured"
+def dispatch_reminder_batch(batch):
+    # Rendered once here; every chunk sends the same text.
+    subject, body_text, body_html = render_new_quiz_reminder(batch_quizzes(batch))
+    # Chunks carry user id ranges, not recipients: each subtask loads its own
+    # students, so no address list is held here or put on the broker.
+    chunks = [
+        send_reminder_chunk.s(
+            batch.id, first_id, last_id, subject, body_text, body_html
+        )
+        for first_id, last_id in plan_user_id_ranges(
+            current_app.config["REMINDER_CHUNK_SIZE"]
+        )
+    ]
+    batch_id = batch.id
+    mark_dispatched(batch)
+    if not chunks:
+        print("No users found.")
+        mark_completed(batch_id)
+        return 0
+    chord(chunks)(report_reminder_fanout.s(batch_id, time.time()))
+    return len(chunks)
+
+
+@celery_app.task(name="tasks.send_reminder_chunk")
+def send_reminder_chunk(batch_id, first_id, last_id, subject, body_text, body_html):
+    recipients = active_student_recipients(first_id, last_id)
+    # Recipients a previous attempt already reached are skipped, so retries
+    # and resumed batches never email anyone twice.
+    delivered = delivered_user_ids(batch_id, [user_id for user_id, _ in recipients])
+    pending = {
+        email: user_id for user_id, email in recipients if user_id not in delivered
+    }
+    recorder = DeliveryRecorder(batch_id)
     try:
-        today = datetime.now(timezone.utc)
-        target_date = today - timedelta(days=15)
-        year = target_date.year
-        month = target_date.month
-        _, num_days = monthrange(year, month)
-
-        start_date = datetime(year, month, 1, 0, 0, 0, tzinfo=timezone.utc)
-        end_date = datetime(year, month, num_days, 23, 59, 59, tzinfo=timezone.utc)
-
-        print(f"Generating monthly reports for {start_date.strftime('%Y-%m')}...")
-
-        student_role = Role.query.filter_by(name="student").first()
-        if not student_role:
-            print("Student role not found.")
-            return "Student role missing."
-
-        active_students = User.query.filter(
-            User.roles.any(id=student_role.id), User.active == True
-        ).all()
-
-        if not active_students:
-            print("No active students found for monthly reports.")
-            return "No active students to report."
-
-        with mail.connect() as conn:
-            for user in active_students:
-                if not user.email:
-                    print(f"Skipping user {user.id} (no email).")
-                    continue
-
-                scores = (
-                    Score.query.filter(
-                        Score.user_id == user.id,
-                        Score.time_stamp_of_attempt >= start_date,
-                        Score.time_stamp_of_attempt <= end_date,
-                    )
-                    .order_by(Score.time_stamp_of_attempt)
-                    .all()
-                )
+        sent, failed, elapsed = send_bulk(
+            list(pending),
+            subject,
+            body_text,
+            body_html,
+            rate=current_app.config["REMINDER_RATE_LIMIT"],
+            on_sent=lambda email: recorder(pending[email]),
+        )
+    finally:
+        recorder.flush()
+    print(
+        f"Sent {sent} new quiz notifications ({failed} failed, "
+        f"{len(delivered)} already delivered) in {elapsed:.2f}s"
+    )
+    return {"sent": sent, "failed": failed, "elapsed": elapsed}
+
+
+@celery_app.task(name="tasks.report_reminder_fanout")
+def report_reminder_fanout(results, batch_id, started_at):
+    sent = sum(result["sent"] for result in results)
+    failed = sum(result["failed"] for result in results)
+    mark_completed(batch_id, failed)
+    elapsed = max(time.time() - started_at, 1e-6)
+    message = (
+        f"Sent {sent} new quiz notifications ({failed} failed) across "
+        f"{len(results)} chunks in {elapsed:.2f}s = {sent / elapsed:.1f} sends/s."
+    )
+    print(message)
+    return message
 
-                if not scores:
-                    print(
-                        f"No activity found for {user.email} in {start_date.strftime('%Y-%m')}."
-                    )
-                    continue
-
-                total_attempts = len(scores)
-                total_score_sum = sum(s.total_scored for s in scores)
-                total_possible_sum = sum(s.total_possible for s in scores)
-                average_percentage = (
-                    round((total_score_sum / total_possible_sum) * 100, 2)
-                    if total_possible_sum > 0
-                    else 0
-                )
 
-                subject = f"Your Quiz Master Activity Report for {start_date.strftime('%B %Y')}"
-
-                quiz_details_html = '<ul style="list-style-type: none; padding: 0;">'
-                quiz_details_text = ""
-                for score in scores:
-                    percentage = (
-                        round((score.total_scored / score.total_possible) * 100, 2)
-                        if score.total_possible > 0
-                        else 0
-                    )
-                    quiz_name = (
-                        f"{score.quiz.chapter.subject.name} - {score.quiz.chapter.name}"
-                        if score.quiz
-                        and score.quiz.chapter
-                        and score.quiz.chapter.subject
-                        else f"Quiz ID {score.quiz_id}"
-                    )
-                    attempt_time = score.time_stamp_of_attempt.strftime(
-                        "%Y-%m-%d %H:%M:%S %Z"
-                    )
-                    line = f"{attempt_time}: {quiz_name} - Scored {score.total_scored}/{score.total_possible} ({percentage}%)"
-                    quiz_details_html += f'<li style="margin-bottom: 8px; padding: 10px; background-color: #f9f9f9; border-radius: 4px;">{line}</li>'
-                    quiz_details_text += f"- {line}\n"
-                quiz_details_html += "</ul>"
-
-                body_html = f"""
+def render_monthly_report(period, full_name, snapshot):
+    attempts = json.loads(snapshot.details)
+    total_attempts = snapshot.attempt_count
+    average_percentage = snapshot.average_percentage
+
+    subject = f"Your Quiz Master Activity Report for {period}"
+
+    quiz_details_html = '<ul style="list-style-type: none; padding: 0;">'
+    quiz_details_text = ""
+    for attempt in attempts:
+        percentage = (
+            round((attempt["total_scored"] / attempt["total_possible"]) * 100, 2)
+            if attempt["total_possible"] > 0
+            else 0
+        )
+        line = f"{attempt['attempted_at']}: {attempt['quiz_name']} - Scored {attempt['total_scored']}/{attempt['total_possible']} ({percentage}%)"
+        quiz_details_html += f'<li style="margin-bottom: 8px; padding: 10px; background-color: #f9f9f9; border-radius: 4px;">{line}</li>'
+        quiz_details_text += f"- {line}\n"
+    quiz_details_html += "</ul>"
+
+    body_html = f"""
                 <div style="font-family: sans-serif; color: #333; line-height: 1.6;">
-                    <p style="margin-bottom: 15px;">Hello {user.full_name},</p>
-                    <p style="margin-bottom: 10px;">Here's your Quiz Master activity summary for {start_date.strftime("%B %Y")}:</p>
+                    <p style="margin-bottom: 15px;">Hello {full_name},</p>
+                    <p style="margin-bottom: 10px;">Here's your Quiz Master activity summary for {period}:</p>
                     <ul style="list-style-type: disc; margin-left: 20px; margin-bottom: 20px;">
                         <li style="margin-bottom: 5px;">Total Quizzes Attempted: <strong>{total_attempts}</strong></li>
                         <li style="margin-bottom: 5px;">Overall Average Score: <strong>{average_percentage}%</strong></li>
@@ -224,28 +311,94 @@ def generate_monthly_reports():
                     <p style="margin-top: 25px; font-size: 0.9em; color: #555;">Regards,<br>The Quiz Master Team</p>
                 </div>
                 """
-                body_text = f"Hello {user.full_name},\n\nActivity Report for {start_date.strftime('%B %Y')}:\n"
-                body_text += f"- Total Attempts: {total_attempts}\n- Average Score: {average_percentage}%\n\nDetails:\n{quiz_details_text}\n\nKeep up the great work!\n\nRegards,\nThe Quiz Master Team"
-
-                msg = Message(
-                    subject=subject,
-                    recipients=[user.email],
-                    body=body_text,
-                    html=body_html,
-                )
-                try:
-                    conn.send(msg)
-                    print(f"Sent monthly report to {user.email}")
-                except Exception as mail_err:
-                    print(f"Failed to send monthly report to {user.email}: {mail_err}")
+    body_text = f"Hello {full_name},\n\nActivity Report for {period}:\n"
+    body_text += f"- Total Attempts: {total_attempts}\n- Average Score: {average_percentage}%\n\nDetails:\n{quiz_details_text}\n\nKeep up the great work!\n\nRegards,\nThe Quiz Master Team"
+    return subject, body_text, body_html
 
-        return f"Finished generating monthly reports for {len(active_students)} potential students."
+
+@celery_app.task(name="tasks.generate_monthly_reports")
+def generate_monthly_reports():
+    if not current_app.extensions.get("mail"):
+        print("Mail extension not found in current app context")
+        return "Task failed: Mail not configured"
+    try:
+        # Only the last complete month: a ReportPeriod marker freezes the
+        # snapshots, so a month still in progress must never get one.
+        period, start_date, end_date = previous_month(datetime.now(timezone.utc))
+
+        # Snapshots are computed once per period; later runs only pick up
+        # deliveries that are still outstanding.
+        if db.session.get(ReportPeriod, period) is None:
+            print(f"Computing monthly report snapshots for {period}...")
+            created = compute_report_snapshots(period, start_date, end_date)
+            print(f"Stored {created} report snapshots for {period}.")
+
+        user_ids = claim_undelivered_snapshots(
+            period,
+            timedelta(seconds=current_app.config["MONTHLY_REPORT_RESUME_AFTER_SECONDS"]),
+            current_app.config["MONTHLY_REPORT_MAX_ATTEMPTS"],
+        )
+        if not user_ids:
+            return f"No monthly reports left to send for {period}."
+
+        chunk_size = current_app.config["MONTHLY_REPORT_CHUNK_SIZE"]
+        for i in range(0, len(user_ids), chunk_size):
+            send_monthly_report_chunk.delay(period, user_ids[i : i + chunk_size])
+
+        return (
+            f"Dispatched monthly reports for {len(user_ids)} students in "
+            f"{-(-len(user_ids) // chunk_size)} chunks."
+        )
 
     except Exception as e:
+        db.session.rollback()
         print(f"Error in generate_monthly_reports task: {e}")
         return f"Monthly report task failed: {e}"
 
 
+@celery_app.task(name="tasks.send_monthly_report_chunk")
+def send_monthly_report_chunk(period, user_ids):
+    # Plain rows rather than entities, so nothing is reloaded after commit.
+    rows = (
+        db.session.query(
+            ReportSnapshot.user_id,
+            ReportSnapshot.details,
+            ReportSnapshot.attempt_count,
+            ReportSnapshot.average_percentage,
+            User.email,
+            User.full_name,
+        )
+        .join(User, ReportSnapshot.user_id == User.id)
+        .filter(
+            ReportSnapshot.period == period,
+            ReportSnapshot.user_id.in_(user_ids),
+            ReportSnapshot.delivery_status != "sent",
+        )
+        .all()
+    )
+    user_id_by_email = {row.email: row.user_id for row in rows}
+    label = period_label(period)
+    sent_user_ids = []
+
+    sent, failed, elapsed = send_messages(
+        (
+            (row.email, *render_monthly_report(label, row.full_name, row))
+            for row in rows
+        ),
+        rate=current_app.config["MONTHLY_REPORT_RATE_LIMIT"],
+        on_sent=lambda email: sent_user_ids.append(user_id_by_email[email]),
+    )
+    record_snapshot_deliveries(
+        period, [row.user_id for row in rows], sent_user_ids
+    )
+
+    print(
+        f"Sent {sent} monthly reports ({failed} failed) in {elapsed:.2f}s "
+        f"= {sent / max(elapsed, 1e-6):.1f} sends/s"
+    )
+    return {"sent": sent, "failed": failed, "elapsed": elapsed}
+
+
 @celery_app.task(name="tasks.export_user_quiz_data_csv")
 def export_user_quiz_data_csv(user_id):
     mail = current_app.extensions.get("mail")
@@ -262,93 +415,139 @@ def export_user_quiz_data_csv(user_id):
 
         print(f"Starting CSV export for user {user.email} (ID: {user_id})...")
 
-        scores = (
-            db.session.query(
-                Score.quiz_id,
-                Quiz.date_of_quiz,
-                Chapter.name.label("chapter_name"),
-                Subject.name.label("subject_name"),
-                Score.total_scored,
-                Score.total_possible,
-                Score.time_stamp_of_attempt,
-            )
-            .join(Quiz, Score.quiz_id == Quiz.id)
-            .join(Chapter, Quiz.chapter_id == Chapter.id)
-            .join(Subject, Chapter.subject_id == Subject.id)
-            .filter(Score.user_id == user_id)
-            .order_by(Score.time_stamp_of_attempt.desc())
-            .all()
-        )
+        path, row_count = write_user_score_export(user_id)
 
-        if not scores:
+        if not row_count:
+            os.remove(path)
             print(f"No scores found for user {user.email} (ID: {user_id}) to export.")
             return f"No scores to export for user {user_id}."
 
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        headers = [
-            "Quiz ID",
-            "Subject",
-            "Chapter",
-            "Quiz Date",
-            "Attempt Timestamp",
-            "Score",
-            "Total Possible",
-            "Percentage",
-        ]
-        writer.writerow(headers)
-
-        for score_data in scores:
-            percentage = (
-                round((score_data.total_scored / score_data.total_possible) * 100, 2)
-                if score_data.total_possible > 0
-                else 0
-            )
-            writer.writerow(
-                [
-                    score_data.quiz_id,
-                    score_data.subject_name,
-                    score_data.chapter_name,
-                    score_data.date_of_quiz.strftime("%Y-%m-%d")
-                    if score_data.date_of_quiz
-                    else "N/A",
-                    score_data.time_stamp_of_attempt.strftime("%Y-%m-%d %H:%M:%S %Z"),
-                    score_data.total_scored,
-                    score_data.total_possible,
-                    percentage,
-                ]
+        filename = os.path.basename(path)
+        attach = os.path.getsize(path) <= current_app.config["EXPORT_ATTACHMENT_MAX_BYTES"]
+        if attach:
+            delivery_text = "Please find your requested quiz score data attached as a gzip-compressed CSV file."
+        else:
+            download_url = (
+                f"{current_app.config['APP_BASE_URL']}/api/user/export/files/{filename}"
             )
-
-        csv_data = output.getvalue()
-        output.close()
+            delivery_text = f"Your quiz score export is too large to attach. Log in and download it from {download_url} within {current_app.config['EXPORT_RETENTION_HOURS']} hours."
 
         subject = "Your Quiz Master Score Export"
-        body_text = f"Hello {user.full_name},\n\nPlease find your requested quiz score data attached as a CSV file.\n\nRegards,\nQuiz Master Team"
+        body_text = f"Hello {user.full_name},\n\n{delivery_text}\n\nRegards,\nQuiz Master Team"
         body_html = f"""
         <div style="font-family: sans-serif; color: #333; line-height: 1.6;">
             <p style="margin-bottom: 15px;">Hello {user.full_name},</p>
-            <p style="margin-bottom: 20px;">Please find your requested quiz score data attached as a CSV file.</p>
+            <p style="margin-bottom: 20px;">{delivery_text}</p>
             <p style="margin-top: 25px; font-size: 0.9em; color: #555;">Regards,<br>The Quiz Master Team</p>
         </div>
         """
 
-        filename = (
-            f"quiz_scores_{user.id}_{datetime.now(timezone.utc).strftime('%Y%m%d')}.csv"
-        )
-
         msg = Message(
             subject=subject, recipients=[user.email], body=body_text, html=body_html
         )
-        msg.attach(
-            filename=filename, content_type="text/csv", data=csv_data.encode("utf-8")
-        )
+        if attach:
+            with open(path, "rb") as fh:
+                msg.attach(
+                    filename=filename, content_type="application/gzip", data=fh.read()
+                )
 
         mail.send(msg)
-        print(f"Sent score export CSV to {user.email}")
+        if attach:
+            # The email carries the data; nothing will download the file.
+            os.remove(path)
+        print(f"Sent score export ({row_count} rows) to {user.email}")
 
         return f"Successfully exported and emailed scores for user {user_id}."
 
     except Exception as e:
         print(f"Error in export_user_quiz_data_csv task for user {user_id}: {e}")
         return f"CSV export task failed for user {user_id}: {e}"
+
+
+@celery_app.task(name="tasks.purge_expired_exports")
+def purge_expired_exports():
+    try:
+        max_age = current_app.config["EXPORT_RETENTION_HOURS"] * 60 * 60
+        stale = fail_stale_export_jobs(
+            current_app.config["BULK_EXPORT_TIMEOUT_HOURS"] * 60 * 60
+        )
+        removed = purge_user_exports(max_age)
+        jobs = purge_export_jobs(max_age)
+        return (
+            f"Marked {stale} stale bulk export jobs failed; removed {removed} "
+            f"expired export files and {jobs} bulk export jobs."
+        )
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in purge_expired_exports task: {e}")
+        return f"Purging expired exports failed: {e}"
+
+
+@celery_app.task(name="tasks.export_all_scores")
+def export_all_scores(job_id):
+    try:
+        chunk_size = current_app.config["BULK_EXPORT_CHUNK_SIZE"]
+        parallelism = current_app.config["BULK_EXPORT_PARALLELISM"]
+        partitions = plan_score_partitions(chunk_size)
+        update_export_job(
+            job_id,
+            status="running",
+            total_partitions=len(partitions),
+            started_at=datetime.now(timezone.utc),
+        )
+        if not partitions:
+            return finalize_score_export([], job_id)
+
+        chord(
+            export_score_partitions.s(job_id, lane)
+            for lane in split_lanes(partitions, parallelism)
+        )(finalize_score_export.s(job_id))
+        return f"Dispatched {len(partitions)} partitions for export {job_id}."
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in export_all_scores task for job {job_id}: {e}")
+        update_export_job(job_id, status="failed", error=str(e))
+        return f"Bulk score export {job_id} failed: {e}"
+
+
+@celery_app.task(name="tasks.export_score_partitions")
+def export_score_partitions(job_id, partitions):
+    try:
+        job_dir = export_job_dir(job_id)
+        parts = []
+        for index, first_id, last_id in partitions:
+            parts.append(write_score_partition(job_dir, index, first_id, last_id))
+            mark_partition_done(job_id)
+        return parts
+
+    except Exception as e:
+        # A failed header task means the chord never runs finalize_score_export,
+        # so record the failure here and re-raise to stop the chord.
+        db.session.rollback()
+        print(f"Error in export_score_partitions task for job {job_id}: {e}")
+        update_export_job(job_id, status="failed", error=str(e))
+        raise
+
+
+@celery_app.task(name="tasks.finalize_score_export")
+def finalize_score_export(lane_results, job_id):
+    try:
+        update_export_job(job_id, status="merging")
+        parts = [part for lane in lane_results for part in lane]
+        manifest = merge_score_parts(export_job_dir(job_id), parts)
+        update_export_job(
+            job_id,
+            status="done",
+            rows=manifest["rows"],
+            parts=len(parts),
+            finished_at=datetime.fromisoformat(manifest["created_at"]),
+        )
+        print(f"Bulk score export {job_id} finished: {manifest['rows']} rows.")
+        return f"Exported {manifest['rows']} scores for job {job_id}."
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in finalize_score_export task for job {job_id}: {e}")
+        update_export_job(job_id, status="failed", error=str(e))
+        return f"Bulk score export {job_id} failed: {e}"
@@ -0,0 +1,201 @@
+"""One app for the whole run, on a throwaway SQLite file with the in-process
+cache, attempt store and leaderboards. Every test starts from an empty
+catalogue with only the seeded admin account."""
+
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix="quiz_master_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["SQLITE_WAL_CHECKPOINT_INTERVAL"] = "0"
+os.environ["EXPORT_DIR"] = os.path.join(_TMP_DIR, "exports")
+os.environ["PASSWORD_VERIFY_WORKERS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app as flask_app  # noqa: E402
+from models import Chapter, Question, Quiz, Subject, User, db, roles_users  # noqa: E402
+
+ADMIN_EMAIL = "admin@gmail.com"
+KEPT_TABLES = {"role", "user", "roles_users"}
+# Per-app singletons that hold state between requests.
+STATEFUL_EXTENSIONS = ("cache", "attempt_store", "leaderboards")
+
+
+class ApiClient:
+    """A test client that sends one user's auth token with every request."""
+
+    def __init__(self, client, token, user_id):
+        self.client = client
+        self.token = token
+        self.user_id = user_id
+
+    def open(self, method, url, headers=None, **kwargs):
+        headers = {"Authentication-Token": self.token, **(headers or {})}
+        return self.client.open(url, method=method, headers=headers, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.open("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.open("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.open("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.open("DELETE", url, **kwargs)
+
+
+def login(email, password):
+    client = flask_app.test_client()
+    response = client.post(
+        "/api/auth/login", json={"email": email, "password": password}
+    )
+    assert response.status_code == 200, response.get_data(as_text=True)
+    with flask_app.app_context():
+        user_id = db.session.query(User.id).filter(User.email == email).scalar()
+    return ApiClient(client, response.json["token"], user_id)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _tmp_dir():
+    yield _TMP_DIR
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def app():
+    config = dict(flask_app.config)
+    with flask_app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            if table.name not in KEPT_TABLES:
+                db.session.execute(table.delete())
+        students = db.session.query(User.id).filter(User.email != ADMIN_EMAIL)
+        db.session.execute(
+            roles_users.delete().where(roles_users.c.user_id.in_(students))
+        )
+        db.session.execute(User.__table__.delete().where(User.email != ADMIN_EMAIL))
+        db.session.commit()
+    for name in STATEFUL_EXTENSIONS:
+        flask_app.extensions.pop(name, None)
+    flask_app.extensions["mail"].suppress = True
+
+    yield flask_app
+
+    flask_app.config.clear()
+    flask_app.config.update(config)
+
+
+@pytest.fixture
+def admin(app):
+    return login(ADMIN_EMAIL, "admin")
+
+
+@pytest.fixture
+def make_student(app):
+    count = [0]
+
+    def make(full_name=None):
+        count[0] += 1
+        email = f"student{count[0]}@example.com"
+        response = app.test_client().post(
+            "/api/auth/register",
+            json={
+                "email": email,
+                "password": "student",
+                "full_name": full_name or f"Student {count[0]}",
+                "qualification": "B.Sc",
+                "dob": "2004-01-01",
+            },
+        )
+        assert response.status_code == 201, response.get_data(as_text=True)
+        return login(email, "student")
+
+    return make
+
+
+@pytest.fixture
+def student(make_student):
+    return make_student()
+
+
+@pytest.fixture
+def make_quiz(app):
+    """Create a quiz whose question ``j`` has correct option ``1 + j % 4``."""
+
+    def make(
+        questions=4,
+        days_ahead=1,
+        time_duration="00:30",
+        max_attempts=None,
+        subject_id=None,
+    ):
+        with app.app_context():
+            if subject_id is None:
+                subject = Subject(name=f"Subject {Subject.query.count()}")
+                db.session.add(subject)
+                db.session.flush()
+                subject_id = subject.id
+            chapter = Chapter(name="Chapter", subject_id=subject_id)
+            db.session.add(chapter)
+            db.session.flush()
+            quiz = Quiz(
+                chapter_id=chapter.id,
+                date_of_quiz=datetime.now() + timedelta(days=days_ahead),
+                time_duration=time_duration,
+                max_attempts=max_attempts,
+            )
+            db.session.add(quiz)
+            db.session.flush()
+            db.session.add_all(
+                Question(
+                    quiz_id=quiz.id,
+                    question_statement=f"Question {j}",
+                    option1="a",
+                    option2="b",
+                    option3="c",
+                    option4="d",
+                    correct_option=1 + j % 4,
+                )
+                for j in range(questions)
+            )
+            db.session.commit()
+            question_ids = [
+                question_id
+                for (question_id,) in db.session.query(Question.id)
+                .filter(Question.quiz_id == quiz.id)
+                .order_by(Question.id)
+            ]
+            return quiz.id, subject_id, question_ids
+
+    return make
+
+
+@pytest.fixture
+def answers():
+    """``answers(question_ids, right)`` gets the first ``right`` questions of a
+    ``make_quiz`` quiz right and the rest wrong."""
+
+    def build(question_ids, right):
+        return {
+            str(question_id): (1 + j % 4) if j < right else (1 + (j + 1) % 4)
+            for j, question_id in enumerate(question_ids)
+        }
+
+    return build
+
+
+@pytest.fixture
+def eager_tasks(monkeypatch):
+    """The tasks module with Celery tasks, chords included, run inline."""
+    import tasks
+
+    monkeypatch.setitem(tasks.celery_app.conf, "task_always_eager", True)
+    return tasks
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+
+from activity import MemoryActivityStore, get_tracker
+from models import User, db
+
+
+@pytest.fixture
+def tracker(app):
+    """The app's activity tracker with nothing left pending from earlier tests."""
+    with app.app_context():
+        tracker = get_tracker()
+        tracker.flush()
+    return tracker
+
+
+def stored_last_login(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).last_login
+
+
+def test_logins_are_buffered_until_the_flush(app, admin, tracker, make_student):
+    student = make_student()
+    assert stored_last_login(app, student.user_id) is None
+
+    # The admin list already shows the buffered value.
+    users = {user["id"]: user for user in admin.get("/api/admin/users").json}
+    pending = users[student.user_id]["last_login"]
+    assert pending is not None
+
+    with app.app_context():
+        assert tracker.flush() >= 1
+        assert tracker.pending("last_login", [student.user_id]) == {}
+    assert stored_last_login(app, student.user_id) == datetime.fromisoformat(pending)
+
+
+def test_a_flush_with_nothing_pending_writes_nothing(app, tracker):
+    with app.app_context():
+        assert tracker.flush() == 0
+
+
+def test_a_login_recorded_during_a_flush_stays_pending():
+    store = MemoryActivityStore()
+    store.record("last_login", 1, "2030-01-01T00:00:00")
+    flushed = store.snapshot("last_login")
+    store.record("last_login", 1, "2030-01-01T00:05:00")
+    store.discard("last_login", flushed)
+    assert store.get_many("last_login", [1]) == {1: "2030-01-01T00:05:00"}
@@ -0,0 +1,55 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import Subject, db
+
+
+def test_admin_users_page_by_id(admin, make_student):
+    for _ in range(3):
+        make_student()
+    first = admin.get("/api/admin/users?limit=2")
+    cursor = first.headers["X-Next-Cursor"]
+    rest = admin.get(f"/api/admin/users?limit=2&cursor={cursor}")
+    ids = [user["id"] for user in first.json + rest.json]
+    assert ids == sorted(ids)
+    assert len(ids) == 4
+    assert "X-Next-Cursor" not in rest.headers
+
+
+def test_admin_lists_without_a_page_return_every_row(app, admin):
+    with app.app_context():
+        db.session.add_all(Subject(name=f"Subject {i:03}") for i in range(120))
+        db.session.commit()
+
+    everything = admin.get("/api/admin/subjects")
+    assert len(everything.json) == 120
+    assert "X-Next-Cursor" not in everything.headers
+
+    page = admin.get("/api/admin/subjects?limit=100")
+    assert len(page.json) == 100
+    rest = admin.get(f"/api/admin/subjects?cursor={page.headers['X-Next-Cursor']}")
+    assert len(rest.json) == 20
+
+
+def test_user_list_selects_only_the_requested_fields(app, admin, make_student):
+    make_student()
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "FROM user" in statement and "email" in statement:
+            statements.append(statement)
+
+    # Listing runs on the read-only engine, so listen on every engine.
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        trimmed = admin.get("/api/admin/users?fields=id,email").json
+        full = admin.get("/api/admin/users").json
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert set(trimmed[0]) == {"id", "email"}
+    assert sorted(full[1]["roles"]) == ["student"]
+    trimmed_sql, full_sql = statements[-2:]
+    assert "group_concat" not in trimmed_sql
+    assert "user.qualification" not in trimmed_sql
+    assert "group_concat" in full_sql
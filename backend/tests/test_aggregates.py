@@ -0,0 +1,51 @@
+from aggregates import rebuild_user_performance
+from models import UserPerformance, db
+
+
+def take_quiz(client, quiz_id, answers):
+    client.post(f"/api/user/quizzes/{quiz_id}/start")
+    response = client.post(
+        f"/api/user/quizzes/{quiz_id}/submit", json={"answers": answers}
+    )
+    assert response.status_code == 200
+
+
+def performance_rows(app):
+    with app.app_context():
+        return sorted(
+            (row.user_id, row.attempt_count, row.percentage_sum, row.last_attempt_at)
+            for row in UserPerformance.query
+        )
+
+
+def test_dashboard_stats_follow_each_submission(
+    app, make_quiz, make_student, answers
+):
+    quiz_id, _, question_ids = make_quiz(questions=4, max_attempts=None)
+    student = make_student()
+    stats = student.get("/api/user/dashboard").json["performance_stats"]
+    assert stats == {"total_quizzes_attempted": 0, "average_score": 0}
+
+    take_quiz(student, quiz_id, answers(question_ids, 4))
+    take_quiz(student, quiz_id, answers(question_ids, 1))
+    take_quiz(student, quiz_id, answers(question_ids, 0))
+
+    stats = student.get("/api/user/dashboard").json["performance_stats"]
+    assert stats == {"total_quizzes_attempted": 3, "average_score": 41.67}
+
+
+def test_incremental_aggregates_match_a_rebuild(
+    app, make_quiz, make_student, answers
+):
+    quiz_id, _, question_ids = make_quiz(questions=4, max_attempts=None)
+    for right in (1, 3):
+        student = make_student()
+        take_quiz(student, quiz_id, answers(question_ids, right))
+        take_quiz(student, quiz_id, answers(question_ids, 4))
+
+    incremental = performance_rows(app)
+    with app.app_context():
+        db.session.execute(UserPerformance.__table__.delete())
+        db.session.commit()
+        assert rebuild_user_performance() == 2
+    assert performance_rows(app) == incremental
@@ -0,0 +1,184 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+import ingest
+from attempts import get_attempt_store
+from models import ATTEMPT_EXPIRED, QuizAttempt, db
+
+
+def start(client, quiz_id):
+    return client.post(f"/api/user/quizzes/{quiz_id}/start")
+
+
+def autosave(client, quiz_id, answers):
+    return client.put(
+        f"/api/user/quizzes/{quiz_id}/attempt/answers", json={"answers": answers}
+    )
+
+
+def submit(client, quiz_id, answers, query=""):
+    return client.post(
+        f"/api/user/quizzes/{quiz_id}/submit{query}", json={"answers": answers}
+    )
+
+
+def test_start_opens_an_attempt_with_a_deadline(student, make_quiz):
+    quiz_id, _, question_ids = make_quiz(time_duration="00:30")
+    response = start(student, quiz_id)
+    assert response.status_code == 200
+    assert [q["id"] for q in response.json["questions"]] == question_ids
+    assert response.headers["X-Attempt-Number"] == "1"
+    assert 1790 <= int(response.headers["X-Attempt-Remaining"]) <= 1800
+
+    again = start(student, quiz_id)
+    assert again.headers["X-Attempt-Number"] == "1"
+    assert again.headers["X-Attempt-Deadline"] == response.headers["X-Attempt-Deadline"]
+
+
+def test_autosave_is_merged_and_never_touches_the_database(
+    app, student, make_quiz
+):
+    quiz_id, _, question_ids = make_quiz()
+    start(student, quiz_id)
+    # Warms the token lookup and the attempt store.
+    student.get(f"/api/user/quizzes/{quiz_id}/attempt")
+    first, second = (str(qid) for qid in question_ids[:2])
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        assert autosave(student, quiz_id, {first: 2, second: 3}).json["saved"] == 2
+        assert autosave(student, quiz_id, {second: None}).status_code == 200
+        # Bad options and ids are dropped; "x" is not a question id at all.
+        assert autosave(student, quiz_id, {first: 9, "x": 1}).json["saved"] == 0
+        state = student.get(f"/api/user/quizzes/{quiz_id}/attempt").json
+    finally:
+        with app.app_context():
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    assert state["answers"] == {first: 2}
+    assert statements == []
+
+
+def test_submit_grades_autosaved_and_posted_answers(app, student, make_quiz):
+    quiz_id, _, question_ids = make_quiz(questions=4)
+    start(student, quiz_id)
+    autosave(student, quiz_id, {str(question_ids[0]): 1, str(question_ids[1]): 2})
+    # Posted answers win over autosaved ones; unknown question ids are ignored.
+    response = submit(
+        student, quiz_id, {str(question_ids[1]): 4, str(question_ids[2]): 3, "999": 1}
+    )
+    assert response.status_code == 200
+    assert response.json["total_scored"] == 2
+    assert response.json["total_possible"] == 4
+    assert response.json["status"] == "submitted"
+
+    with app.app_context():
+        attempt = QuizAttempt.query.filter_by(quiz_id=quiz_id).one()
+        assert attempt.status == "submitted"
+        assert attempt.score_id == response.json["score_id"]
+
+    assert submit(student, quiz_id, {}).status_code == 409
+    assert student.get(f"/api/user/quizzes/{quiz_id}/attempt").status_code == 404
+
+
+def test_max_attempts_is_enforced(student, make_quiz):
+    quiz_id, _, _ = make_quiz(max_attempts=2)
+    for number in ("1", "2"):
+        assert start(student, quiz_id).headers["X-Attempt-Number"] == number
+        assert submit(student, quiz_id, {}).status_code == 200
+    assert start(student, quiz_id).status_code == 409
+
+
+def test_unlimited_attempts_when_max_attempts_is_null(student, make_quiz):
+    quiz_id, _, _ = make_quiz(max_attempts=None)
+    for _ in range(3):
+        assert start(student, quiz_id).status_code == 200
+        assert submit(student, quiz_id, {}).status_code == 200
+    assert student.get(f"/api/user/quizzes/{quiz_id}").json["status"] == "available"
+
+
+def test_late_submit_only_counts_autosaved_answers(app, student, make_quiz):
+    quiz_id, _, question_ids = make_quiz(questions=2)
+    start(student, quiz_id)
+    autosave(student, quiz_id, {str(question_ids[0]): 1})
+    with app.app_context():
+        attempt = QuizAttempt.query.filter_by(quiz_id=quiz_id).one()
+        attempt.deadline = datetime.utcnow() - timedelta(minutes=5)
+        db.session.commit()
+        # Drop the stored session so the new deadline is read back.
+        get_attempt_store()._sessions.clear()
+
+    response = submit(student, quiz_id, {str(question_ids[1]): 2})
+    assert response.status_code == 200
+    assert response.json["status"] == ATTEMPT_EXPIRED
+    assert response.json["total_scored"] == 1
+
+
+def test_failed_group_write_keeps_the_attempt_open(
+    app, student, make_quiz, monkeypatch
+):
+    app.config["SUBMISSION_INGEST_MODE"] = "group"
+    quiz_id, _, question_ids = make_quiz()
+    start(student, quiz_id)
+    autosave(student, quiz_id, {str(question_ids[0]): 1})
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(ingest, "_add_submission", fail)
+    monkeypatch.setattr(ingest, "persist_submission", fail)
+    response = submit(student, quiz_id, {}, query="?async=1")
+    assert response.status_code == 202
+    receipt = response.json["receipt"]
+    for _ in range(100):
+        if student.get(f"/api/user/submissions/{receipt}").json["status"] == "failed":
+            break
+        time.sleep(0.02)
+    else:
+        raise AssertionError("the group write never failed")
+
+    state = student.get(f"/api/user/quizzes/{quiz_id}/attempt")
+    assert state.status_code == 200
+    assert state.json["answers"] == {str(question_ids[0]): 1}
+
+    monkeypatch.undo()
+    app.config["SUBMISSION_INGEST_MODE"] = "group"
+    response = submit(student, quiz_id, {}, query="?async=1")
+    assert response.status_code == 202
+    receipt = response.json["receipt"]
+    for _ in range(100):
+        if student.get(f"/api/user/quizzes/{quiz_id}/attempt").status_code == 404:
+            break
+        time.sleep(0.02)
+    else:
+        raise AssertionError("the attempt was not released after its write")
+    assert student.get(f"/api/user/submissions/{receipt}").json["status"] == "committed"
+
+
+def test_reopening_during_the_grace_window_resumes_the_attempt(
+    app, student, make_quiz
+):
+    quiz_id, _, question_ids = make_quiz(questions=2, max_attempts=1)
+    start(student, quiz_id)
+    autosave(student, quiz_id, {str(question_ids[0]): 1})
+    with app.app_context():
+        grace = app.config["ATTEMPT_GRACE_SECONDS"]
+        attempt = QuizAttempt.query.filter_by(quiz_id=quiz_id).one()
+        attempt.deadline = datetime.utcnow() - timedelta(seconds=grace / 2)
+        db.session.commit()
+        get_attempt_store()._sessions.clear()
+
+    reopened = start(student, quiz_id)
+    assert reopened.status_code == 200
+    assert reopened.headers["X-Attempt-Number"] == "1"
+    assert reopened.headers["X-Attempt-Remaining"] == "0"
+    response = submit(student, quiz_id, {str(question_ids[1]): 2})
+    assert response.status_code == 200
+    assert response.json["total_scored"] == 2
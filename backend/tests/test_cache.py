@@ -0,0 +1,38 @@
+from cache import MemoryBackend, get_version, invalidate
+from models import Subject, db
+
+
+def test_invalidate_bumps_the_namespace_version(app):
+    with app.app_context():
+        before = get_version("subjects")
+        invalidate("subjects")
+        assert get_version("subjects") != before
+        assert get_version("chapters") == get_version("chapters")
+
+
+def test_counters_outlive_lru_eviction():
+    cache = MemoryBackend(max_entries=2)
+    cache.incr("ns:subjects")
+    for i in range(10):
+        cache.set(f"key:{i}", b"value")
+    assert cache.get_counters(["ns:subjects"]) == [1]
+    assert cache.get("key:0") is None
+
+
+def test_cached_view_is_served_until_invalidated(app, admin):
+    assert admin.get("/api/admin/subjects").json == []
+    with app.app_context():
+        # Written behind the API's back, so nothing invalidates the view.
+        db.session.add(Subject(name="Physics"))
+        db.session.commit()
+    assert admin.get("/api/admin/subjects").json == []
+
+    with app.app_context():
+        invalidate("subjects")
+    assert [s["name"] for s in admin.get("/api/admin/subjects").json] == ["Physics"]
+
+
+def test_admin_writes_invalidate_cached_views(admin):
+    assert admin.get("/api/admin/subjects").json == []
+    assert admin.post("/api/admin/subjects", json={"name": "Maths"}).status_code == 201
+    assert [s["name"] for s in admin.get("/api/admin/subjects").json] == ["Maths"]
@@ -0,0 +1,16 @@
+from cache import MemoryBackend
+
+
+def test_etags_are_not_reused_after_the_counters_reset(app, student):
+    first = student.get("/api/user/subjects")
+    etag = first.headers["ETag"]
+    assert (
+        student.get("/api/user/subjects", headers={"If-None-Match": etag}).status_code
+        == 304
+    )
+
+    # A fresh backend starts its counters from zero again, like a restart.
+    app.extensions["cache"] = MemoryBackend()
+    response = student.get("/api/user/subjects", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,127 @@
+import csv
+import gzip
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import exports
+import tasks
+from exports import (
+    create_export_job,
+    export_dir,
+    fail_stale_export_jobs,
+    get_export_job,
+    iter_csv_chunks,
+    purge_export_jobs,
+    purge_user_exports,
+    write_user_score_export,
+)
+from models import ExportJob, db
+
+
+def take_quiz(client, quiz_id, answers):
+    client.post(f"/api/user/quizzes/{quiz_id}/start")
+    client.post(f"/api/user/quizzes/{quiz_id}/submit", json={"answers": answers})
+
+
+def test_csv_chunks_join_to_the_whole_file(monkeypatch):
+    monkeypatch.setattr(exports, "CHUNK_SIZE", 16)
+    rows = [[n, f"row {n}"] for n in range(10)]
+    chunks = list(iter_csv_chunks(["id", "name"], rows))
+    assert len(chunks) > 1
+    assert list(csv.reader(io.StringIO("".join(chunks)))) == [
+        ["id", "name"],
+        *[[str(n), f"row {n}"] for n in range(10)],
+    ]
+
+
+def test_score_export_streams_the_users_scores(make_quiz, make_student, answers):
+    quiz_id, _, question_ids = make_quiz(questions=4, max_attempts=None)
+    student, other = make_student(), make_student()
+    take_quiz(student, quiz_id, answers(question_ids, 3))
+    take_quiz(student, quiz_id, answers(question_ids, 1))
+    take_quiz(other, quiz_id, answers(question_ids, 4))
+
+    response = student.get("/api/user/export/scores.csv")
+    assert response.mimetype == "text/csv"
+    assert "attachment" in response.headers["Content-Disposition"]
+    header, *rows = csv.reader(io.StringIO(response.get_data(as_text=True)))
+    assert header[0] == "Quiz ID"
+    assert sorted(row[-1] for row in rows) == ["25.0", "75.0"]
+
+
+def test_export_files_are_gzipped_and_private(app, make_quiz, make_student, answers):
+    quiz_id, _, question_ids = make_quiz(questions=2)
+    student, other = make_student(), make_student()
+    take_quiz(student, quiz_id, answers(question_ids, 2))
+    with app.app_context():
+        path, count = write_user_score_export(student.user_id)
+    assert count == 1
+    with gzip.open(path, "rt") as fh:
+        assert len(list(csv.reader(fh))) == 2
+
+    filename = os.path.basename(path)
+    response = student.get(f"/api/user/export/files/{filename}")
+    assert response.status_code == 200
+    assert gzip.decompress(response.get_data()).startswith(b"Quiz ID")
+    assert other.get(f"/api/user/export/files/{filename}").status_code == 404
+
+
+def test_purge_removes_only_expired_user_exports(app):
+    with app.app_context():
+        directory = export_dir()
+        old, new, unrelated = (
+            os.path.join(directory, name)
+            for name in (
+                "quiz_scores_1_20200101.csv.gz",
+                "quiz_scores_2_20200101.csv.gz",
+                "notes.txt",
+            )
+        )
+        for path in (old, new, unrelated):
+            open(path, "w").close()
+        an_hour_ago = time.time() - 60 * 60
+        for path in (old, unrelated):
+            os.utime(path, (an_hour_ago, an_hour_ago))
+
+        assert purge_user_exports(30 * 60) == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(new) and os.path.exists(unrelated)
+    for path in (new, unrelated):
+        os.remove(path)
+
+
+def test_a_failed_lane_marks_the_job_failed(app, monkeypatch):
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tasks, "write_score_partition", fail)
+    with app.app_context():
+        create_export_job("lane", None)
+        tasks.update_export_job("lane", status="running", total_partitions=1)
+        with pytest.raises(OSError):
+            tasks.export_score_partitions("lane", [(0, 1, 100)])
+        job = get_export_job("lane")
+    assert job["status"] == "failed"
+    assert job["error"] == "disk full"
+
+
+def test_stale_running_jobs_are_failed_and_then_purged(app):
+    with app.app_context():
+        for job_id in ("stale", "recent"):
+            create_export_job(job_id, None)
+            tasks.update_export_job(job_id, status="running")
+        ExportJob.query.filter_by(id="stale").update(
+            {"requested_at": datetime.utcnow() - timedelta(hours=7)}
+        )
+        db.session.commit()
+
+        assert fail_stale_export_jobs(6 * 60 * 60) == 1
+        assert get_export_job("stale")["status"] == "failed"
+        assert get_export_job("recent")["status"] == "running"
+
+        assert purge_export_jobs(6 * 60 * 60) == 1
+        assert get_export_job("stale") is None
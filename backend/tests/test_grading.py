@@ -0,0 +1,61 @@
+from cache import MemoryBackend
+from grading import get_answer_key, grade, touch_quiz_content
+from models import Question, db
+
+
+def test_answer_key_maps_questions_to_correct_options(app, make_quiz):
+    quiz_id, subject_id, question_ids = make_quiz(questions=3)
+    with app.app_context():
+        answer_key = get_answer_key(quiz_id)
+    assert answer_key == {
+        "subject_id": subject_id,
+        "answers": {str(qid): 1 + j for j, qid in enumerate(question_ids)},
+    }
+
+
+def test_unknown_quiz_has_no_answer_key(app):
+    with app.app_context():
+        assert get_answer_key(12345) is None
+
+
+def test_grade_counts_matching_answers(app, make_quiz, answers):
+    quiz_id, _, question_ids = make_quiz(questions=4)
+    with app.app_context():
+        answer_key = get_answer_key(quiz_id)
+    assert grade(answer_key, answers(question_ids, 3)) == (3, 4)
+    assert grade(answer_key, {}) == (0, 4)
+    assert grade(answer_key, {"999": 1}) == (0, 4)
+
+
+def test_answer_key_follows_question_edits(app, admin, make_quiz):
+    quiz_id, _, question_ids = make_quiz(questions=2)
+    with app.app_context():
+        assert get_answer_key(quiz_id)["answers"][str(question_ids[0])] == 1
+
+    response = admin.put(
+        f"/api/admin/questions/{question_ids[0]}", json={"correct_option": 4}
+    )
+    assert response.status_code == 200
+    with app.app_context():
+        assert get_answer_key(quiz_id)["answers"][str(question_ids[0])] == 4
+
+
+def test_answer_key_freshness_does_not_depend_on_the_cache(app, make_quiz):
+    quiz_id, _, question_ids = make_quiz(questions=2)
+    with app.app_context():
+        get_answer_key(quiz_id)
+        # Losing the cache's counters must not bring an old key back.
+        app.extensions["cache"] = MemoryBackend()
+        db.session.get(Question, question_ids[1]).correct_option = 3
+        touch_quiz_content(quiz_id)
+        db.session.commit()
+        assert get_answer_key(quiz_id)["answers"][str(question_ids[1])] == 3
+
+
+def test_deleted_question_leaves_the_answer_key(app, admin, make_quiz):
+    quiz_id, _, question_ids = make_quiz(questions=2)
+    with app.app_context():
+        get_answer_key(quiz_id)
+    assert admin.delete(f"/api/admin/questions/{question_ids[0]}").status_code == 204
+    with app.app_context():
+        assert list(get_answer_key(quiz_id)["answers"]) == [str(question_ids[1])]
@@ -0,0 +1,71 @@
+import pytest
+
+from histograms import (
+    BUCKET_COUNT,
+    QUIZ,
+    SUBJECT,
+    histogram_counts,
+    percentile_of,
+    rebuild_histograms,
+    score_bucket,
+)
+
+
+def counts(**buckets):
+    result = [0] * BUCKET_COUNT
+    for bucket, count in buckets.items():
+        result[int(bucket[1:])] = count
+    return result
+
+
+def test_score_bucket_edges():
+    assert score_bucket(0, 4) == 0
+    assert score_bucket(1, 4) == BUCKET_COUNT // 4
+    assert score_bucket(4, 4) == BUCKET_COUNT - 1
+    assert score_bucket(0, 0) == 0
+
+
+def test_percentile_interpolates_within_the_bucket():
+    histogram = counts(b0=1, b10=2, b19=1)
+    assert percentile_of(histogram, 0) == 0
+    # Below 50: the one score in bucket 0.
+    assert percentile_of(histogram, 50) == pytest.approx(25.0)
+    # Halfway through bucket 10 (50-55): one plus half of its two scores.
+    assert percentile_of(histogram, 52.5) == pytest.approx(50.0)
+    assert percentile_of(histogram, 100) == pytest.approx(100.0)
+
+
+def test_percentile_of_an_empty_histogram_is_none():
+    assert percentile_of([0] * BUCKET_COUNT, 50) is None
+
+
+def test_distribution_endpoint(app, make_quiz, make_student, answers):
+    quiz_id, subject_id, question_ids = make_quiz(questions=4)
+    for right in (1, 2, 4):
+        student = make_student()
+        student.post(f"/api/user/quizzes/{quiz_id}/start")
+        student.post(
+            f"/api/user/quizzes/{quiz_id}/submit",
+            json={"answers": answers(question_ids, right)},
+        )
+
+    body = student.get(f"/api/user/distributions/quizzes/{quiz_id}?score=50").json
+    assert body["total"] == 3
+    assert [b["count"] for b in body["buckets"] if b["count"]] == [1, 1, 1]
+    assert body["percentile"] == pytest.approx(33.3)
+
+    subject = student.get(f"/api/user/distributions/subjects/{subject_id}").json
+    assert subject["total"] == 3
+
+    with app.app_context():
+        before = histogram_counts(QUIZ, quiz_id), histogram_counts(SUBJECT, subject_id)
+        rebuild_histograms()
+        after = histogram_counts(QUIZ, quiz_id), histogram_counts(SUBJECT, subject_id)
+    assert before == after
+
+
+@pytest.mark.parametrize("score", ["nan", "inf", "-inf", "-1", "100.5", "high"])
+def test_distribution_rejects_bad_scores(make_quiz, student, score):
+    quiz_id, _, _ = make_quiz()
+    response = student.get(f"/api/user/distributions/quizzes/{quiz_id}?score={score}")
+    assert response.status_code == 400
@@ -0,0 +1,76 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from main import user_datastore
+from models import User, db
+
+
+def status_of(client, url):
+    # JSON requests get a 401 instead of a redirect to the login page.
+    return client.get(url, headers={"Accept": "application/json"}).status_code
+
+
+def user_queries(client, url):
+    """Status of ``client`` GETting ``url`` and the user-table SELECTs it ran."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.startswith("SELECT") and "FROM user" in statement:
+            statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        status = client.get(url).status_code
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    return status, statements
+
+
+def test_token_lookups_are_served_from_the_cache(student):
+    assert student.get("/api/user/subjects").status_code == 200
+    status, statements = user_queries(student, "/api/user/subjects")
+    assert status == 200
+    assert statements == []
+
+
+def test_deactivating_a_user_takes_effect_at_once(admin, student):
+    assert student.get("/api/user/subjects").status_code == 200
+    response = admin.put(f"/api/admin/users/{student.user_id}/toggle-active")
+    assert response.json["active"] is False
+    assert status_of(student, "/api/user/subjects") == 401
+
+    admin.put(f"/api/admin/users/{student.user_id}/toggle-active")
+    assert student.get("/api/user/subjects").status_code == 200
+
+
+def test_role_changes_through_the_datastore_invalidate_the_identity(app, student):
+    assert student.get("/api/admin/subjects").status_code == 403
+
+    with app.app_context():
+        user = db.session.get(User, student.user_id)
+        user_datastore.add_role_to_user(user, "admin")
+        db.session.commit()
+    assert student.get("/api/admin/subjects").status_code == 200
+
+    with app.app_context():
+        user = db.session.get(User, student.user_id)
+        user_datastore.remove_role_from_user(user, "admin")
+        db.session.commit()
+    assert student.get("/api/admin/subjects").status_code == 403
+
+
+def test_a_rolled_back_change_keeps_the_cached_identity(app, student):
+    student.get("/api/user/subjects")
+    with app.app_context():
+        user = db.session.get(User, student.user_id)
+        user_datastore.add_role_to_user(user, "admin")
+        db.session.rollback()
+    status, statements = user_queries(student, "/api/user/subjects")
+    assert status == 200
+    assert statements == []
+
+
+def test_deleted_users_lose_access(admin, student):
+    assert student.get("/api/user/subjects").status_code == 200
+    assert admin.delete(f"/api/admin/users/{student.user_id}").status_code == 204
+    assert status_of(student, "/api/user/subjects") == 401
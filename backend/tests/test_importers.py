@@ -0,0 +1,88 @@
+import io
+import json
+
+from grading import get_answer_key
+
+CSV_HEADER = "question_statement,option1,option2,option3,option4,correct_option\n"
+
+
+def upload(client, url, body, filename):
+    return client.post(
+        url,
+        data={"file": (io.BytesIO(body.encode()), filename)},
+        content_type="multipart/form-data",
+    )
+
+
+def test_csv_import_inserts_valid_rows_and_reports_the_rest(app, admin, make_quiz):
+    quiz_id, _, _ = make_quiz(questions=0)
+    body = CSV_HEADER + "What?,a,b,c,d,2\nWhy?,a,b,c,d,5\n,a,b,c,d,1\nHow?,a,b,c,d,x\n"
+    url = f"/api/admin/quizzes/{quiz_id}/questions/import"
+    response = upload(admin, url, body, "q.csv")
+
+    assert response.status_code == 201
+    assert response.json["inserted"] == 1
+    assert response.json["failed"] == 3
+    assert response.json["errors"] == [
+        {"row": 2, "errors": ["correct_option must be between 1 and 4"]},
+        {"row": 3, "errors": ["question_statement is required"]},
+        {"row": 4, "errors": ["correct_option must be an integer"]},
+    ]
+    assert response.json["errors_truncated"] is False
+    questions = admin.get(f"/api/admin/quizzes/{quiz_id}/questions").json
+    assert [q["question_statement"] for q in questions] == ["What?"]
+    # The import bumps the quiz's content version, so grading sees it.
+    with app.app_context():
+        assert list(get_answer_key(quiz_id)["answers"].values()) == [2]
+
+
+def test_jsonl_import_checks_each_rows_quiz(admin, make_quiz):
+    quiz_id, _, _ = make_quiz(questions=0)
+    row = {
+        "question_statement": "Q",
+        "option1": "a",
+        "option2": "b",
+        "option3": "c",
+        "option4": "d",
+        "correct_option": 1,
+    }
+    lines = [
+        json.dumps({**row, "quiz_id": quiz_id}),
+        "not json",
+        json.dumps([1, 2]),
+        json.dumps({**row, "quiz_id": quiz_id + 100}),
+        json.dumps(row),
+    ]
+    response = admin.post(
+        "/api/admin/questions/import",
+        data="\n".join(lines),
+        content_type="application/x-ndjson",
+    )
+    assert response.status_code == 201
+    assert response.json["inserted"] == 1
+    assert [error["errors"] for error in response.json["errors"]] == [
+        ["Invalid JSON"],
+        ["Each line must be a JSON object"],
+        [f"Quiz {quiz_id + 100} does not exist"],
+        ["quiz_id is required"],
+    ]
+
+
+def test_import_with_nothing_valid_inserts_nothing(admin, make_quiz):
+    quiz_id, _, _ = make_quiz(questions=0)
+    url = f"/api/admin/quizzes/{quiz_id}/questions/import"
+    response = upload(admin, url, CSV_HEADER + "Q,a,b,c,d,9\n", "q.csv")
+    assert response.status_code == 200
+    assert response.json["inserted"] == 0
+
+
+def test_import_rejects_unknown_formats_and_bad_encodings(admin, make_quiz):
+    quiz_id, _, _ = make_quiz(questions=0)
+    url = f"/api/admin/quizzes/{quiz_id}/questions/import"
+    assert upload(admin, url, "hello", "q.txt").status_code == 400
+    response = admin.post(
+        url, data=CSV_HEADER.encode() + b"\xff\xfe,a,b,c,d,1\n", content_type="text/csv"
+    )
+    assert response.status_code == 400
+    assert response.json == {"error": "Upload must be UTF-8 encoded"}
+    assert admin.post("/api/admin/quizzes/999/questions/import").status_code == 404
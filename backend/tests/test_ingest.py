@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ingest import AttemptClosed, Submission, SubmissionWriter, get_receipt
+from models import Score
+
+
+@pytest.fixture
+def writer(app):
+    # A generous delay so every submission below lands in one group.
+    writer = SubmissionWriter(app, max_batch=10, max_delay_ms=500)
+    yield writer
+    writer.stop()
+
+
+@pytest.fixture
+def commits():
+    count = [0]
+
+    def record(conn):
+        count[0] += 1
+
+    event.listen(Engine, "commit", record)
+    yield count
+    event.remove(Engine, "commit", record)
+
+
+def submission(user_id, quiz_id, subject_id, **kwargs):
+    return Submission(
+        user_id=user_id,
+        quiz_id=quiz_id,
+        subject_id=subject_id,
+        total_scored=1,
+        total_possible=2,
+        attempted_at=datetime.utcnow(),
+        **kwargs,
+    )
+
+
+def test_concurrent_submissions_share_one_commit(
+    app, writer, commits, make_quiz, make_student
+):
+    quiz_id, subject_id, _ = make_quiz()
+    users = [make_student().user_id for _ in range(5)]
+    commits[0] = 0
+    futures = [writer.submit(submission(u, quiz_id, subject_id)) for u in users]
+    score_ids = [future.result(timeout=5) for future in futures]
+
+    assert commits[0] == 1
+    with app.app_context():
+        assert sorted(score_ids) == sorted(s.id for s in Score.query)
+
+
+def test_a_failing_submission_only_fails_itself(
+    app, writer, make_quiz, make_student
+):
+    quiz_id, subject_id, _ = make_quiz()
+    good = submission(make_student().user_id, quiz_id, subject_id)
+    # Closes an attempt that does not exist, so the group commit fails.
+    bad = submission(
+        make_student().user_id, quiz_id, subject_id, attempt_id=999, attempt_status="x"
+    )
+    futures = [writer.submit(good), writer.submit(bad)]
+
+    assert futures[0].result(timeout=5) > 0
+    with pytest.raises(AttemptClosed):
+        futures[1].result(timeout=5)
+    with app.app_context():
+        assert get_receipt(good.receipt)["status"] == "committed"
+        assert get_receipt(bad.receipt)["status"] == "failed"
+        assert Score.query.count() == 1
@@ -0,0 +1,75 @@
+from leaderboards import MemorySortedSets
+
+
+def take_quiz(client, quiz_id, answers):
+    assert client.post(f"/api/user/quizzes/{quiz_id}/start").status_code == 200
+    response = client.post(
+        f"/api/user/quizzes/{quiz_id}/submit", json={"answers": answers}
+    )
+    assert response.status_code == 200
+    return response.json
+
+
+def test_memory_board_orders_by_score_then_user_id():
+    boards = MemorySortedSets()
+    boards.record_best(
+        [
+            ("quiz:1", "subject:1", 3, 50.0),
+            ("quiz:1", "subject:1", 1, 75.0),
+            ("quiz:1", "subject:1", 2, 50.0),
+        ]
+    )
+    assert boards.top("quiz:1", 10) == [(1, 75.0), (2, 50.0), (3, 50.0)]
+    assert boards.rank("quiz:1", 3) == (2, 50.0)
+    assert boards.rank("quiz:1", 4) is None
+
+
+def test_only_a_better_score_moves_a_student(make_quiz, make_student, answers):
+    quiz_id, _, question_ids = make_quiz(questions=4)
+    student = make_student()
+    take_quiz(student, quiz_id, answers(question_ids, 3))
+    take_quiz(student, quiz_id, answers(question_ids, 1))
+
+    board = student.get(f"/api/user/leaderboards/quizzes/{quiz_id}").json
+    assert board["participants"] == 1
+    assert board["entries"][0]["score"] == 75.0
+    assert board["me"] == {"rank": 1, "score": 75.0}
+
+
+def test_quiz_leaderboard_ranks_students_by_best_score(
+    make_quiz, make_student, answers
+):
+    quiz_id, _, question_ids = make_quiz(questions=4)
+    ada, bob, cy = (make_student(name) for name in ("Ada", "Bob", "Cy"))
+    take_quiz(ada, quiz_id, answers(question_ids, 2))
+    take_quiz(bob, quiz_id, answers(question_ids, 4))
+    take_quiz(cy, quiz_id, answers(question_ids, 2))
+
+    board = cy.get(f"/api/user/leaderboards/quizzes/{quiz_id}").json
+    assert [(e["rank"], e["full_name"], e["score"]) for e in board["entries"]] == [
+        (1, "Bob", 100.0),
+        (2, "Ada", 50.0),
+        (3, "Cy", 50.0),
+    ]
+    assert board["me"] == {"rank": 3, "score": 50.0}
+    top = cy.get(f"/api/user/leaderboards/quizzes/{quiz_id}?limit=1").json
+    assert [e["full_name"] for e in top["entries"]] == ["Bob"]
+
+
+def test_subject_leaderboard_sums_best_quiz_scores(make_quiz, make_student, answers):
+    first_quiz, subject_id, first_questions = make_quiz(questions=4)
+    second_quiz, _, second_questions = make_quiz(questions=4, subject_id=subject_id)
+    ada, bob = make_student("Ada"), make_student("Bob")
+    take_quiz(ada, first_quiz, answers(first_questions, 4))
+    take_quiz(bob, first_quiz, answers(first_questions, 3))
+    take_quiz(bob, second_quiz, answers(second_questions, 2))
+
+    board = ada.get(f"/api/user/leaderboards/subjects/{subject_id}").json
+    assert [(e["full_name"], e["score"]) for e in board["entries"]] == [
+        ("Bob", 125.0),
+        ("Ada", 100.0),
+    ]
+
+
+def test_leaderboard_of_an_unknown_quiz_is_404(student):
+    assert student.get("/api/user/leaderboards/quizzes/999").status_code == 404
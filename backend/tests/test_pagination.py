@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    when = datetime(2030, 1, 2, 3, 4, 5)
+    assert decode_cursor(encode_cursor(when, 7), datetime, int) == [when, 7]
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_cursor(1, 2, 3)])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, datetime, int)
+
+
+def test_upcoming_quizzes_walk_every_quiz_once_in_order(make_quiz, student):
+    # Two quizzes share a date, so the id breaks the tie.
+    quiz_ids = [make_quiz(days_ahead=days)[0] for days in (3, 1, 2, 2, 5)]
+    expected = [quiz_ids[i] for i in (1, 2, 3, 0, 4)]
+
+    seen, cursor = [], None
+    while True:
+        url = "/api/user/quizzes/upcoming?limit=2"
+        response = student.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        seen += [quiz["id"] for quiz in response.json]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_past_quizzes_are_not_upcoming(make_quiz, student):
+    make_quiz(days_ahead=-1)
+    upcoming = make_quiz(days_ahead=1)[0]
+    assert [q["id"] for q in student.get("/api/user/quizzes/upcoming").json] == [
+        upcoming
+    ]
+
+
+def test_invalid_cursor_is_a_400(student):
+    response = student.get("/api/user/quizzes/upcoming?cursor=garbage")
+    assert response.status_code == 400
+
+
+def test_upcoming_quizzes_without_a_page_are_not_truncated(make_quiz, student):
+    _, subject_id, _ = make_quiz(questions=0)
+    for _ in range(59):
+        make_quiz(questions=0, subject_id=subject_id)
+
+    response = student.get("/api/user/quizzes/upcoming")
+    assert len(response.json) == 60
+    assert "X-Next-Cursor" not in response.headers
+    assert len(student.get("/api/user/quizzes/upcoming?limit=50").json) == 50
@@ -0,0 +1,62 @@
+from models import User, db
+from passwords import PasswordPoolBusy, _secret
+
+
+def set_password_hash(app, user_id, scheme, password):
+    """Store ``password`` for the user, hashed with a non-default scheme."""
+    with app.app_context():
+        context = app.extensions["security"].pwd_context
+        password_hash = context.handler(scheme).hash(_secret(password, scheme))
+        db.session.get(User, user_id).password = password_hash
+        db.session.commit()
+        return password_hash
+
+
+def log_in(app, password="student"):
+    return app.test_client().post(
+        "/api/auth/login",
+        json={"email": "student1@example.com", "password": password},
+    )
+
+
+def stored_hash(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).password
+
+
+def test_a_legacy_hash_is_upgraded_at_login(app, student):
+    legacy = set_password_hash(app, student.user_id, "bcrypt", "student")
+
+    assert log_in(app).status_code == 200
+    upgraded = stored_hash(app, student.user_id)
+    assert upgraded != legacy
+    assert upgraded.startswith("$argon2")
+
+    # The upgraded hash still verifies and is left alone from then on.
+    assert log_in(app).status_code == 200
+    assert stored_hash(app, student.user_id) == upgraded
+
+
+def test_a_wrong_password_is_a_401_and_keeps_the_hash(app, student):
+    legacy = set_password_hash(app, student.user_id, "bcrypt", "student")
+    response = log_in(app, "x")
+    assert response.status_code == 401
+    assert stored_hash(app, student.user_id) == legacy
+
+
+def test_a_disabled_user_is_a_403_and_keeps_the_hash(app, admin, student):
+    legacy = set_password_hash(app, student.user_id, "bcrypt", "student")
+    admin.put(f"/api/admin/users/{student.user_id}/toggle-active")
+    response = log_in(app)
+    assert response.status_code == 403
+    assert stored_hash(app, student.user_id) == legacy
+
+
+def test_a_full_password_pool_is_a_503(app, student, monkeypatch):
+    def busy(password, password_hash):
+        raise PasswordPoolBusy()
+
+    monkeypatch.setattr("routes.auth.check_password", busy)
+    response = log_in(app)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_no_hot_query_does_a_full_table_scan():
+    # A separate process: the checker seeds and configures its own app.
+    result = subprocess.run(
+        [sys.executable, "check_query_plans.py"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "No hot query does a full table scan." in result.stdout
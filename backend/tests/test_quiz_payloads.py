@@ -0,0 +1,64 @@
+import gzip
+import json
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def start(client, quiz_id, **headers):
+    return client.post(f"/api/user/quizzes/{quiz_id}/start", headers=headers)
+
+
+def test_start_payload_hides_answers_and_is_shared(make_quiz, make_student):
+    quiz_id, _, question_ids = make_quiz(questions=2)
+    first, second = make_student(), make_student()
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "FROM question" in statement:
+            statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        one, two = start(first, quiz_id), start(second, quiz_id)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    body = one.json
+    assert [q["id"] for q in body["questions"]] == question_ids
+    assert "correct_option" not in json.dumps(body)
+    # Built once, then served from the cache for the second student.
+    assert len(statements) == 1
+    assert one.headers["ETag"] == two.headers["ETag"]
+    assert one.get_data() == two.get_data()
+
+
+def test_start_payload_is_gzipped_and_conditional(make_quiz, student):
+    quiz_id, _, _ = make_quiz()
+    zipped = start(student, quiz_id, **{"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+    plain = start(student, quiz_id)
+    assert json.loads(gzip.decompress(zipped.get_data())) == plain.json
+    assert zipped.headers["ETag"] != plain.headers["ETag"]
+
+    again = start(student, quiz_id, **{"If-None-Match": plain.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["X-Attempt-Number"] == "1"
+
+
+def test_editing_a_question_changes_the_payload(admin, make_quiz, student):
+    quiz_id, _, question_ids = make_quiz(questions=1)
+    before = start(student, quiz_id)
+    response = admin.put(
+        f"/api/admin/questions/{question_ids[0]}",
+        json={"question_statement": "Edited?"},
+    )
+    assert response.status_code == 200
+    after = start(student, quiz_id)
+    assert after.json["questions"][0]["question"] == "Edited?"
+    assert after.headers["ETag"] != before.headers["ETag"]
+
+
+def test_unknown_quiz_has_no_payload(student):
+    assert start(student, 999).status_code == 404
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+from models import NotificationBatch, db
+from notifications import NEW_QUIZ, DeliveryRecorder, batch_quizzes, claim_new_quizzes
+
+
+def test_reminder_chunks_carry_id_ranges_not_addresses(
+    app, admin, eager_tasks, make_quiz, make_student, monkeypatch
+):
+    app.config["REMINDER_CHUNK_SIZE"] = 2
+    students = [make_student() for _ in range(3)]
+    make_quiz()
+    headers = []
+    chord = eager_tasks.chord
+
+    def recording_chord(header, *args, **kwargs):
+        headers.extend(header)
+        return chord(header, *args, **kwargs)
+
+    monkeypatch.setattr(eager_tasks, "chord", recording_chord)
+    with app.app_context(), app.extensions["mail"].record_messages() as outbox:
+        eager_tasks.send_new_quiz_reminders()
+        # A second run finds nothing new to announce.
+        eager_tasks.send_new_quiz_reminders()
+
+    # The admin and the three students after it: two ranges of two ids.
+    assert [student.user_id for student in students] == [
+        admin.user_id + n for n in (1, 2, 3)
+    ]
+    assert [sig.args[1:3] for sig in headers] == [
+        (admin.user_id, admin.user_id + 1),
+        (admin.user_id + 2, admin.user_id + 3),
+    ]
+    assert not any("@" in str(arg) for sig in headers for arg in sig.args)
+    assert sorted(m.recipients[0] for m in outbox) == [
+        f"student{n}@example.com" for n in range(1, len(students) + 1)
+    ]
+
+
+def test_each_quiz_is_announced_once(app, eager_tasks, make_quiz, student):
+    make_quiz()
+    with app.app_context(), app.extensions["mail"].record_messages() as outbox:
+        eager_tasks.send_new_quiz_reminders()
+        second_quiz = make_quiz()[0]
+        eager_tasks.send_new_quiz_reminders()
+        eager_tasks.send_new_quiz_reminders()
+        batches = NotificationBatch.query.order_by(NotificationBatch.id).all()
+        assert [b.status for b in batches] == ["sent", "sent"]
+        assert [q.id for q in batch_quizzes(batches[1])] == [second_quiz]
+    assert len(outbox) == 2
+
+
+def test_a_resumed_batch_skips_students_already_reached(
+    app, eager_tasks, make_quiz, make_student
+):
+    reached = make_student()
+    make_student()
+    make_quiz()
+    with app.app_context():
+        batch = claim_new_quizzes(NEW_QUIZ, timedelta(hours=1))
+        # A run that crashed after emailing one student.
+        recorder = DeliveryRecorder(batch.id)
+        recorder(reached.user_id)
+        recorder.flush()
+        batch.status = "sending"
+        batch.dispatched_at = datetime.now(timezone.utc) - timedelta(days=1)
+        db.session.commit()
+
+        with app.extensions["mail"].record_messages() as outbox:
+            eager_tasks.send_new_quiz_reminders()
+        assert db.session.get(NotificationBatch, batch.id).status == "sent"
+    assert [m.recipients[0] for m in outbox] == ["student2@example.com"]
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import ReportSnapshot, Score, db
+from reports import (
+    claim_undelivered_snapshots,
+    compute_report_snapshots,
+    previous_month,
+    record_snapshot_deliveries,
+)
+
+PERIOD, START, END = previous_month(datetime.now(timezone.utc))
+
+
+def add_score(app, user_id, quiz_id, scored, possible, day=2):
+    with app.app_context():
+        db.session.add(
+            Score(
+                user_id=user_id,
+                quiz_id=quiz_id,
+                total_scored=scored,
+                total_possible=possible,
+                time_stamp_of_attempt=START.replace(tzinfo=None) + timedelta(days=day),
+            )
+        )
+        db.session.commit()
+
+
+def test_snapshots_are_computed_once_and_emailed_once(
+    app, eager_tasks, make_quiz, make_student
+):
+    quiz_id, _, _ = make_quiz()
+    ada, bob = make_student("Ada"), make_student("Bob")
+    add_score(app, ada.user_id, quiz_id, 3, 4)
+    add_score(app, ada.user_id, quiz_id, 1, 4, day=3)
+    add_score(app, bob.user_id, quiz_id, 2, 4)
+
+    with app.app_context(), app.extensions["mail"].record_messages() as outbox:
+        eager_tasks.generate_monthly_reports()
+        # A score added to the closed month afterwards changes nothing.
+        add_score(app, bob.user_id, quiz_id, 4, 4, day=4)
+        eager_tasks.generate_monthly_reports()
+
+    assert sorted(m.recipients[0] for m in outbox) == [
+        "student1@example.com",
+        "student2@example.com",
+    ]
+    reports = ada.get("/api/user/reports").json
+    assert [(r["period"], r["attempts"], r["average_percentage"]) for r in reports] == [
+        (PERIOD, 2, 50.0)
+    ]
+    detail = bob.get(f"/api/user/reports/{PERIOD}").json
+    assert detail["attempts"] == 1
+    assert [a["total_scored"] for a in detail["details"]] == [2]
+    with app.app_context():
+        statuses = {s.delivery_status for s in ReportSnapshot.query}
+    assert statuses == {"sent"}
+
+
+def test_report_periods_are_validated(student):
+    assert student.get("/api/user/reports/2024-1").status_code == 400
+    assert student.get("/api/user/reports/1999-01").status_code == 404
+
+
+def test_a_month_in_progress_gets_no_snapshots(app):
+    now = datetime.now(timezone.utc)
+    with app.app_context(), pytest.raises(ValueError):
+        compute_report_snapshots(
+            now.strftime("%Y-%m"), now.replace(day=1), now + timedelta(days=1)
+        )
+
+
+def test_failed_deliveries_are_retried_up_to_the_limit(app, make_quiz, make_student):
+    quiz_id, _, _ = make_quiz()
+    student = make_student()
+    add_score(app, student.user_id, quiz_id, 1, 2)
+    resume_now = timedelta(seconds=0)
+    with app.app_context():
+        compute_report_snapshots(PERIOD, START, END)
+        for _ in range(2):
+            claimed = claim_undelivered_snapshots(PERIOD, resume_now, max_attempts=2)
+            assert claimed == [student.user_id]
+            record_snapshot_deliveries(PERIOD, claimed, [])
+        assert claim_undelivered_snapshots(PERIOD, resume_now, max_attempts=2) == []
+        snapshot = db.session.get(ReportSnapshot, (student.user_id, PERIOD))
+        assert (snapshot.delivery_status, snapshot.delivery_attempts) == ("failed", 2)
@@ -0,0 +1,50 @@
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models import Subject, db
+from storage import READ_BIND, WalCheckpointer
+
+
+def pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_engines_get_the_storage_profile(app):
+    with app.app_context():
+        primary, reader = db.engines[None], db.engines[READ_BIND]
+        assert pragma(primary, "journal_mode") == "wal"
+        assert pragma(primary, "query_only") == 0
+        assert pragma(reader, "query_only") == 1
+        assert pragma(reader, "busy_timeout") == app.config["SQLITE_BUSY_TIMEOUT_MS"]
+
+
+def test_read_only_views_read_from_the_reader(app, admin):
+    with app.app_context():
+        db.session.add(Subject(name="Physics"))
+        db.session.commit()
+    # The subject list is @read_only; the primary's write is visible to it.
+    assert [s["name"] for s in admin.get("/api/admin/subjects").json] == ["Physics"]
+
+
+def test_a_read_only_request_cannot_write(app):
+    with app.test_request_context(), pytest.raises(OperationalError):
+        g.read_only = True
+        try:
+            db.session.execute(text("DELETE FROM subject"))
+        finally:
+            db.session.rollback()
+
+
+def test_checkpoints_truncate_a_large_wal(app):
+    with app.app_context():
+        checkpointer = WalCheckpointer(db.engines[None], 3600, truncate_bytes=0)
+        try:
+            db.session.add(Subject(name="Chemistry"))
+            db.session.commit()
+            mode = checkpointer.checkpoint()[0]
+        finally:
+            checkpointer.stop()
+    assert mode == "TRUNCATE"
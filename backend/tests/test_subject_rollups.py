@@ -0,0 +1,34 @@
+from aggregates import rebuild_subject_rollups
+
+
+def test_rollup_summary_matches_the_live_query(
+    app, admin, make_quiz, make_student, answers
+):
+    quiz_id, _, question_ids = make_quiz(questions=4, max_attempts=None)
+    make_quiz()  # A subject nobody has attempted yet.
+    for right in (1, 3):
+        student = make_student()
+        student.post(f"/api/user/quizzes/{quiz_id}/start")
+        student.post(
+            f"/api/user/quizzes/{quiz_id}/submit",
+            json={"answers": answers(question_ids, right)},
+        )
+
+    rollup = admin.get("/api/admin/stats/subject-summary").json
+    live = admin.get("/api/admin/stats/subject-summary?fresh=1").json
+    assert rollup["source"] == "rollup"
+    assert rollup["topScores"] == live["topScores"] == [
+        {"subject": "Subject 0", "topScore": 75.0}
+    ]
+    assert rollup["attempts"] == live["attempts"] == [
+        {"subject": "Subject 0", "attempts": 2},
+        {"subject": "Subject 1", "attempts": 0},
+    ]
+
+    with app.app_context():
+        assert rebuild_subject_rollups() == 2
+    rebuilt = admin.get("/api/admin/stats/subject-summary").json
+    assert (rebuilt["topScores"], rebuilt["attempts"]) == (
+        rollup["topScores"],
+        rollup["attempts"],
+    )